@@ -0,0 +1,25 @@
+import hmac
+from functools import wraps
+from flask import abort, current_app, request
+
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+
+def admin_only(view):
+    # The /admin endpoints answer requests with an `Authorization: Bearer`
+    # header holding ADMIN_TOKEN. With no token set, they answer local
+    # requests alone, and not those forwarded by a proxy on the same host.
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = current_app.config.get('ADMIN_TOKEN')
+        if token:
+            allowed = hmac.compare_digest(
+                request.headers.get('Authorization', '').encode(),
+                'Bearer {}'.format(token).encode())
+        else:
+            allowed = request.remote_addr in LOCAL_ADDRESSES and \
+                'X-Forwarded-For' not in request.headers
+        if not allowed:
+            abort(403)
+        return view(*args, **kwargs)
+    return wrapper
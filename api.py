@@ -0,0 +1,125 @@
+import json
+from datetime import datetime
+from flask import Response, abort, request, stream_with_context, url_for
+from sqlalchemy.orm import load_only, selectinload
+from models import db, to_dictionary, Venue, Artist, Show, Album, Song
+from transfer import not_deleted
+
+PREFIX = '/api/v1'
+
+# The collections of the API: the model, and what turns one of its records
+# into a dictionary, the same as on the pages for venues and artists.
+RESOURCES = {
+    'venues': (Venue, Venue.venue_to_dictionary),
+    'artists': (Artist, Artist.artist_to_dictionary),
+    'shows': (Show, to_dictionary),
+    'albums': (Album, to_dictionary),
+    'songs': (Song, to_dictionary),
+}
+
+NDJSON = 'application/x-ndjson'
+
+
+def encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(value)
+
+
+def dumps(data):
+    return json.dumps(data, default=encode)
+
+
+class Api(object):
+    # Serves /api/v1/<kind> and /api/v1/<kind>/<id> as JSON. ?fields=name,
+    # city selects those columns alone (id always comes along); genres are
+    # loaded only when asked for. A collection is read a page at a time,
+    # by id, with ?after= and ?per_page=, or all at once as NDJSON, one
+    # record per line, with Accept: application/x-ndjson or ?format=ndjson.
+    # NDJSON is written while it is read from a server side cursor, a batch
+    # of API_STREAM_BATCH_SIZE records at a time, so memory use doesn't grow
+    # with the collection.
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.add_url_rule(PREFIX + '/<kind>', 'api_collection',
+                         self.collection)
+        app.add_url_rule(PREFIX + '/<kind>/<int:record_id>', 'api_record',
+                         self.record)
+
+    def collection(self, kind):
+        model, source, fields, to_dict = self.resource(kind)
+        query = self.select(model, source, fields).order_by(source.id)
+
+        if request.args.get('format') == 'ndjson' or \
+                request.accept_mimetypes.best_match(
+                    ['application/json', NDJSON]) == NDJSON:
+            return Response(stream_with_context(
+                self.lines(query, fields, to_dict)), mimetype=NDJSON)
+
+        per_page = min(max(request.args.get(
+            'per_page', self.app.config['LISTINGS_PER_PAGE'], type=int), 1),
+            self.app.config['LISTINGS_MAX_PER_PAGE'])
+        records = db.session.execute(query.where(
+            source.id > request.args.get('after', 0, type=int)).limit(
+            per_page + 1)).scalars().all()
+
+        data = {kind: [to_dict(record, fields)
+                       for record in records[:per_page]], 'next': None}
+        if len(records) > per_page:
+            data['next'] = url_for(
+                'api_collection', kind=kind, **dict(
+                    request.args.to_dict(), after=records[per_page - 1].id))
+        return self.json(data)
+
+    def record(self, kind, record_id):
+        model, source, fields, to_dict = self.resource(kind)
+        record = db.session.execute(self.select(model, source, fields).where(
+            source.id == record_id)).scalar()
+        if record is None:
+            self.fail(404, 'no such record')
+        return self.json(to_dict(record, fields))
+
+    def resource(self, kind):
+        # the model, the entity to select from, the requested fields and the
+        # dictionary function of a collection
+        if kind not in RESOURCES:
+            self.fail(404, 'no such collection')
+        model, to_dict = RESOURCES[kind]
+        source = Show.including_archive() if model is Show else model
+
+        names = [name for name in request.args.get('fields', '').split(',')
+                 if name]
+        unknown = [name for name in names if name not in model.FIELDS]
+        if unknown:
+            self.fail(400, 'unknown fields: {}'.format(', '.join(unknown)))
+        fields = ('id',) + tuple(name for name in names if name != 'id') \
+            if names else model.FIELDS
+        return model, source, fields, to_dict
+
+    def select(self, model, source, fields):
+        # only the requested columns, of the records not deleted
+        query = db.select(source).options(load_only(*[
+            getattr(source, field) for field in fields
+            if field != 'genres'])).where(*not_deleted(model, source))
+        if 'genres' in fields:
+            query = query.options(selectinload(source.genres))
+        return query
+
+    def lines(self, query, fields, to_dict):
+        result = db.session.execute(query.execution_options(
+            stream_results=True,
+            yield_per=self.app.config['API_STREAM_BATCH_SIZE']))
+        for records in result.scalars().partitions():
+            yield ''.join(dumps(to_dict(record, fields)) + '\n'
+                          for record in records)
+
+    def json(self, data):
+        return Response(dumps(data), mimetype='application/json')
+
+    def fail(self, status, message):
+        abort(Response(dumps({'error': message}), status,
+                       mimetype='application/json'))
@@ -3,7 +3,11 @@
 # ----------------------------------------------------------------------------#
 
 import sys
-import dateutil.parser
+import time
+import logging
+import click
+from datetime import datetime, timedelta
+from itertools import groupby
 import babel
 from flask import (
     Flask,
@@ -11,13 +15,47 @@ from flask import (
     request,
     flash,
     redirect,
-    url_for
+    url_for,
+    jsonify,
+    abort
 )
 from sqlalchemy import desc
 from flask_sqlalchemy import SQLAlchemy
 from logging import Formatter, FileHandler
 from forms import *
 from models import *
+from bookings import (
+    artist_is_busy,
+    bookings_format,
+    parse_bookings,
+    book_shows
+)
+from cache import PageCache
+from archive import archive_shows
+from cascade import soft_delete_venue, soft_delete_artist, purge_deleted
+from listings import SORTS, page_query, page_rows
+from transfer import (
+    KINDS,
+    file_format,
+    read_rows,
+    import_rows,
+    export_rows,
+    write_rows
+)
+from counters import (
+    count_booked_shows,
+    roll_show_counts,
+    rebuild_show_counts
+)
+from search import Search
+from reads import Reads
+from pool import PoolHealth
+from conditional import ConditionalGet, changed, started
+from dates import PATTERNS, DateFormats
+from instrumentation import Instrumentation
+from api import Api
+from compression import Compression
+from seed import generate
 from flask_migrate import Migrate
 
 # ----------------------------------------------------------------------------#
@@ -28,25 +66,139 @@ app = Flask(__name__)
 app.config.from_object('config')
 db.init_app(app)
 migrate = Migrate(app, db)
+page_cache = PageCache(app)
+instrumentation = Instrumentation(app)
+search = Search()
+reads = Reads(app)
+pool_health = PoolHealth(app, db)
+conditional_get = ConditionalGet(app, reads)
+api = Api(app)
+compression = Compression(app)
+
+
+@app.before_first_request
+def build_search_indexes():
+    # build the typeahead indexes up front instead of on the first keystroke
+    search.prefix_index(Venue)
+    search.prefix_index(Artist)
 
 # ----------------------------------------------------------------------------#
 # Filters.
 # ----------------------------------------------------------------------------#
 
 
-def format_datetime(value, format='medium'):
-    if isinstance(value, str):
-        date = dateutil.parser.parse(value)
-    else:
-        date = value
-    if format == 'full':
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == 'medium':
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format, locale='en')
+# the `datetime` filter (see dates.py)
+date_formats = DateFormats(app)
+format_datetime = date_formats.localize
+
+# ----------------------------------------------------------------------------#
+# Page cache invalidation.
+# ----------------------------------------------------------------------------#
 
 
-app.jinja_env.filters['datetime'] = format_datetime
+def venue_pages(venue_id):
+    # the venue page and the pages of every artist that played there
+    shows = Show.including_archive()
+    artist_ids = db.session.query(shows.artist_id).filter(
+        shows.venue_id == venue_id).distinct()
+    return [url_for('show_venue', venue_id=venue_id)] + [
+        url_for('show_artist', artist_id=artist_id)
+        for (artist_id,) in artist_ids]
+
+
+def artist_pages(artist_id):
+    # the artist page and the pages of every venue the artist played at
+    shows = Show.including_archive()
+    venue_ids = db.session.query(shows.venue_id).filter(
+        shows.artist_id == artist_id).distinct()
+    return [url_for('show_artist', artist_id=artist_id)] + [
+        url_for('show_venue', venue_id=venue_id)
+        for (venue_id,) in venue_ids]
+
+
+def shows_with(other, shows, *criteria):
+    # start time and the artist or venue (other) of the matching shows
+    other_id = shows.artist_id if other is Artist else shows.venue_id
+    return db.select(
+        shows.start_time,
+        other.id,
+        other.name,
+        other.image_link
+    ).join(other, other_id == other.id).where(
+        other.active(), *criteria).order_by(shows.start_time)
+
+
+def format_shows(kind, rows):
+    return [{
+        kind + "_id": other_id,
+        kind + "_name": name,
+        kind + "_image_link": image_link,
+        "start_time": start_time
+    } for start_time, other_id, name, image_link in rows]
+
+
+def listing_page(default_sort):
+    # sort, cursors and page size of a venues or artists page (see
+    # listings.py)
+    sort = request.args.get('sort')
+    per_page = request.args.get(
+        'per_page', app.config['LISTINGS_PER_PAGE'], type=int)
+    return {
+        'sort': sort if sort in SORTS else default_sort,
+        'before': request.args.get('before'),
+        'after': request.args.get('after'),
+        'per_page': min(max(per_page, 1), app.config['LISTINGS_MAX_PER_PAGE'])
+    }
+
+# ----------------------------------------------------------------------------#
+# Conditional GET validators (see conditional.py).
+# ----------------------------------------------------------------------------#
+
+
+def home_validators():
+    return changed(Venue) + changed(Artist)
+
+
+def venues_validators():
+    return changed(Venue)
+
+
+def artists_validators():
+    return changed(Artist)
+
+
+def shows_validators():
+    return changed(Show) + changed(Venue) + changed(Artist)
+
+
+def venue_validators(venue_id):
+    artist_ids = db.union(
+        db.select(Show.artist_id).where(Show.venue_id == venue_id),
+        db.select(ArchivedShow.artist_id).where(
+            ArchivedShow.venue_id == venue_id))
+    return (changed(Venue, Venue.id == venue_id) +
+            changed(Show, Show.venue_id == venue_id) +
+            changed(Artist, Artist.id.in_(artist_ids)) +
+            started(Show.venue_id == venue_id))
+
+
+def artist_validators(artist_id):
+    venue_ids = db.union(
+        db.select(Show.venue_id).where(Show.artist_id == artist_id),
+        db.select(ArchivedShow.venue_id).where(
+            ArchivedShow.artist_id == artist_id))
+    return (changed(Artist, Artist.id == artist_id) +
+            changed(Show, Show.artist_id == artist_id) +
+            changed(Venue, Venue.id.in_(venue_ids)) +
+            changed(Album, Album.artist_id == artist_id) +
+            changed(Song, Song.artist_id == artist_id) +
+            started(Show.artist_id == artist_id))
+
+
+def album_validators(artist_id, album_id):
+    return (changed(Album, Album.id == album_id) +
+            changed(Song, Song.album_id == album_id) +
+            changed(Artist, Artist.id == artist_id))
 
 # ----------------------------------------------------------------------------#
 # Controllers.
@@ -54,54 +206,81 @@ app.jinja_env.filters['datetime'] = format_datetime
 
 
 @app.route('/')
+@conditional_get.depends_on(home_validators)
 def index():
     # display 10 of the most recent created venues and artists
-    venues = Venue.query.order_by(desc(Venue.created_date)).limit(10).all()
-    artists = Artist.query.order_by(desc(Artist.created_date)).limit(10).all()
-    return render_template('pages/home.html', venues=venues, artists=artists)
+    venues, artists = reads.all(
+        db.select(Venue.id, Venue.name).where(Venue.active()).order_by(
+            desc(Venue.created_date), desc(Venue.id)).limit(10),
+        db.select(Artist.id, Artist.name).where(Artist.active()).order_by(
+            desc(Artist.created_date), desc(Artist.id)).limit(10))
+    return render_template('pages/home.html', venues=venues,
+                           artists=artists)
 
 
 #  Venues
 #  ----------------------------------------------------------------
 @app.route('/venues')
+@conditional_get.depends_on(venues_validators)
 def venues():
-    locations = db.session.query(Venue.city, Venue.state).group_by(
-        Venue.city, Venue.state).all()
-    data = []
-
-    for [city, state] in locations:
-        venues = Venue.query.filter_by(city=city, state=state).all()
-        venues_data = []
+    # upcoming show counts are kept on the venues (see counters.py), so the
+    # shows table is not read here
+    page = listing_page('city')
+    query = db.select(
+        Venue.city,
+        Venue.state,
+        Venue.id,
+        Venue.name,
+        Venue.created_date,
+        Venue.upcoming_shows_count
+    ).where(Venue.active())
+
+    genre = request.args.get('genre')
+    if genre:
+        query = query.where(Venue.genres.any(Genre.name == genre))
+    rows, = reads.all(page_query(query, Venue, **page))
+    rows, cursors = page_rows(rows, **page)
 
-        for venue in venues:
-            upcoming_shows = Show.query.filter(
-                Show.venue_id == venue.id,
-                Show.start_time >= datetime.now()).all()
-
-            venues_data.append({
-                "id": venue.id,
-                "name": venue.name,
-                "num_upcoming_shows": len(upcoming_shows)
-            })
+    data = []
 
+    # sorted by city, rows come grouped by area, in a single pass; in any
+    # other order they are listed as they come
+    if page['sort'] == 'city':
+        areas = groupby(rows, key=lambda row: (row.city, row.state))
+    else:
+        areas = [((None, None), rows)]
+    for (city, state), area_rows in areas:
         data.append({
             'city': city,
             'state': state,
-            'venues': venues_data
+            'venues': [{
+                "id": row.id,
+                "name": row.name,
+                "city": row.city,
+                "state": row.state,
+                "num_upcoming_shows": row.upcoming_shows_count
+            } for row in area_rows]
         })
 
-    return render_template('pages/venues.html', areas=data)
+    return render_template('pages/venues.html', areas=data,
+                           genres=list_of_genres, genre=genre,
+                           sorts=SORTS, sort=page['sort'], cursors=cursors)
 
 
-@app.route('/venues/search', methods=['POST'])
+@app.route('/venues/search', methods=['GET', 'POST'])
+@conditional_get.depends_on(venues_validators)
 def search_venues():
-    search_term = request.form.get('search_term', '')
-    search_results = Venue.query.filter(
-        Venue.name.ilike(f'%{search_term}%')).all()
+    search_term = request.values.get('search_term', '')
+    page = request.args.get('page', 1, type=int)
+    per_page = app.config['SEARCH_RESULTS_PER_PAGE']
+    count, results = search.search(Venue, search_term, max(page, 1), per_page)
 
     response = {
-        "count": len(search_results),
-        "data": search_results,
+        "count": count,
+        "data": [{"id": venue_id, "name": name}
+                 for venue_id, name in results],
+        "page": page,
+        "pages": -(-count // per_page)
     }
 
     return render_template('pages/search_venues.html',
@@ -109,32 +288,38 @@ def search_venues():
                            search_term=search_term)
 
 
+@app.route('/venues/suggest')
+def suggest_venues():
+    suggestions = search.suggest(Venue, request.args.get('q', ''),
+                                 app.config['SEARCH_SUGGESTIONS'])
+    return jsonify(suggestions=[{"id": venue_id, "name": name}
+                                for venue_id, name in suggestions])
+
+
 @app.route('/venues/<int:venue_id>')
+@db.replicas.primary_reads
+@conditional_get.depends_on(venue_validators)
+@page_cache.cached
 def show_venue(venue_id):
-    venue = Venue.query.get(venue_id)
-    shows = Show.query.filter_by(venue_id=venue_id).join(
-        Artist, Show.artist_id == Artist.id).all()
-
-    upcoming_shows = []
-    past_shows = []
-
-    for show in shows:
-        formatted_show = {
-            "artist_id": show.artists.id,
-            "artist_name": show.artists.name,
-            "artist_image_link": show.artists.image_link,
-            "start_time": show.start_time
-        }
-
-        if show.start_time < datetime.now():
-            past_shows.append(formatted_show)
-        else:
-            upcoming_shows.append(formatted_show)
-
-    data = venue.venue_to_dictionary()
-    data['past_shows'] = past_shows
+    now = datetime.now()
+    venue, upcoming_shows, archived_until = reads.all(
+        db.select(Venue).options(db.selectinload(Venue.genres)).where(
+            Venue.id == venue_id, Venue.active()),
+        shows_with(Artist, Show, Show.venue_id == venue_id,
+                   Show.start_time >= now),
+        Show.archived_until())
+    if not venue:
+        abort(404)
+    # upcoming shows are never archived, so only past shows may need both
+    # tables
+    shows = Show.covering(archived_until[0][0])
+    past_shows, = reads.all(shows_with(
+        Artist, shows, shows.venue_id == venue_id, shows.start_time < now))
+
+    data = venue[0][0].venue_to_dictionary()
+    data['past_shows'] = format_shows('artist', past_shows)
     data['past_shows_count'] = len(past_shows)
-    data['upcoming_shows'] = upcoming_shows
+    data['upcoming_shows'] = format_shows('artist', upcoming_shows)
     data['upcoming_shows_count'] = len(upcoming_shows)
 
     return render_template('pages/show_venue.html', venue=data)
@@ -160,6 +345,7 @@ def create_venue_submission():
             form.populate_obj(new_venue)
             db.session.add(new_venue)
             db.session.commit()
+            search.update(new_venue)
             flash('Venue ' + new_venue.name + ' was successfully listed!')
         except Exception as err:
             db.session.rollback()
@@ -181,38 +367,28 @@ def create_venue_submission():
 
 @app.route('/venues/<int:venue_id>/delete', methods=['POST'])
 def delete_venue(venue_id):
-    venue = Venue.query.get(venue_id)
-    shows = Show.query.filter_by(venue_id=venue_id)
-
-    if shows.count() > 0:
-        for show in shows:
-            try:
-                db.session.delete(show)
-                db.session.commit()
-            except Exception as err:
-                db.session.rollback()
-                print(sys.exc_info())
-                flash('Show could not be deleted. {}'.format(err))
-            finally:
-                db.session.close()
-
+    venue = Venue.active_by_id(venue_id).first_or_404()
+    name = venue.name
+    pages = venue_pages(venue_id)
     error = False
 
     try:
-        db.session.delete(venue)
+        # the rows go with the next `flask purge-deleted`
+        soft_delete_venue(venue_id)
         db.session.commit()
+        search.remove(Venue, venue_id)
     except Exception as err:
         db.session.rollback()
         print(sys.exc_info())
         error = True
-        flash('An error occurred. Venue ' +
-              venue.name + ' could not be deleted. ' + err)
+        flash('An error occurred. Venue {} could not be deleted. {}'.format(
+            name, err))
     finally:
         db.session.close()
         if error:
             return redirect(url_for('show_venue', venue_id=venue_id))
-        else:
-            flash('The venue has been deleted.')
+        page_cache.delete(*pages)
+        flash('The venue has been deleted.')
     return redirect(url_for('index'))
 
 #  Artists
@@ -220,28 +396,52 @@ def delete_venue(venue_id):
 
 
 @app.route('/artists')
+@conditional_get.depends_on(artists_validators)
 def artists():
-    artists = Artist.query.all()
+    page = listing_page('name')
+    query = db.select(
+        Artist.id,
+        Artist.name,
+        Artist.city,
+        Artist.state,
+        Artist.created_date
+    ).where(Artist.active())
+
+    genre = request.args.get('genre')
+    if genre:
+        query = query.where(Artist.genres.any(Genre.name == genre))
+    rows, = reads.all(page_query(query, Artist, **page))
+    rows, cursors = page_rows(rows, **page)
+
     data = []
 
-    for artist in artists:
+    for artist in rows:
         data.append({
             'id': artist.id,
-            'name': artist.name
+            'name': artist.name,
+            'city': artist.city,
+            'state': artist.state
         })
 
-    return render_template('pages/artists.html', artists=data)
+    return render_template('pages/artists.html', artists=data,
+                           genres=list_of_genres, genre=genre,
+                           sorts=SORTS, sort=page['sort'], cursors=cursors)
 
 
-@app.route('/artists/search', methods=['POST'])
+@app.route('/artists/search', methods=['GET', 'POST'])
+@conditional_get.depends_on(artists_validators)
 def search_artists():
-    search_term = request.form.get('search_term', '')
-    search_results = Artist.query.filter(
-        Artist.name.ilike(f'%{search_term}%')).all()
+    search_term = request.values.get('search_term', '')
+    page = request.args.get('page', 1, type=int)
+    per_page = app.config['SEARCH_RESULTS_PER_PAGE']
+    count, results = search.search(Artist, search_term, max(page, 1), per_page)
 
     response = {
-        "count": len(search_results),
-        "data": search_results
+        "count": count,
+        "data": [{"id": artist_id, "name": name}
+                 for artist_id, name in results],
+        "page": page,
+        "pages": -(-count // per_page)
     }
 
     return render_template('pages/search_artists.html',
@@ -249,105 +449,108 @@ def search_artists():
                            search_term=search_term)
 
 
-@app.route('/artists/<int:artist_id>')
-def show_artist(artist_id):
-    artist = Artist.query.get(artist_id)
-    shows = Show.query.filter_by(artist_id=artist_id).join(
-        Venue, Show.venue_id == Venue.id).all()
-    albums = Album.query.filter_by(artist_id=artist_id)
-    songs = Song.query.filter_by(artist_id=artist_id)
-
-    upcoming_shows = []
-    past_shows = []
-
-    for show in shows:
-        formatted_show = {
-            "venue_id": show.venues.id,
-            "venue_name": show.venues.name,
-            "venue_image_link": show.venues.image_link,
-            "start_time": show.start_time
-        }
-
-        if show.start_time < datetime.now():
-            past_shows.append(formatted_show)
-        else:
-            upcoming_shows.append(formatted_show)
-
-    albums_data = []
-    for album in albums:
-        album_songs = songs.filter_by(album_id=album.id)
-        songs_data = []
-
-        for song in album_songs:
-            songs_data.append({
-                'title': song.title
-            })
-
-        albums_data.append({
-            'id': album.id,
-            'title': album.title,
-            'songs': songs_data
-        })
+@app.route('/artists/suggest')
+def suggest_artists():
+    suggestions = search.suggest(Artist, request.args.get('q', ''),
+                                 app.config['SEARCH_SUGGESTIONS'])
+    return jsonify(suggestions=[{"id": artist_id, "name": name}
+                                for artist_id, name in suggestions])
 
-    no_album_songs = songs.filter_by(album_id=None)
-    no_album_songs_data = []
-    for song in no_album_songs:
-        no_album_songs_data.append({
-            'title': song.title
-        })
 
-    data = artist.artist_to_dictionary()
-    data['past_shows'] = past_shows
-    data['past_shows_count'] = len(past_shows)
-    data['upcoming_shows'] = upcoming_shows
-    data['upcoming_shows_count'] = len(upcoming_shows)
-    data['albums'] = albums_data
-    data['songs'] = no_album_songs_data
+@app.route('/artists/<int:artist_id>')
+@db.replicas.primary_reads
+@conditional_get.depends_on(artist_validators)
+@page_cache.cached
+def show_artist(artist_id):
+    # three statements, however many albums, shows and songs there are
+    now = datetime.now()
+    artist, shows, songs = reads.all(*Artist.details_statements(artist_id))
+    artist = Artist.with_genres(artist)
+    if not artist:
+        abort(404)
+    data = artist.artist_to_dictionary(shows=shows, songs=songs, now=now)
 
     return render_template('pages/show_artist.html', artist=data)
 
 
 @app.route('/artists/<int:artist_id>/albums/<int:album_id>')
+@db.replicas.primary_reads
+@conditional_get.depends_on(album_validators)
+@page_cache.cached
 def show_album(artist_id, album_id):
-    album = Album.query.get(album_id)
-    artist = Artist.query.get(artist_id)
+    album, songs, artist = reads.all(
+        db.select(Album.title).where(Album.id == album_id),
+        db.select(Song.title).where(Song.album_id == album_id).order_by(
+            Song.id),
+        db.select(Artist.name).where(
+            Artist.id == artist_id, Artist.active()))
+    if not album or not artist:
+        abort(404)
 
     songs_data = []
-    for song in album.songs:
+    for song in songs:
         songs_data.append({
             'title': song.title
         })
 
     album_data = {
-        'title': album.title,
+        'title': album[0].title,
         'songs': songs_data,
-        'artist_name': artist.name,
+        'artist_name': artist[0].name,
         'artist_id': artist_id
     }
 
     return render_template('pages/show_album.html', album=album_data)
 
+
+@app.route('/artists/<int:artist_id>/delete', methods=['POST'])
+def delete_artist(artist_id):
+    artist = Artist.active_by_id(artist_id).first_or_404()
+    name = artist.name
+    pages = artist_pages(artist_id)
+    error = False
+
+    try:
+        soft_delete_artist(artist_id)
+        db.session.commit()
+        search.remove(Artist, artist_id)
+    except Exception as err:
+        db.session.rollback()
+        print(sys.exc_info())
+        error = True
+        flash('An error occurred. Artist {} could not be deleted. {}'.format(
+            name, err))
+    finally:
+        db.session.close()
+        if error:
+            return redirect(url_for('show_artist', artist_id=artist_id))
+        page_cache.delete(*pages)
+        page_cache.delete_prefix(
+            url_for('show_artist', artist_id=artist_id) + '/')
+        flash('The artist has been deleted.')
+    return redirect(url_for('index'))
+
 #  Update
 #  ----------------------------------------------------------------
 
 
 @app.route('/artists/<int:artist_id>/edit', methods=['GET'])
 def edit_artist(artist_id):
-    artist = Artist.query.get(artist_id)
+    artist = Artist.active_by_id(artist_id).first_or_404()
     form = ArtistForm(obj=artist)
-    form.genres.data = artist.genres
+    form.genres.data = [genre.name for genre in artist.genres]
     return render_template('forms/edit_artist.html', form=form, artist=artist)
 
 
 @app.route('/artists/<int:artist_id>/edit', methods=['POST'])
 def edit_artist_submission(artist_id):
-    artist = Artist.query.get(artist_id)
+    artist = Artist.active_by_id(artist_id).first_or_404()
     form = ArtistForm()
 
     if form.validate_on_submit():
         try:
             artist.name = form.name.data
-            artist.genres = form.genres.data
+            artist.genres = Genre.from_names(form.genres.data)
             artist.city = form.city.data
             artist.state = form.state.data
             artist.phone = form.phone.data
@@ -356,8 +559,14 @@ def edit_artist_submission(artist_id):
             artist.seeking_venue = form.seeking_venue.data
             artist.seeking_description = form.seeking_description.data
             artist.image_link = form.image_link.data
+            # the genres may be all that changed
+            artist.updated_at = datetime.now()
 
             db.session.commit()
+            search.update(artist)
+            page_cache.delete(*artist_pages(artist_id))
+            page_cache.delete_prefix(
+                url_for('show_artist', artist_id=artist_id) + '/')
             flash('Artist ' + form.name.data + ' was successfully updated!')
         except Exception as err:
             db.session.rollback()
@@ -377,21 +586,21 @@ def edit_artist_submission(artist_id):
 
 @app.route('/venues/<int:venue_id>/edit', methods=['GET'])
 def edit_venue(venue_id):
-    venue = Venue.query.get(venue_id)
+    venue = Venue.active_by_id(venue_id).first_or_404()
     form = VenueForm(obj=venue)
-    form.genres.data = venue.genres
+    form.genres.data = [genre.name for genre in venue.genres]
     return render_template('forms/edit_venue.html', form=form, venue=venue)
 
 
 @app.route('/venues/<int:venue_id>/edit', methods=['POST'])
 def edit_venue_submission(venue_id):
-    venue = Venue.query.get(venue_id)
+    venue = Venue.active_by_id(venue_id).first_or_404()
     form = VenueForm()
 
     if form.validate_on_submit():
         try:
             venue.name = form.name.data
-            venue.genres = form.genres.data
+            venue.genres = Genre.from_names(form.genres.data)
             venue.city = form.city.data
             venue.state = form.state.data
             venue.phone = form.phone.data
@@ -400,8 +609,12 @@ def edit_venue_submission(venue_id):
             venue.seeking_talent = form.seeking_talent.data
             venue.seeking_description = form.seeking_description.data
             venue.image_link = form.image_link.data
+            # the genres may be all that changed
+            venue.updated_at = datetime.now()
 
             db.session.commit()
+            search.update(venue)
+            page_cache.delete(*venue_pages(venue_id))
             flash('Venue ' + venue.name + ' was successfully updated!')
         except Exception as err:
             db.session.rollback()
@@ -438,6 +651,7 @@ def create_artist_submission():
             form.populate_obj(new_artist)
             db.session.add(new_artist)
             db.session.commit()
+            search.update(new_artist)
             flash('Artist ' + new_artist.name + ' was successfully listed!')
         except Exception as err:
             db.session.rollback()
@@ -460,24 +674,91 @@ def create_artist_submission():
 #  ----------------------------------------------------------------
 
 
+def encode_show_cursor(show):
+    return '{}_{}'.format(show.start_time.isoformat(), show.id)
+
+
+def decode_show_cursor(cursor):
+    try:
+        start_time, show_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(start_time), int(show_id)
+    except ValueError:
+        abort(400)
+
+
 @app.route('/shows')
+@conditional_get.depends_on(shows_validators)
 def shows():
-    shows = Show.query.all()
-    data = []
+    # keyset pagination on (start_time, id), so any page costs as much as
+    # the first one
+    per_page = app.config['SHOWS_PER_PAGE']
+    before = request.args.get('before')
+    after = request.args.get('after')
+
+    # pages after a cursor newer than the archive only read the shows table
+    archived_until = reads.scalar(Show.archived_until())
+    if after and not before:
+        after = decode_show_cursor(after)
+        shows = Show.covering(archived_until, since=after[0])
+    else:
+        shows = Show.covering(archived_until)
+    position = db.tuple_(shows.start_time, shows.id)
+
+    query = db.select(
+        shows.id,
+        shows.start_time,
+        shows.venue_id,
+        Venue.name.label('venue_name'),
+        shows.artist_id,
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link')
+    ).join(Venue, shows.venue_id == Venue.id).join(
+        Artist, shows.artist_id == Artist.id).where(
+        Venue.active(), Artist.active())
+
+    if before:
+        query = query.where(position < decode_show_cursor(before)).order_by(
+            desc(shows.start_time), desc(shows.id))
+    else:
+        if after:
+            query = query.where(position > after)
+        query = query.order_by(shows.start_time, shows.id)
 
-    for show in shows:
-        venue = Venue.query.get(show.venue_id)
-        artist = Artist.query.get(show.artist_id)
+    rows, = reads.all(query.limit(per_page + 1))
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if before:
+        rows.reverse()
 
+    data = []
+    for row in rows:
         data.append({
-            "venue_id": show.venue_id,
-            "venue_name": venue.name,
-            "artist_id": show.artist_id,
-            "artist_name": artist.name,
-            "artist_image_link": artist.image_link,
-            "start_time": show.start_time,
+            "venue_id": row.venue_id,
+            "venue_name": row.venue_name,
+            "artist_id": row.artist_id,
+            "artist_name": row.artist_name,
+            "artist_image_link": row.artist_image_link,
+            "start_time": row.start_time,
         })
-    return render_template('pages/shows.html', shows=data)
+
+    cursors = {
+        'before': None,
+        'after': None
+    }
+    if rows:
+        if (before and has_more) or after:
+            cursors['before'] = encode_show_cursor(rows[0])
+        if (not before and has_more) or before:
+            cursors['after'] = encode_show_cursor(rows[-1])
+
+    if request.accept_mimetypes.best == 'application/json':
+        for show in data:
+            show['start_time_formatted'] = format_datetime(
+                show['start_time'], 'full')
+            show['start_time'] = show['start_time'].isoformat()
+        return jsonify(shows=data, **cursors)
+
+    return render_template('pages/shows.html', shows=data, cursors=cursors)
 
 
 @app.route('/shows/create')
@@ -493,11 +774,10 @@ def create_show_submission():
     new_show = Show()
     form = ShowForm(request.form)
     artist_id = form.artist_id.data
-    artist = Artist.query.get(artist_id)
+    artist = Artist.active_by_id(artist_id).first()
     venue_id = form.venue_id.data
-    venue = Venue.query.get(venue_id)
+    venue = Venue.active_by_id(venue_id).first()
     start_time = form.start_time.data
-    shows = Show.query.filter_by(artist_id=artist_id).all()
 
     if (not artist):
         flash('Artist does not exists')
@@ -507,32 +787,19 @@ def create_show_submission():
         flash('Venue does not exists')
         return render_template('forms/new_show.html', form=form)
 
-    for show in shows:
-        show_venue = Venue.query.get(show.venue_id)
-
-        # Less than 3 hours difference between current show and artist's show
-        # (venue and artist's show are at the same city).
-        if (abs(start_time - show.start_time).total_seconds() < 10800 and
-                show_venue.state == venue.state and
-                show_venue.city == venue.city):
-            flash('Artist is busy at that time. Select ' +
-                  'a different time or artist.')
-            return render_template('forms/new_show.html', form=form)
-
-        # Less than 1 day difference between current show and artist's show
-        # (venue and artist's show are in different cities).
-        if (abs(start_time - show.start_time).total_seconds() < 86400 and
-                show_venue.state != venue.state and
-                show_venue.city != venue.city):
-            flash('Artist is busy at that time. Select ' +
-                  'a different time or artist.')
-            return render_template('forms/new_show.html', form=form)
+    if start_time and artist_is_busy(artist.id, venue, start_time):
+        flash('Artist is busy at that time. Select ' +
+              'a different time or artist.')
+        return render_template('forms/new_show.html', form=form)
 
     if form.validate_on_submit():
         try:
             form.populate_obj(new_show)
             db.session.add(new_show)
+            count_booked_shows([(venue.id, artist.id, new_show.start_time)])
             db.session.commit()
+            page_cache.delete(url_for('show_artist', artist_id=artist.id),
+                              url_for('show_venue', venue_id=venue.id))
             flash('Show was successfully listed!')
         except Exception as err:
             db.session.rollback()
@@ -551,6 +818,274 @@ def create_show_submission():
     return redirect(url_for('index'))
 
 
+def warn_unshared_page_cache():
+    # for the commands: they evict from their own process's pages alone
+    if page_cache.backend is not None and not page_cache.shared:
+        click.echo(
+            'Warning: PAGE_CACHE_BACKEND is {!r}; running servers keep their '
+            'cached pages for up to {} s. Use the sqlite backend for this '
+            'command to evict them.'.format(
+                app.config['PAGE_CACHE_BACKEND'],
+                app.config['PAGE_CACHE_TTL']), err=True)
+
+
+def evict_booked_pages(bookings):
+    page_cache.delete(*{
+        url_for('show_artist', artist_id=booking['artist_id'])
+        for booking in bookings})
+    page_cache.delete(*{
+        url_for('show_venue', venue_id=booking['venue_id'])
+        for booking in bookings})
+
+
+@app.route('/shows/bulk', methods=['POST'])
+def bulk_create_shows():
+    # accepts a JSON list, or CSV as the request body or an uploaded file
+    upload = request.files.get('file')
+    try:
+        if upload:
+            data = upload.read().decode('utf-8')
+            format = bookings_format(upload.mimetype, upload.filename)
+        else:
+            data = request.get_data(as_text=True)
+            format = bookings_format(request.mimetype)
+        rows = parse_bookings(data, format)
+        accepted, rejected = book_shows(rows)
+        db.session.commit()
+        evict_booked_pages(accepted)
+    except ValueError as err:
+        db.session.rollback()
+        return jsonify(error='Could not read bookings. {}'.format(err)), 400
+    except Exception:
+        db.session.rollback()
+        print(sys.exc_info())
+        return jsonify(
+            error='An error occurred. Shows could not be booked.'), 500
+    finally:
+        db.session.close()
+
+    return jsonify(created=len(accepted), rejected=rejected)
+
+
+@app.cli.command('book-shows')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+def book_shows_command(path):
+    """Book every show listed in a CSV or JSON file."""
+    try:
+        with open(path, encoding='utf-8') as bookings_file:
+            rows = parse_bookings(bookings_file.read(),
+                                  bookings_format(filename=path))
+    except ValueError as err:
+        raise click.ClickException('Could not read bookings. {}'.format(err))
+    accepted, rejected = book_shows(rows)
+    db.session.commit()
+    with app.test_request_context():
+        evict_booked_pages(accepted)
+    warn_unshared_page_cache()
+
+    click.echo('{} shows listed, {} rejected.'.format(
+        len(accepted), len(rejected)))
+    for rejection in rejected:
+        click.echo('row {}: {}'.format(rejection['row'], rejection['reason']))
+
+
+@app.cli.command('import')
+@click.argument('kind', type=click.Choice(list(KINDS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=1000, help='Rows inserted per commit.')
+@click.option('--format', type=click.Choice(['csv', 'ndjson']),
+              help='Defaults to csv for .csv files, ndjson otherwise.')
+def import_command(kind, path, batch_size, format):
+    """Import venues, artists, shows etc. from a CSV or NDJSON file.
+
+    Rows are checked with the same forms as the site's pages; rows failing
+    them are reported and skipped. Import genres, venues and artists before
+    the albums, songs and shows referring to them.
+    """
+    started = time.perf_counter()
+    imported = 0
+    rejected = 0
+    with open(path, encoding='utf-8', newline='') as rows_file:
+        rows = read_rows(rows_file, file_format(path, format))
+        for inserted, rejections in import_rows(kind, rows, batch_size):
+            imported += inserted
+            rejected += len(rejections)
+            for number, reason in rejections:
+                click.echo('row {}: {}'.format(number, reason), err=True)
+            click.echo('{} {} imported, {:.0f} rows/s'.format(
+                imported, kind,
+                (imported + rejected) / (time.perf_counter() - started)),
+                err=True)
+    with app.test_request_context():
+        page_cache.delete_prefix('/')
+    warn_unshared_page_cache()
+
+    click.echo('{} {} imported, {} rejected in {:.1f} s.'.format(
+        imported, kind, rejected, time.perf_counter() - started))
+
+
+@app.cli.command('export')
+@click.argument('kind', type=click.Choice(list(KINDS)))
+@click.argument('path', type=click.Path(dir_okay=False, writable=True))
+@click.option('--batch-size', default=1000, help='Rows fetched at a time.')
+@click.option('--format', type=click.Choice(['csv', 'ndjson']),
+              help='Defaults to csv for .csv files, ndjson otherwise.')
+def export_command(kind, path, batch_size, format):
+    """Export venues, artists, shows etc. to a CSV or NDJSON file.
+
+    The file can be read back with the import command.
+    """
+    started = time.perf_counter()
+    exported = 0
+    with open(path, 'w', encoding='utf-8', newline='') as rows_file:
+        for exported in write_rows(rows_file, kind,
+                                   export_rows(kind, batch_size),
+                                   file_format(path, format)):
+            click.echo('{} {} exported, {:.0f} rows/s'.format(
+                exported, kind, exported / (time.perf_counter() - started)),
+                err=True)
+
+    click.echo('{} {} exported in {:.1f} s.'.format(
+        exported, kind, time.perf_counter() - started))
+
+
+@app.cli.command('roll-show-counts')
+def roll_show_counts_command():
+    """Move shows that have started from the upcoming to the past counts.
+
+    Run it from cron, e.g. every few minutes.
+    """
+    started = roll_show_counts()
+    db.session.commit()
+    click.echo('{} shows moved to past.'.format(started))
+
+
+@app.cli.command('rebuild-show-counts')
+def rebuild_show_counts_command():
+    """Recount the upcoming and past shows of every venue and artist."""
+    past = rebuild_show_counts()
+    db.session.commit()
+    click.echo('Show counts rebuilt, {} past shows.'.format(past))
+
+
+@app.cli.command('archive-shows')
+@click.option('--days', type=int,
+              default=lambda: app.config['SHOW_ARCHIVE_DAYS'],
+              help='Archive shows that started more than this many days '
+                   'ago.')
+@click.option('--batch-size', default=1000, help='Shows moved per commit.')
+def archive_shows_command(days, batch_size):
+    """Move old shows from the shows table to archived_shows.
+
+    Run it from cron, e.g. nightly.
+    """
+    moved = archive_shows(datetime.now() - timedelta(days=days), batch_size)
+    click.echo('{} shows archived.'.format(moved))
+
+
+@app.cli.command('purge-deleted')
+@click.option('--batch-size', type=int,
+              default=lambda: app.config['PURGE_BATCH_SIZE'],
+              help='Rows removed per commit.')
+@click.option('--pause', type=float,
+              default=lambda: app.config['PURGE_PAUSE'],
+              help='Seconds to sleep between full batches.')
+def purge_deleted_command(batch_size, pause):
+    """Remove deleted venues and artists along with their shows.
+
+    Run it from cron, e.g. nightly.
+    """
+    purged = purge_deleted(batch_size, pause)
+    click.echo(', '.join('{} {}'.format(removed, table)
+                         for table, removed in purged.items()) + ' purged.')
+
+
+@app.cli.command('seed')
+@click.option('--venues', default=100)
+@click.option('--artists', default=100)
+@click.option('--shows', default=1000)
+@click.option('--albums', default=50)
+@click.option('--songs', default=500)
+@click.option('--seed', default=0, help='Same seed, same data.')
+def seed_command(venues, artists, shows, albums, songs, seed):
+    """Fill the database with generated venues, artists and shows."""
+    generate(venues=venues, artists=artists, shows=shows, albums=albums,
+             songs=songs, seed=seed)
+    click.echo('Seeded {} venues, {} artists and {} shows.'.format(
+        venues, artists, shows))
+
+
+@app.cli.command('benchmark-search')
+@click.argument('terms', nargs=-1, required=True)
+@click.option('--runs', default=100, help='Searches per term and backend.')
+def benchmark_search_command(terms, runs):
+    """Time venue and artist searches on each available backend."""
+    per_page = app.config['SEARCH_RESULTS_PER_PAGE']
+    backends = [('in-process index', lambda model, term: search.index(
+        model).search(term, 1, per_page))]
+    if search.uses_database():
+        backends.append(('postgres', lambda model, term:
+                         search.search_database(model, term, 1, per_page)))
+
+    for model in (Venue, Artist):
+        search.index(model)
+        for term in terms:
+            for name, run in backends:
+                started = time.perf_counter()
+                for _ in range(runs):
+                    count, results = run(model, term)
+                elapsed = (time.perf_counter() - started) / runs * 1000
+                click.echo('{} {!r} via {}: {} matches, {:.3f} ms'.format(
+                    model.__tablename__, term, name, count, elapsed))
+
+
+@app.cli.command('benchmark-dates')
+@click.option('--tiles', default=10000, help='Show tiles per render.')
+@click.option('--times', default=1000,
+              help='Distinct start times among the tiles.')
+@click.option('--runs', default=5, help='Renders per filter.')
+def benchmark_dates_command(tiles, times, runs):
+    """Time rendering /shows tiles with each way of formatting dates."""
+    start = datetime.now().replace(minute=0, second=0, microsecond=0)
+    shows = [{
+        'venue_id': number % 100,
+        'venue_name': 'Venue {}'.format(number % 100),
+        'artist_id': number % 100,
+        'artist_name': 'Artist {}'.format(number % 100),
+        'artist_image_link': None,
+        'start_time': start + timedelta(hours=number % times)
+    } for number in range(tiles)]
+
+    def babel_format(value, format='medium'):
+        # the filter as it was, parsing the pattern and locale every time
+        return babel.dates.format_datetime(
+            value, PATTERNS.get(format, format), locale='en')
+
+    filters = [
+        ('babel per call', babel_format, False),
+        ('cold cache', date_formats.filter, True),
+        ('warm cache', date_formats.filter, False),
+    ]
+    with app.test_request_context('/shows'):
+        app.preprocess_request()
+        for name, date_filter, clear in filters:
+            app.jinja_env.filters['datetime'] = date_filter
+            app.jinja_env.cache.clear()
+            elapsed = []
+            for _ in range(runs):
+                if clear:
+                    date_formats.format.cache_clear()
+                started = time.perf_counter()
+                render_template('pages/shows.html', shows=shows,
+                                cursors={'before': None, 'after': None})
+                elapsed.append(time.perf_counter() - started)
+            click.echo('{:<15} {:8.1f} ms per render, {:6.2f} us per '
+                       'tile'.format(name, min(elapsed) * 1000,
+                                     min(elapsed) / tiles * 1000000))
+    app.jinja_env.filters['datetime'] = date_formats.filter
+    app.jinja_env.cache.clear()
+
+
 @app.errorhandler(400)
 def bad_request_error(error):
     return render_template('errors/400.html'), 400
@@ -581,16 +1116,17 @@ def server_error(error):
     return render_template('errors/500.html'), 500
 
 
+# in debug mode too, for the request lines of instrumentation.py
+file_handler = FileHandler(app.config['LOG_FILE'])
+file_handler.setFormatter(
+    Formatter(
+        '%(asctime)s %(levelname)s: %(message)s ' +
+        '[in %(pathname)s:%(lineno)d]')
+)
+app.logger.setLevel(logging.INFO)
+file_handler.setLevel(logging.INFO)
+app.logger.addHandler(file_handler)
 if not app.debug:
-    file_handler = FileHandler('error.log')
-    file_handler.setFormatter(
-        Formatter(
-            '%(asctime)s %(levelname)s: %(message)s ' +
-            '[in %(pathname)s:%(lineno)d]')
-    )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
     app.logger.info('errors')
 
 # ----------------------------------------------------------------------------#
@@ -0,0 +1,31 @@
+from sqlalchemy import select
+from models import db, Show, ArchivedShow
+from counters import rolled_at
+
+COLUMNS = ('id', 'venue_id', 'artist_id', 'start_time', 'updated_at')
+
+
+def archive_shows(before, batch_size=1000):
+    # Moves the shows that started before `before` from shows to
+    # archived_shows, oldest first and one transaction per batch, so the
+    # shows table only holds recent and upcoming shows. Shows the counters
+    # have not rolled to past yet stay, as roll_show_counts() only reads
+    # the shows table.
+    before = min(before, rolled_at())
+    db.session.commit()
+
+    moved = 0
+    while True:
+        ids = [show_id for (show_id,) in db.session.query(Show.id).filter(
+            Show.start_time < before).order_by(
+            Show.start_time, Show.id).limit(batch_size)]
+        if not ids:
+            return moved
+
+        db.session.execute(ArchivedShow.__table__.insert().from_select(
+            COLUMNS,
+            select(*[Show.__table__.c[column] for column in COLUMNS]).where(
+                Show.id.in_(ids))))
+        db.session.execute(Show.__table__.delete().where(Show.id.in_(ids)))
+        db.session.commit()
+        moved += len(ids)
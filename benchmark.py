@@ -0,0 +1,628 @@
+# ----------------------------------------------------------------------------#
+# Benchmarks every route of app.py against seeded databases.
+#
+#   python benchmark.py --sizes 100,1000
+#   python benchmark.py --postgres postgresql://localhost/fyyur_bench
+#   python benchmark.py --baseline benchmark_baseline.json --update-baseline
+#   python benchmark.py --compare-read-paths --clients 16
+#   python benchmark.py --delete-history 100,1000,10000
+#   python benchmark.py --sizes 100 --listing-memory 1000,10000,100000
+#   python benchmark.py --sizes 1000 --api-vs-html
+#
+# The databases given are dropped and re-created, so never point this at
+# real data.
+# ----------------------------------------------------------------------------#
+
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+import click
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app import app, page_cache, search
+from cascade import purge_deleted
+from counters import rebuild_show_counts
+from models import db, Venue, Artist, Album, Show, ArchivedShow
+from seed import generate
+
+statements = {'count': 0}
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def count_statement(conn, cursor, statement, parameters, context,
+                    executemany):
+    statements['count'] += 1
+
+
+def venue_form(number):
+    return {
+        'name': 'Benchmark Venue {}'.format(number),
+        'city': 'Austin',
+        'state': 'TX',
+        'address': '1 Main St',
+        'phone': '512-555-0100',
+        'genres': ['Jazz', 'Blues'],
+    }
+
+
+def artist_form(number):
+    return {
+        'name': 'Benchmark Artist {}'.format(number),
+        'city': 'Austin',
+        'state': 'TX',
+        'phone': '512-555-0100',
+        'genres': ['Rock n Roll'],
+    }
+
+
+def show_form(ids, number):
+    return {
+        'artist_id': ids['artists'][number % len(ids['artists'])],
+        'venue_id': ids['venues'][number % len(ids['venues'])],
+        'start_time': (datetime.now() + timedelta(
+            days=800 + number)).strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def bulk_bookings(ids, number):
+    start = datetime.now() + timedelta(days=2000 + number * 10)
+    return [{
+        'artist_id': ids['artists'][(number + day) % len(ids['artists'])],
+        'venue_id': ids['venues'][(number + day) % len(ids['venues'])],
+        'start_time': (start + timedelta(days=day)).isoformat(),
+    } for day in range(10)]
+
+
+def pick(values, number):
+    return values[number % len(values)]
+
+
+# (label, endpoint, method, url, request arguments) for every route; url and
+# request arguments are built from the seeded ids and the request number.
+SCENARIOS = [
+    ('home', 'index', 'GET', lambda ids, n: '/', None),
+    ('venues', 'venues', 'GET', lambda ids, n: '/venues', None),
+    ('venues by genre', 'venues', 'GET',
+     lambda ids, n: '/venues?genre=Jazz', None),
+    ('venues by name', 'venues', 'GET',
+     lambda ids, n: '/venues?sort=name', None),
+    ('artists', 'artists', 'GET', lambda ids, n: '/artists', None),
+    ('newest artists', 'artists', 'GET',
+     lambda ids, n: '/artists?sort=newest', None),
+    ('artists by city', 'artists', 'GET',
+     lambda ids, n: '/artists?sort=city&genre=Jazz', None),
+    ('shows', 'shows', 'GET', lambda ids, n: '/shows', None),
+    ('venue', 'show_venue', 'GET',
+     lambda ids, n: '/venues/{}'.format(pick(ids['venues'], n)), None),
+    ('artist', 'show_artist', 'GET',
+     lambda ids, n: '/artists/{}'.format(pick(ids['artists'], n)), None),
+    ('album', 'show_album', 'GET',
+     lambda ids, n: '/artists/{}/albums/{}'.format(*pick(ids['albums'], n)),
+     None),
+    ('search venues', 'search_venues', 'POST',
+     lambda ids, n: '/venues/search',
+     lambda ids, n: {'data': {'search_term': pick(['blu', 'club', 'ja'], n)}}),
+    ('search artists', 'search_artists', 'POST',
+     lambda ids, n: '/artists/search',
+     lambda ids, n: {'data': {'search_term': pick(['the', 'moon', 'ro'], n)}}),
+    ('suggest venues', 'suggest_venues', 'GET',
+     lambda ids, n: '/venues/suggest?q=' + pick(['b', 'ne', 'gol'], n), None),
+    ('suggest artists', 'suggest_artists', 'GET',
+     lambda ids, n: '/artists/suggest?q=' + pick(['t', 'ec', 'the r'], n),
+     None),
+    ('new venue form', 'create_venue_form', 'GET',
+     lambda ids, n: '/venues/create', None),
+    ('new artist form', 'create_artist_form', 'GET',
+     lambda ids, n: '/artists/create', None),
+    ('new show form', 'create_shows', 'GET',
+     lambda ids, n: '/shows/create', None),
+    ('edit venue form', 'edit_venue', 'GET',
+     lambda ids, n: '/venues/{}/edit'.format(pick(ids['venues'], n)), None),
+    ('edit artist form', 'edit_artist', 'GET',
+     lambda ids, n: '/artists/{}/edit'.format(pick(ids['artists'], n)), None),
+    ('api venues', 'api_collection', 'GET',
+     lambda ids, n: '/api/v1/venues', None),
+    ('api artist fields', 'api_collection', 'GET',
+     lambda ids, n: '/api/v1/artists?fields=name,city&per_page=200', None),
+    ('api shows ndjson', 'api_collection', 'GET',
+     lambda ids, n: '/api/v1/shows',
+     lambda ids, n: {'headers': {'Accept': 'application/x-ndjson',
+                                 'Accept-Encoding': 'gzip'}}),
+    ('api venue', 'api_record', 'GET',
+     lambda ids, n: '/api/v1/venues/{}'.format(pick(ids['venues'], n)),
+     None),
+    ('metrics', 'metrics', 'GET', lambda ids, n: '/admin/metrics', None),
+    ('pool', 'pool', 'GET', lambda ids, n: '/admin/pool', None),
+    ('create venue', 'create_venue_submission', 'POST',
+     lambda ids, n: '/venues/create',
+     lambda ids, n: {'data': venue_form(n)}),
+    ('create artist', 'create_artist_submission', 'POST',
+     lambda ids, n: '/artists/create',
+     lambda ids, n: {'data': artist_form(n)}),
+    ('edit venue', 'edit_venue_submission', 'POST',
+     lambda ids, n: '/venues/{}/edit'.format(pick(ids['venues'], n)),
+     lambda ids, n: {'data': venue_form(n)}),
+    ('edit artist', 'edit_artist_submission', 'POST',
+     lambda ids, n: '/artists/{}/edit'.format(pick(ids['artists'], n)),
+     lambda ids, n: {'data': artist_form(n)}),
+    ('create show', 'create_show_submission', 'POST',
+     lambda ids, n: '/shows/create',
+     lambda ids, n: {'data': show_form(ids, n)}),
+    ('bulk shows', 'bulk_create_shows', 'POST',
+     lambda ids, n: '/shows/bulk',
+     lambda ids, n: {'json': bulk_bookings(ids, n)}),
+    # Runs last: every request deletes a different venue.
+    ('delete venue', 'delete_venue', 'POST',
+     lambda ids, n: '/venues/{}/delete'.format(ids['venues'][-1 - n]), None),
+    ('delete artist', 'delete_artist', 'POST',
+     lambda ids, n: '/artists/{}/delete'.format(ids['artists'][-1 - n]),
+     None),
+]
+
+
+# Scenarios held to a p99 latency (ms) whatever the baseline: typeahead
+# suggestions come on every keystroke.
+P99_BUDGETS_MS = {
+    'suggest venues': 10,
+    'suggest artists': 10,
+}
+
+# The paginated venues and artists pages (see listings.py).
+LISTING_ENDPOINTS = ('venues', 'artists')
+
+# Routes served by reads.Reads, and so by the asyncio engine with ASYNC_READS.
+READ_ENDPOINTS = ('index', 'venues', 'artists', 'shows', 'show_venue',
+                  'show_artist', 'show_album')
+
+
+def percentile(ordered, percent):
+    rank = max(int(round(percent / 100.0 * len(ordered))) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def prepare(uri, size, seed):
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    search.indexes.clear()
+    search.prefix_indexes.clear()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        generate(venues=size, artists=size, shows=size * 10,
+                 albums=size // 2, songs=size * 5, seed=seed)
+        return {
+            'venues': [venue_id for (venue_id,) in db.session.query(
+                Venue.id).order_by(Venue.id)],
+            'artists': [artist_id for (artist_id,) in db.session.query(
+                Artist.id).order_by(Artist.id)],
+            'albums': db.session.query(Album.artist_id, Album.id).order_by(
+                Album.id).all(),
+        }
+
+
+def run(ids, requests, warmup):
+    client = app.test_client()
+    results = {}
+
+    for label, endpoint, method, url, arguments in SCENARIOS:
+        latencies = []
+        counts = []
+        for number in range(warmup + requests):
+            kwargs = arguments(ids, number) if arguments else {}
+            statements['count'] = 0
+            started = time.perf_counter()
+            response = client.open(url(ids, number), method=method, **kwargs)
+            # streamed responses are only produced as they are read
+            response.get_data()
+            elapsed = time.perf_counter() - started
+            if response.status_code >= 500:
+                raise click.ClickException('{} {} returned {}'.format(
+                    method, url(ids, number), response.status_code))
+            if number >= warmup:
+                latencies.append(elapsed * 1000)
+                counts.append(statements['count'])
+
+        latencies.sort()
+        results[label] = {
+            'requests_per_second': round(len(latencies) / (
+                sum(latencies) / 1000), 1),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'statements': max(counts),
+        }
+
+    return results
+
+
+def run_concurrently(ids, clients, requests):
+    # Every client is a thread with its own test client, going through the
+    # read-only scenarios `requests` times.
+    scenarios = [scenario for scenario in SCENARIOS
+                 if scenario[1] in READ_ENDPOINTS]
+    latencies = []
+    failures = []
+    lock = threading.Lock()
+
+    def client_requests(client_number):
+        client = app.test_client()
+        for number in range(requests):
+            for label, endpoint, method, url, arguments in scenarios:
+                path = url(ids, client_number * requests + number)
+                started = time.perf_counter()
+                response = client.open(path, method=method)
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed * 1000)
+                    if response.status_code >= 500:
+                        failures.append(path)
+
+    threads = [threading.Thread(target=client_requests, args=(number,))
+               for number in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    if failures:
+        raise click.ClickException('{} returned errors'.format(
+            ', '.join(sorted(set(failures)))))
+    latencies.sort()
+    return {
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+    }
+
+
+def compare_reads(name, ids, clients, requests):
+    async_reads = app.config['ASYNC_READS']
+    click.echo('\n{}, read-only routes, {} clients'.format(name, clients))
+    click.echo('{:<20} {:>9} {:>9} {:>9} {:>9}'.format(
+        'read path', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms'))
+    try:
+        for path in ('sync', 'async'):
+            app.config['ASYNC_READS'] = path == 'async'
+            result = run_concurrently(ids, clients, requests)
+            click.echo('{:<20} {:>9} {:>9} {:>9} {:>9}'.format(
+                path, result['requests_per_second'], result['p50_ms'],
+                result['p95_ms'], result['p99_ms']))
+    finally:
+        app.config['ASYNC_READS'] = async_reads
+
+
+def add_history(ids, venue_id, artist_id, shows):
+    # `shows` shows at each of venue_id and artist_id, with the other venues
+    # and artists of the database, the older quarter of them archived
+    # already. Inserted as rows, booking conflicts and all.
+    now = datetime.now().replace(microsecond=0)
+    archived_until = now - timedelta(hours=shows // 4)
+    venues = [other for other in ids['venues'] if other != venue_id]
+    artists = [other for other in ids['artists'] if other != artist_id]
+    rows = []
+    for number in range(shows):
+        start_time = now + timedelta(hours=number - shows // 2)
+        rows.append({'venue_id': venue_id, 'artist_id': pick(
+            artists, number), 'start_time': start_time, 'updated_at': now})
+        rows.append({'venue_id': pick(venues, number), 'artist_id': artist_id,
+                     'start_time': start_time, 'updated_at': now})
+    shows_table = Show.__table__
+    old = shows_table.c.start_time < archived_until
+    with app.app_context():
+        db.session.execute(shows_table.insert(), rows)
+        db.session.execute(ArchivedShow.__table__.insert().from_select(
+            list(shows_table.c.keys()), shows_table.select().where(old)))
+        archived = db.session.execute(
+            shows_table.delete().where(old)).rowcount
+        rebuild_show_counts()
+        db.session.commit()
+    return archived
+
+
+def delete_history_run(name, ids, histories):
+    # Deletes a venue and an artist with more and more shows behind them;
+    # both take a fixed number of statements, so their time should barely
+    # grow with the history. Then purges them, without pausing, in batches
+    # of PURGE_BATCH_SIZE rows.
+    client = app.test_client()
+    click.echo('\n{}, deleting with history'.format(name))
+    click.echo('{:<20} {:>9} {:>9} {:>9} {:>6}'.format(
+        'route', 'shows', 'archived', 'ms', 'sql'))
+    for number, shows in enumerate(histories):
+        venue_id, artist_id = ids['venues'][number], ids['artists'][number]
+        archived = add_history(ids, venue_id, artist_id, shows)
+        for label, path in (
+                ('delete venue', '/venues/{}/delete'.format(venue_id)),
+                ('delete artist', '/artists/{}/delete'.format(artist_id))):
+            statements['count'] = 0
+            started = time.perf_counter()
+            response = client.post(path)
+            elapsed = time.perf_counter() - started
+            if response.status_code >= 500:
+                raise click.ClickException('POST {} returned {}'.format(
+                    path, response.status_code))
+            click.echo('{:<20} {:>9} {:>9} {:>9} {:>6}'.format(
+                label, shows, archived, round(elapsed * 1000, 2),
+                statements['count']))
+
+        statements['count'] = 0
+        started = time.perf_counter()
+        with app.app_context():
+            purge_deleted(app.config['PURGE_BATCH_SIZE'], pause=0)
+        elapsed = time.perf_counter() - started
+        click.echo('{:<20} {:>9} {:>9} {:>9} {:>6}'.format(
+            'purge', shows, archived, round(elapsed * 1000, 2),
+            statements['count']))
+
+
+def listing_memory(database, uri, sizes, seed):
+    # Peak memory allocated while serving each listing page, over catalogs
+    # of growing size. Pages read a bounded number of rows, so it should
+    # stay flat.
+    peaks = {}
+    for size in sizes:
+        app.config['SQLALCHEMY_DATABASE_URI'] = uri
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            generate(venues=size, artists=size, shows=0, albums=0, songs=0,
+                     seed=seed)
+        client = app.test_client()
+        for label, endpoint, method, url, arguments in SCENARIOS:
+            if endpoint not in LISTING_ENDPOINTS:
+                continue
+            # compiles the template and warms the pool
+            client.get(url(None, 0))
+            tracemalloc.start()
+            response = client.get(url(None, 0))
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            if response.status_code != 200:
+                raise click.ClickException('GET {} returned {}'.format(
+                    url(None, 0), response.status_code))
+            peaks.setdefault(label, []).append(peak)
+
+    click.echo('\n{}, peak KiB per request by venues+artists'.format(
+        database))
+    click.echo('{:<20}'.format('route') + ''.join(
+        '{:>10}'.format(size) for size in sizes))
+    for label, route_peaks in peaks.items():
+        click.echo('{:<20}'.format(label) + ''.join(
+            '{:>10}'.format(peak // 1024) for peak in route_peaks))
+
+
+# links of the venues and artists pages a scraper follows
+NEXT_PAGE = re.compile(r'href="([^"]*after=[^"]*)">Next')
+DETAIL_PAGE = re.compile(r'href="/(?:venues|artists)/(\d+)"')
+
+
+def scrape(client, kind):
+    # What a client of the HTML has to do to get every venue or artist in
+    # full: walk the listing pages and open each one's own page.
+    responses = []
+    url = '/{}?sort=name&per_page={}'.format(
+        kind, app.config['LISTINGS_MAX_PER_PAGE'])
+    while url:
+        responses.append(client.get(url.replace('&amp;', '&')))
+        html = responses[-1].get_data(as_text=True)
+        for record_id in DETAIL_PAGE.findall(html):
+            responses.append(client.get('/{}/{}'.format(kind, record_id)))
+        links = NEXT_PAGE.findall(html)
+        url = links[0] if links else None
+    return responses
+
+
+def json_pages(client, kind):
+    responses = []
+    url = '/api/v1/{}?per_page={}'.format(
+        kind, app.config['LISTINGS_MAX_PER_PAGE'])
+    while url:
+        responses.append(client.get(url))
+        url = responses[-1].get_json()['next']
+    return responses
+
+
+def ndjson(encoding=None):
+    headers = {'Accept': 'application/x-ndjson'}
+    if encoding:
+        headers['Accept-Encoding'] = encoding
+    return lambda client, kind: [
+        client.get('/api/v1/' + kind, headers=headers)]
+
+
+# Ways of getting every venue or artist with all of its fields.
+TRANSFERS = [
+    ('html pages', scrape),
+    ('api json pages', json_pages),
+    ('api ndjson', ndjson()),
+    ('api ndjson gzip', ndjson('gzip')),
+    ('api ndjson br', ndjson('br')),
+]
+
+
+def compare_transfers(name):
+    # Requests, bytes on the wire, time and peak memory of getting whole
+    # collections through the API against scraping the same out of the
+    # HTML pages. Timed first, then measured again under tracemalloc.
+    client = app.test_client()
+    click.echo('\n{}, every venue or artist in full'.format(name))
+    click.echo('{:<20} {:>9} {:>9} {:>11} {:>9} {:>9}'.format(
+        'transfer', 'kind', 'requests', 'KiB', 'ms', 'peak KiB'))
+    for kind in ('venues', 'artists'):
+        for label, transfer in TRANSFERS:
+            started = time.perf_counter()
+            responses = transfer(client, kind)
+            sizes = [len(response.get_data()) for response in responses]
+            elapsed = time.perf_counter() - started
+            failed = [response for response in responses
+                      if response.status_code != 200]
+            if failed:
+                raise click.ClickException('{} {} returned {}'.format(
+                    label, kind, failed[0].status_code))
+
+            tracemalloc.start()
+            for response in transfer(client, kind):
+                response.get_data()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            click.echo('{:<20} {:>9} {:>9} {:>11} {:>9} {:>9}'.format(
+                label, kind, len(responses), sum(sizes) // 1024,
+                round(elapsed * 1000, 2), peak // 1024))
+
+
+def report(name, results):
+    click.echo('\n{}'.format(name))
+    click.echo('{:<20} {:>9} {:>9} {:>9} {:>9} {:>6}'.format(
+        'route', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'sql'))
+    for label, result in results.items():
+        click.echo('{:<20} {:>9} {:>9} {:>9} {:>9} {:>6}'.format(
+            label, result['requests_per_second'], result['p50_ms'],
+            result['p95_ms'], result['p99_ms'], result['statements']))
+    for label, budget in P99_BUDGETS_MS.items():
+        if label in results:
+            click.echo('{}: p99 {} ms, budget {} ms'.format(
+                label, results[label]['p99_ms'], budget))
+
+
+def over_budget(runs):
+    return ['{} / {}: p99 {} ms, budget {} ms'.format(
+        name, label, results[label]['p99_ms'], budget)
+        for name, results in runs.items()
+        for label, budget in P99_BUDGETS_MS.items()
+        if label in results and results[label]['p99_ms'] > budget]
+
+
+def regressions(runs, baseline, tolerance):
+    # A route regresses when it issues more statements than the baseline, or
+    # when its p95 latency grows past the tolerance (ignoring sub-ms noise).
+    failures = []
+    for name, results in runs.items():
+        for label, result in results.items():
+            expected = baseline.get(name, {}).get(label)
+            if expected is None:
+                continue
+            if result['statements'] > expected['statements']:
+                failures.append('{} / {}: {} statements, baseline {}'.format(
+                    name, label, result['statements'],
+                    expected['statements']))
+            limit = expected['p95_ms'] * (1 + tolerance)
+            if result['p95_ms'] > limit and \
+                    result['p95_ms'] - expected['p95_ms'] > 1:
+                failures.append('{} / {}: p95 {} ms, baseline {} ms'.format(
+                    name, label, result['p95_ms'], expected['p95_ms']))
+    return failures
+
+
+@click.command()
+@click.option('--sizes', default='100,1000',
+              help='Comma separated numbers of venues and artists; each run '
+                   'also gets 10x shows, 5x songs and 0.5x albums.')
+@click.option('--requests', default=50, help='Measured requests per route.')
+@click.option('--warmup', default=3, help='Unmeasured requests per route.')
+@click.option('--seed', default=0, help='Seed of the data generator.')
+@click.option('--postgres', envvar='BENCHMARK_POSTGRES_URI',
+              help='URI of a scratch Postgres database to benchmark too.')
+@click.option('--baseline', type=click.Path(dir_okay=False),
+              help='JSON results to compare against.')
+@click.option('--update-baseline', is_flag=True,
+              help='Write these results to --baseline instead of comparing '
+                   '(needed to create the file).')
+@click.option('--tolerance', default=0.5,
+              help='Allowed p95 growth over the baseline (0.5 = 50%).')
+@click.option('--compare-read-paths', is_flag=True,
+              help='Also drive the read-only routes from concurrent clients, '
+                   'once through the sync and once through the async read '
+                   'path.')
+@click.option('--clients', default=8,
+              help='Concurrent clients of --compare-read-paths.')
+@click.option('--listing-memory', 'listing_memory_sizes',
+              help='Comma separated numbers of venues and artists; the peak '
+                   'memory of a request to each listing page is measured '
+                   'over catalogs of these sizes.')
+@click.option('--delete-history',
+              help='Comma separated numbers of shows; a venue and an artist '
+                   'with that many shows behind them are deleted after each '
+                   'run.')
+@click.option('--api-vs-html', is_flag=True,
+              help='Also get every venue and artist through the JSON API, '
+                   'and by scraping the HTML pages, and compare the two.')
+def main(sizes, requests, warmup, seed, postgres, baseline, update_baseline,
+         tolerance, compare_read_paths, clients, listing_memory_sizes,
+         delete_history, api_vs_html):
+    if baseline and not update_baseline and not os.path.exists(baseline):
+        # rather than passing with nothing to compare against
+        raise click.ClickException(
+            '{} does not exist; record it with --update-baseline'.format(
+                baseline))
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.logger.setLevel(logging.WARNING)
+    # measure the routes themselves, not the page cache
+    page_cache.backend = None
+
+    databases = []
+    sqlite_path = os.path.join(tempfile.mkdtemp(), 'benchmark.sqlite')
+    databases.append(('sqlite', 'sqlite:///' + sqlite_path))
+    if postgres:
+        databases.append(('postgres', postgres))
+
+    covered = {scenario[1] for scenario in SCENARIOS}
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint not in covered and rule.endpoint != 'static':
+            click.echo('warning: no scenario for {}'.format(rule.rule))
+
+    runs = {}
+    for database, uri in databases:
+        for size in [int(size) for size in sizes.split(',')]:
+            ids = prepare(uri, size, seed)
+            if len(ids['venues']) <= warmup + requests:
+                raise click.ClickException(
+                    'size {} is too small to delete {} venues'.format(
+                        size, warmup + requests))
+            name = '{} / {} venues+artists'.format(database, size)
+            if compare_read_paths:
+                # before run(), whose last scenario deletes venues
+                compare_reads(name, ids, clients, requests)
+            runs[name] = run(ids, requests, warmup)
+            report(name, runs[name])
+            if api_vs_html:
+                compare_transfers(name)
+            if delete_history:
+                delete_history_run(name, ids, [
+                    int(shows) for shows in delete_history.split(',')])
+        if listing_memory_sizes:
+            listing_memory(database, uri, [
+                int(size) for size in listing_memory_sizes.split(',')], seed)
+
+    if baseline and update_baseline:
+        with open(baseline, 'w') as baseline_file:
+            json.dump(runs, baseline_file, indent=2, sort_keys=True)
+        click.echo('\nBaseline written to {}'.format(baseline))
+    elif baseline:
+        with open(baseline) as baseline_file:
+            failures = regressions(runs, json.load(baseline_file), tolerance)
+        if failures:
+            click.echo('\nRegressions against {}:'.format(baseline))
+            for failure in failures:
+                click.echo('  ' + failure)
+            sys.exit(1)
+        click.echo('\nNo regressions against {}'.format(baseline))
+
+    failures = over_budget(runs)
+    if failures:
+        click.echo('\nOver budget:')
+        for failure in failures:
+            click.echo('  ' + failure)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+import csv
+import io
+import json
+import os
+from collections import deque
+from datetime import timedelta
+import dateutil.parser
+from models import db, Venue, Artist, Show
+from counters import count_booked_shows
+
+SAME_CITY_GAP = timedelta(seconds=10800)
+OTHER_CITY_GAP = timedelta(seconds=86400)
+
+
+def shows_conflict(start_time, city, state,
+                   other_start_time, other_city, other_state):
+    gap = abs(start_time - other_start_time)
+
+    # Less than 3 hours difference between current show and artist's show
+    # (venue and artist's show are at the same city).
+    if gap < SAME_CITY_GAP and state == other_state and city == other_city:
+        return True
+
+    # Less than 1 day difference between current show and artist's show
+    # (venue and artist's show are in different cities).
+    if gap < OTHER_CITY_GAP and state != other_state and city != other_city:
+        return True
+
+    return False
+
+
+def artist_is_busy(artist_id, venue, start_time):
+    # Only shows less than a day apart can conflict, so just those are loaded
+    # (served by the (artist_id, start_time) index).
+    shows = Show.including_archive(since=start_time - OTHER_CITY_GAP)
+    shows = db.session.query(shows.start_time, Venue.city, Venue.state).join(
+        Venue, shows.venue_id == Venue.id).filter(
+        Venue.active(),
+        shows.artist_id == artist_id,
+        shows.start_time > start_time - OTHER_CITY_GAP,
+        shows.start_time < start_time + OTHER_CITY_GAP)
+
+    for show_start_time, city, state in shows:
+        if shows_conflict(start_time, venue.city, venue.state,
+                          show_start_time, city, state):
+            return True
+
+    return False
+
+
+def bookings_format(mimetype=None, filename=None):
+    # JSON for application/json or a .json file, CSV otherwise
+    if mimetype == 'application/json' or (filename and os.path.splitext(
+            filename)[1].lower() == '.json'):
+        return 'json'
+    return 'csv'
+
+
+def parse_bookings(data, format):
+    # Bookings come either as a JSON list (optionally wrapped in
+    # {"shows": [...]}) or as CSV with an artist_id,venue_id,start_time header.
+    if format == 'json':
+        rows = json.loads(data)
+        if isinstance(rows, dict):
+            rows = rows.get('shows')
+        if not isinstance(rows, list):
+            raise ValueError('Expected a list of shows.')
+        return rows
+    return list(csv.DictReader(io.StringIO(data)))
+
+
+def parse_start_time(value):
+    # Show times are stored as naive local times; times given with an
+    # offset are converted to that.
+    start_time = dateutil.parser.parse(str(value))
+    if start_time.tzinfo is not None:
+        start_time = start_time.astimezone().replace(tzinfo=None)
+    return start_time
+
+
+def book_shows(rows):
+    bookings = []
+    rejected = []
+
+    for number, row in enumerate(rows):
+        try:
+            bookings.append({
+                'row': number,
+                'artist_id': int(row['artist_id']),
+                'venue_id': int(row['venue_id']),
+                'start_time': parse_start_time(row['start_time'])
+            })
+        except (KeyError, TypeError, ValueError, OverflowError):
+            rejected.append({
+                'row': number,
+                'reason': 'Row needs artist_id, venue_id and start_time'
+            })
+
+    artist_ids = {booking['artist_id'] for booking in bookings}
+    venue_ids = {booking['venue_id'] for booking in bookings}
+    known_artists = {artist_id for (artist_id,) in db.session.query(
+        Artist.id).filter(Artist.id.in_(artist_ids), Artist.active())}
+    venues = {venue_id: (city, state) for venue_id, city, state in
+              db.session.query(Venue.id, Venue.city, Venue.state).filter(
+                  Venue.id.in_(venue_ids), Venue.active())}
+
+    candidates = []
+    for booking in bookings:
+        if booking['artist_id'] not in known_artists:
+            rejected.append({
+                'row': booking['row'], 'reason': 'Artist does not exists'})
+        elif booking['venue_id'] not in venues:
+            rejected.append({
+                'row': booking['row'], 'reason': 'Venue does not exists'})
+        else:
+            booking['city'], booking['state'] = venues[booking['venue_id']]
+            candidates.append(booking)
+
+    accepted = []
+    if candidates:
+        # Every existing show that could clash with the batch, in one query.
+        first = min(booking['start_time'] for booking in candidates)
+        last = max(booking['start_time'] for booking in candidates)
+        shows = Show.including_archive(since=first - OTHER_CITY_GAP)
+        existing = db.session.query(
+            shows.artist_id, shows.start_time, Venue.city, Venue.state
+        ).join(Venue, shows.venue_id == Venue.id).filter(
+            Venue.active(),
+            shows.artist_id.in_({b['artist_id'] for b in candidates}),
+            shows.start_time > first - OTHER_CITY_GAP,
+            shows.start_time < last + OTHER_CITY_GAP)
+
+        booked = {}
+        for artist_id, start_time, city, state in existing:
+            booked.setdefault(artist_id, []).append({
+                'start_time': start_time, 'city': city, 'state': state})
+
+        by_artist = {}
+        for booking in candidates:
+            by_artist.setdefault(booking['artist_id'], []).append(booking)
+
+        for artist_id, artist_bookings in by_artist.items():
+            clashes = sweep_conflicts(artist_bookings,
+                                      booked.get(artist_id, []))
+            for booking in artist_bookings:
+                if booking['row'] in clashes:
+                    rejected.append({
+                        'row': booking['row'],
+                        'reason': clashes[booking['row']]
+                    })
+                else:
+                    accepted.append(booking)
+
+    if accepted:
+        db.session.execute(Show.__table__.insert().values([{
+            'artist_id': booking['artist_id'],
+            'venue_id': booking['venue_id'],
+            'start_time': booking['start_time']
+        } for booking in accepted]))
+        count_booked_shows([
+            (booking['venue_id'], booking['artist_id'], booking['start_time'])
+            for booking in accepted])
+
+    rejected.sort(key=lambda rejection: rejection['row'])
+    return accepted, rejected
+
+
+def sweep_conflicts(bookings, booked):
+    # Sort-and-sweep over one artist's shows: only shows less than a day
+    # apart can clash, so each show is compared with the window behind it.
+    clashes = {}
+
+    # Against shows already in the database.
+    timeline = sorted(
+        [(show['start_time'], 0, show) for show in booked] +
+        [(booking['start_time'], 1, booking) for booking in bookings],
+        key=lambda item: item[:2])
+    window = deque()
+    for start_time, is_booking, show in timeline:
+        while window and start_time - window[0][0] >= OTHER_CITY_GAP:
+            window.popleft()
+        for other_start_time, other_is_booking, other in window:
+            if is_booking == other_is_booking:
+                continue
+            if shows_conflict(start_time, show['city'], show['state'],
+                              other_start_time, other['city'],
+                              other['state']):
+                booking = show if is_booking else other
+                clashes[booking['row']] = 'Artist is busy at that time'
+        window.append((start_time, is_booking, show))
+
+    # Inside the batch: of two clashing shows the one starting first is
+    # booked, whatever their order in the batch; rows only break ties
+    # between shows starting at the same time.
+    window = deque()
+    for booking in sorted(bookings, key=lambda b: (b['start_time'], b['row'])):
+        if booking['row'] in clashes:
+            continue
+        start_time = booking['start_time']
+        while (window and
+               start_time - window[0]['start_time'] >= OTHER_CITY_GAP):
+            window.popleft()
+        for other in window:
+            if shows_conflict(start_time, booking['city'], booking['state'],
+                              other['start_time'], other['city'],
+                              other['state']):
+                clashes[booking['row']] = \
+                    'Conflicts with row {} of this batch'.format(other['row'])
+                break
+        else:
+            window.append(booking)
+
+    return clashes
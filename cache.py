@@ -0,0 +1,152 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import g, request, session
+
+
+class LRUCache(object):
+    # In-process backend: keeps at most max_size pages, each for ttl seconds.
+    def __init__(self, max_size=1024, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self.lock:
+            for key in [key for key in self.entries if key.startswith(prefix)]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class SQLiteCache(object):
+    # Shared backend: every worker process pointed at the same file sees the
+    # same pages and the same invalidations.
+    def __init__(self, path, max_size=1024, ttl=300):
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        with self.connect() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS pages '
+                '(key TEXT PRIMARY KEY, value TEXT, expires REAL)')
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, key):
+        with self.connect() as connection:
+            row = connection.execute(
+                'SELECT value FROM pages WHERE key = ? AND expires >= ?',
+                (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value):
+        with self.connect() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO pages VALUES (?, ?, ?)',
+                (key, value, time.time() + self.ttl))
+            connection.execute(
+                'DELETE FROM pages WHERE expires < ? OR key NOT IN '
+                '(SELECT key FROM pages ORDER BY expires DESC LIMIT ?)',
+                (time.time(), self.max_size))
+
+    def delete(self, key):
+        with self.connect() as connection:
+            connection.execute('DELETE FROM pages WHERE key = ?', (key,))
+
+    def delete_prefix(self, prefix):
+        with self.connect() as connection:
+            connection.execute(
+                'DELETE FROM pages WHERE substr(key, 1, ?) = ?',
+                (len(prefix), prefix))
+
+    def clear(self):
+        with self.connect() as connection:
+            connection.execute('DELETE FROM pages')
+
+
+class PageCache(object):
+    # Caches rendered pages by request path. Handlers that change data call
+    # delete/delete_prefix with the paths of the pages that show it. Pages
+    # rendered for another locale or timezone (g.page_variant, see dates.py)
+    # are kept apart, under the path followed by '#' and the variant.
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = app.config.get('PAGE_CACHE_BACKEND')
+        max_size = app.config.get('PAGE_CACHE_SIZE', 1024)
+        ttl = app.config.get('PAGE_CACHE_TTL', 300)
+
+        if backend == 'memory':
+            self.backend = LRUCache(max_size, ttl)
+        elif backend == 'sqlite':
+            self.backend = SQLiteCache(
+                app.config['PAGE_CACHE_PATH'], max_size, ttl)
+        else:
+            self.backend = None
+
+    def cached(self, view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Pages rendered with pending flash messages are one-off.
+            if self.backend is None or '_flashes' in session:
+                return view(*args, **kwargs)
+
+            key = request.path
+            if g.get('page_variant'):
+                key += '#' + g.page_variant
+            page = self.backend.get(key)
+            if page is None:
+                page = view(*args, **kwargs)
+                if isinstance(page, str):
+                    self.backend.set(key, page)
+            return page
+        return wrapper
+
+    @property
+    def shared(self):
+        # whether evictions reach every process using the cache, rather
+        # than just this one
+        return isinstance(self.backend, SQLiteCache)
+
+    def delete(self, *paths):
+        if self.backend is not None:
+            for path in paths:
+                self.backend.delete(path)
+                self.backend.delete_prefix(path + '#')
+
+    def delete_prefix(self, prefix):
+        if self.backend is not None:
+            self.backend.delete_prefix(prefix)
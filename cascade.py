@@ -0,0 +1,89 @@
+import time
+from datetime import datetime
+from models import (
+    db,
+    Venue,
+    Artist,
+    Show,
+    ArchivedShow,
+    Album,
+    Song,
+    venue_genres,
+    artist_genres
+)
+from counters import count_shows_deleted_with
+
+SHOWS = Show.__table__
+ARCHIVED_SHOWS = ArchivedShow.__table__
+ALBUMS = Album.__table__
+SONGS = Song.__table__
+
+
+def soft_delete_venue(venue_id):
+    # Hides a venue and its shows, leaving the rows to purge_deleted(). The
+    # caller commits.
+    return soft_delete(Venue, Show.venue_id, venue_id)
+
+
+def soft_delete_artist(artist_id):
+    # The same for an artist, with its albums and songs.
+    return soft_delete(Artist, Show.artist_id, artist_id)
+
+
+def soft_delete(model, column, owner_id):
+    # One UPDATE of the row, which also keeps concurrent deletes of it from
+    # counting its shows twice, and one of the counters of the other side.
+    table = model.__table__
+    deleted = db.session.execute(table.update().where(
+        table.c.id == owner_id, table.c.deleted_at.is_(None)).values(
+        deleted_at=datetime.now(), upcoming_shows_count=0,
+        past_shows_count=0)).rowcount
+    if deleted:
+        count_shows_deleted_with(column, owner_id)
+    return bool(deleted)
+
+
+def purge_deleted(batch_size=500, pause=0.5):
+    # Removes the venues and artists deleted so far, with their shows,
+    # archived shows, albums, songs and genres, batch_size rows per
+    # transaction. After each full batch it sleeps `pause` seconds, so the
+    # locks and I/O go to the requests in between. Returns the rows removed
+    # per table.
+    until = datetime.now()
+    db.session.commit()
+    venues = db.select(Venue.id).where(Venue.deleted_at <= until)
+    artists = db.select(Artist.id).where(Artist.deleted_at <= until)
+    albums = db.select(ALBUMS.c.id).where(ALBUMS.c.artist_id.in_(artists))
+    steps = [
+        (SHOWS, db.or_(SHOWS.c.venue_id.in_(venues),
+                       SHOWS.c.artist_id.in_(artists))),
+        (ARCHIVED_SHOWS, db.or_(ARCHIVED_SHOWS.c.venue_id.in_(venues),
+                                ARCHIVED_SHOWS.c.artist_id.in_(artists))),
+        (SONGS, db.or_(SONGS.c.artist_id.in_(artists),
+                       SONGS.c.album_id.in_(albums))),
+        (ALBUMS, ALBUMS.c.artist_id.in_(artists)),
+        (venue_genres, venue_genres.c.venue_id.in_(venues)),
+        (artist_genres, artist_genres.c.artist_id.in_(artists)),
+        (Venue.__table__, Venue.__table__.c.id.in_(venues)),
+        (Artist.__table__, Artist.__table__.c.id.in_(artists)),
+    ]
+
+    purged = {}
+    for table, criterion in steps:
+        purged[table.name] = 0
+        while True:
+            removed = delete_batch(table, criterion, batch_size)
+            db.session.commit()
+            purged[table.name] += removed
+            if removed < batch_size:
+                break
+            time.sleep(pause)
+    return purged
+
+
+def delete_batch(table, criterion, batch_size):
+    # DELETE has no LIMIT in Postgres, so the batch is picked by primary key
+    key = db.tuple_(*table.primary_key.columns)
+    return db.session.execute(table.delete().where(key.in_(
+        db.select(*table.primary_key.columns).where(criterion).limit(
+            batch_size)))).rowcount
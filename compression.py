@@ -0,0 +1,72 @@
+import gzip
+import zlib
+import brotli
+from flask import request
+
+# Content-Encodings offered, in order of preference when the client
+# accepts several equally.
+ENCODINGS = ['br', 'gzip']
+
+
+class Compression(object):
+    # Compresses responses of COMPRESS_MIMETYPES with brotli or gzip,
+    # whichever the client prefers of those in its Accept-Encoding. A
+    # streamed response is compressed as it goes, every chunk flushed, so
+    # the client gets each one as soon as it is written.
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.after_request(self.compress)
+
+    def compress(self, response):
+        if response.mimetype not in self.app.config['COMPRESS_MIMETYPES'] \
+                or response.status_code in (204, 304) \
+                or 'Content-Encoding' in response.headers:
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(ENCODINGS)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = self.chunks(
+                response.response, response.iter_encoded(), encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.app.config['COMPRESS_MIN_SIZE']:
+                return response
+            if encoding == 'br':
+                response.set_data(brotli.compress(
+                    data, quality=self.app.config['COMPRESS_BROTLI_QUALITY']))
+            else:
+                response.set_data(gzip.compress(
+                    data, self.app.config['COMPRESS_GZIP_LEVEL']))
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def chunks(self, iterable, chunks, encoding):
+        try:
+            if encoding == 'br':
+                compressor = brotli.Compressor(
+                    quality=self.app.config['COMPRESS_BROTLI_QUALITY'])
+                for chunk in chunks:
+                    yield compressor.process(chunk) + compressor.flush()
+                yield compressor.finish()
+            else:
+                # wbits 31: a gzip header and trailer around the deflate
+                # stream
+                compressor = zlib.compressobj(
+                    self.app.config['COMPRESS_GZIP_LEVEL'], zlib.DEFLATED, 31)
+                for chunk in chunks:
+                    yield compressor.compress(chunk) + compressor.flush(
+                        zlib.Z_SYNC_FLUSH)
+                yield compressor.flush()
+        finally:
+            # what the response would have closed, such as the request
+            # context of stream_with_context, when the client goes away
+            if hasattr(iterable, 'close'):
+                iterable.close()
@@ -0,0 +1,92 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+from functools import wraps
+from flask import g, make_response, request, session
+from models import db, Show, Deletion
+
+
+def changed(model, *criteria):
+    # when the rows of model matching criteria last changed: their latest
+    # updated_at, and the latest deletion from the table
+    return [
+        db.select(db.func.max(model.updated_at)).where(
+            *criteria).scalar_subquery(),
+        db.select(Deletion.deleted_at).where(
+            Deletion.table_name == model.__tablename__).scalar_subquery(),
+    ]
+
+
+def started(*criteria):
+    # the latest of the matching shows to have started, for pages listing
+    # upcoming and past shows apart
+    return [db.select(db.func.max(Show.start_time)).where(
+        Show.start_time < datetime.now(), *criteria).scalar_subquery()]
+
+
+class ConditionalGet(object):
+    # Weak ETags and Last-Modified for GET pages, answering If-None-Match and
+    # If-Modified-Since with a 304 before the page's own queries run. Each
+    # page lists, with changed() and started(), what it is built from; the
+    # values are read in a single query and hashed into the ETag, the
+    # latest of them being Last-Modified. Archived shows are not listed:
+    # they never change, and archiving deletes from the shows table.
+    def __init__(self, app=None, reads=None):
+        self.reads = reads
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        # pages change along with the templates when a release changes them
+        digest = hashlib.sha1()
+        templates = os.path.join(app.root_path, app.template_folder)
+        for root, dirs, files in sorted(os.walk(templates)):
+            dirs.sort()
+            for name in sorted(files):
+                with open(os.path.join(root, name), 'rb') as template:
+                    digest.update(name.encode() + template.read())
+        self.version = digest.hexdigest()
+
+    def depends_on(self, validators):
+        # validators(**view_args) returns the changed() and started() values
+        # of the page
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                # pages with pending flash messages are one-off
+                if request.method not in ('GET', 'HEAD') or \
+                        '_flashes' in session:
+                    return view(*args, **kwargs)
+
+                (values,), = self.reads.all(
+                    db.select(*validators(**kwargs)))
+                etag = hashlib.sha1(repr((
+                    self.version, request.accept_mimetypes.best,
+                    g.get('page_variant'), tuple(values))).encode()
+                ).hexdigest()
+                stamps = [value for value in values if value is not None]
+                last_modified = max(stamps).replace(
+                    microsecond=0).astimezone(timezone.utc) \
+                    if stamps else None
+
+                if request.if_none_match:
+                    not_modified = request.if_none_match.contains_weak(etag)
+                else:
+                    not_modified = bool(
+                        request.if_modified_since and last_modified and
+                        last_modified <= request.if_modified_since)
+
+                if not_modified:
+                    response = make_response('', 304)
+                else:
+                    response = make_response(view(*args, **kwargs))
+                if response.status_code in (200, 304):
+                    response.set_etag(etag, weak=True)
+                    response.last_modified = last_modified
+                    # stored, but revalidated before every use
+                    response.cache_control.no_cache = True
+                    response.vary.update(('Accept', 'Accept-Language'))
+                return response
+            return wrapper
+        return decorator
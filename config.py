@@ -6,6 +6,10 @@ basedir = os.path.abspath(os.path.dirname(__file__))
 # Enable debug mode.
 DEBUG = True
 
+# Errors, and a JSON line per request (see instrumentation.py), are logged
+# here, in debug mode too.
+LOG_FILE = os.environ.get('LOG_FILE', 'error.log')
+
 
 # Connect to the database
 DATABASE_NAME = "fyyur"
@@ -17,3 +21,96 @@ SQLALCHEMY_DATABASE_URI = "postgres://{}@{}/{}".format(
 
 
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Read replicas (comma separated URIs in DATABASE_REPLICA_URIS). GET
+# requests read from a replica at most DB_REPLICA_MAX_LAG seconds behind the
+# primary, and a client that just wrote reads from the primary for as long.
+SQLALCHEMY_REPLICA_URIS = [
+    uri for uri in os.environ.get('DATABASE_REPLICA_URIS', '').split(',')
+    if uri]
+DB_REPLICA_MAX_LAG = float(os.environ.get('DB_REPLICA_MAX_LAG', 5))
+
+# Connection pool, per worker process (see pool.py). A request waits up to
+# DB_POOL_TIMEOUT seconds for a connection, then gets a 503. DB_PGBOUNCER=1
+# leaves pooling to PgBouncer (transaction mode): no pool is kept here.
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', '1') == '1'
+DB_CONNECT_TIMEOUT = int(os.environ.get('DB_CONNECT_TIMEOUT', 5))
+DB_PGBOUNCER = os.environ.get('DB_PGBOUNCER', '') == '1'
+
+# Serve the read-only pages through an asyncio engine, running each page's
+# independent queries concurrently (needs asyncpg, or aiosqlite for SQLite).
+# ASYNC_DATABASE_URI defaults to SQLALCHEMY_DATABASE_URI with that driver.
+ASYNC_READS = os.environ.get('ASYNC_READS', '') == '1'
+ASYNC_DATABASE_URI = os.environ.get('ASYNC_DATABASE_URI')
+
+# Dates are shown in the best of DATE_LOCALES (Babel locale names, the
+# first being the default) for the client's Accept-Language, and in the
+# timezone named by its `tz` cookie, or DATE_TIMEZONE; None shows them in
+# the server's local time, as stored.
+DATE_LOCALES = os.environ.get('DATE_LOCALES', 'en').split(',')
+DATE_TIMEZONE = os.environ.get('DATE_TIMEZONE') or None
+# Formatted dates kept in memory, per worker.
+DATE_FORMAT_CACHE_SIZE = 10000
+
+# Number of shows rendered per /shows page.
+SHOWS_PER_PAGE = 30
+
+# Venues or artists per /venues and /artists page, and the most a client
+# may ask for with ?per_page=.
+LISTINGS_PER_PAGE = 50
+LISTINGS_MAX_PER_PAGE = 200
+
+# Number of venues or artists per search results page.
+SEARCH_RESULTS_PER_PAGE = 20
+
+# Number of typeahead suggestions returned by /venues|artists/suggest.
+# Each worker keeps its own suggestion index, updated by its own writes
+# only (see search.py).
+SEARCH_SUGGESTIONS = 8
+
+# Shows that started more than this many days ago are moved to the
+# archived_shows table by `flask archive-shows`.
+SHOW_ARCHIVE_DAYS = 90
+
+# `flask purge-deleted` removes deleted venues and artists with their shows
+# PURGE_BATCH_SIZE rows per transaction, sleeping PURGE_PAUSE seconds
+# between batches to leave room for requests.
+PURGE_BATCH_SIZE = int(os.environ.get('PURGE_BATCH_SIZE', 500))
+PURGE_PAUSE = float(os.environ.get('PURGE_PAUSE', 0.5))
+
+# Rendered page cache for the venue, artist and album pages.
+# 'memory' keeps pages in each worker, 'sqlite' shares them through
+# PAGE_CACHE_PATH, anything else turns the cache off. With 'memory', pages
+# are only evicted from the worker making the change: other workers, and
+# servers running while `flask import` or `flask book-shows` write, show
+# the old pages until PAGE_CACHE_TTL runs out. Use 'sqlite' with more than
+# one worker or with those commands. (roll-show-counts, archive-shows and
+# purge-deleted change nothing the cached pages show.)
+PAGE_CACHE_BACKEND = os.environ.get('PAGE_CACHE_BACKEND', 'memory')
+PAGE_CACHE_PATH = os.environ.get(
+    'PAGE_CACHE_PATH', os.path.join(basedir, 'page_cache.sqlite'))
+PAGE_CACHE_SIZE = 1024
+PAGE_CACHE_TTL = 300
+
+# NDJSON collections of /api/v1 are read from the database and written out
+# this many records at a time (see api.py).
+API_STREAM_BATCH_SIZE = 1000
+
+# Responses of these types are compressed with brotli or gzip, whichever
+# the client prefers, once bigger than COMPRESS_MIN_SIZE bytes; streamed
+# ones always (see compression.py).
+COMPRESS_MIMETYPES = ['application/json', 'application/x-ndjson']
+COMPRESS_MIN_SIZE = 500
+COMPRESS_GZIP_LEVEL = 6
+COMPRESS_BROTLI_QUALITY = 4
+
+# Token of the /admin endpoints, sent as `Authorization: Bearer <token>`.
+# Unset, they answer local requests only (see admin.py).
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+# Number of recent requests per endpoint kept for /admin/metrics.
+INSTRUMENTATION_WINDOW = 1000
@@ -0,0 +1,133 @@
+from datetime import datetime
+from sqlalchemy import bindparam, func, select
+from models import db, Venue, Artist, Show, ShowCountsState
+
+# Venue.upcoming_shows_count / past_shows_count and the Artist equivalents
+# count shows starting after / at or before ShowCountsState.rolled_at.
+# Booking and deleting shows adjust them in the same transaction, and
+# roll_show_counts() moves the shows that started since the last roll from
+# upcoming to past. Shows of deleted venues and artists don't count, and
+# deleted ones count nothing.
+OWNERS = ((Venue, Show.venue_id), (Artist, Show.artist_id))
+
+
+def counted(shows):
+    # criteria leaving out the shows of deleted venues and artists
+    return [getattr(shows, column.key).notin_(model.deleted_ids())
+            for model, column in OWNERS]
+
+
+def rolled_at():
+    # FOR SHARE, so a roll can't move the watermark under a booking
+    state = ShowCountsState.query.with_for_update(read=True).first()
+    return state.rolled_at if state else datetime.min
+
+
+def count_booked_shows(shows, sign=1):
+    # shows: (venue_id, artist_id, start_time) of shows added in this
+    # transaction, or removed from it with sign=-1
+    watermark = rolled_at()
+    for model, column in OWNERS:
+        changes = {}
+        for venue_id, artist_id, start_time in shows:
+            owner_id = venue_id if model is Venue else artist_id
+            upcoming, past = changes.get(owner_id, (0, 0))
+            if start_time > watermark:
+                upcoming += sign
+            else:
+                past += sign
+            changes[owner_id] = (upcoming, past)
+        apply_changes(model, changes)
+
+
+def count_deleted_shows(shows):
+    count_booked_shows(shows, sign=-1)
+
+
+def count_shows_deleted_with(column, owner_id):
+    # count_deleted_shows for all the shows, archived ones included, of a
+    # venue or artist being deleted (column: Show.venue_id or
+    # Show.artist_id), in SQL however many there are. Only the counters of
+    # the other side, where not deleted already, are left to change.
+    watermark = rolled_at()
+    shows = Show.including_archive()
+    owned = getattr(shows, column.key) == owner_id
+    for model, other_column in OWNERS:
+        if other_column is column:
+            continue
+        table = model.__table__
+        other_id = getattr(shows, other_column.key)
+        upcoming = select(func.count(shows.id)).where(
+            owned, other_id == table.c.id,
+            shows.start_time > watermark).scalar_subquery()
+        past = select(func.count(shows.id)).where(
+            owned, other_id == table.c.id,
+            shows.start_time <= watermark).scalar_subquery()
+        db.session.execute(table.update().where(
+            table.c.id.in_(select(other_id).where(owned)),
+            table.c.deleted_at.is_(None)).values(
+            upcoming_shows_count=table.c.upcoming_shows_count - upcoming,
+            past_shows_count=table.c.past_shows_count - past))
+
+
+def apply_changes(model, changes):
+    if not changes:
+        return
+    db.session.execute(
+        model.__table__.update().where(
+            model.__table__.c.id == bindparam('owner_id')).values(
+            upcoming_shows_count=model.__table__.c.upcoming_shows_count +
+            bindparam('upcoming'),
+            past_shows_count=model.__table__.c.past_shows_count +
+            bindparam('past')),
+        [{'owner_id': owner_id, 'upcoming': upcoming, 'past': past}
+         for owner_id, (upcoming, past) in changes.items()])
+
+
+def roll_show_counts(now=None):
+    # Only the shows that started since the last roll are read.
+    now = now or datetime.now()
+    state = ShowCountsState.query.with_for_update().first()
+    if state is None:
+        return rebuild_show_counts(now)
+
+    started = 0
+    for model, column in OWNERS:
+        changes = {}
+        for owner_id, count in db.session.query(
+                column, func.count(Show.id)).filter(
+                Show.start_time > state.rolled_at,
+                Show.start_time <= now, *counted(Show)).group_by(column):
+            changes[owner_id] = (-count, count)
+            if model is Venue:
+                started += count
+        apply_changes(model, changes)
+
+    state.rolled_at = now
+    return started
+
+
+def rebuild_show_counts(now=None):
+    # Recounts everything from the shows table; the repair path.
+    now = now or datetime.now()
+    state = ShowCountsState.query.with_for_update().first()
+    if state is None:
+        state = ShowCountsState()
+        db.session.add(state)
+    state.rolled_at = now
+
+    shows = Show.including_archive()
+    for model, column in OWNERS:
+        table = model.__table__
+        owner_column = getattr(shows, column.key)
+        upcoming = select(func.count(shows.id)).where(
+            owner_column == table.c.id, shows.start_time > now,
+            *counted(shows)).scalar_subquery()
+        past = select(func.count(shows.id)).where(
+            owner_column == table.c.id, shows.start_time <= now,
+            *counted(shows)).scalar_subquery()
+        db.session.execute(table.update().values(
+            upcoming_shows_count=upcoming, past_shows_count=past))
+
+    return db.session.query(func.count(shows.id)).filter(
+        shows.start_time <= now, *counted(shows)).scalar()
@@ -0,0 +1,99 @@
+from functools import lru_cache
+import babel
+import babel.dates
+import dateutil.parser
+from flask import g, request
+from jinja2 import pass_context
+
+# Named formats of the `datetime` filter; any other format is used as a
+# Babel pattern.
+PATTERNS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+
+@lru_cache(maxsize=None)
+def get_timezone(name):
+    return babel.dates.get_timezone(name)
+
+
+class DateFormats(object):
+    # The `datetime` Jinja filter. Patterns are parsed once per locale, and
+    # formatted dates are kept in an LRU cache keyed by (value, format,
+    # locale, timezone), the same show times coming up on page after page.
+    #
+    # Each request gets the best of DATE_LOCALES for its Accept-Language and
+    # the timezone named by its `tz` cookie, or DATE_TIMEZONE. Dates are
+    # stored in the server's local time; without a timezone they are shown
+    # as stored. Requests not using the defaults set g.page_variant, which
+    # the page cache and ETags take into account.
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.locales = app.config['DATE_LOCALES']
+        self.timezone = app.config['DATE_TIMEZONE']
+        self.patterns = {}
+        for locale in self.locales:
+            for format in PATTERNS:
+                self.pattern(format, locale)
+        self.format = lru_cache(maxsize=app.config['DATE_FORMAT_CACHE_SIZE'])(
+            self.format_date)
+
+        app.before_request(self.select)
+        app.context_processor(self.template_settings)
+        app.jinja_env.filters['datetime'] = self.filter
+
+    def pattern(self, format, locale):
+        if (format, locale) not in self.patterns:
+            self.patterns[format, locale] = (
+                babel.dates.parse_pattern(PATTERNS.get(format, format)),
+                babel.Locale.parse(locale))
+        return self.patterns[format, locale]
+
+    def select(self):
+        g.date_locale = request.accept_languages.best_match(
+            self.locales, self.locales[0])
+        g.date_timezone = self.timezone
+        zone = request.cookies.get('tz')
+        if zone:
+            try:
+                get_timezone(zone)
+                g.date_timezone = zone
+            except LookupError:
+                pass
+        g.page_variant = None
+        if (g.date_locale, g.date_timezone) != (
+                self.locales[0], self.timezone):
+            g.page_variant = '{} {}'.format(g.date_locale, g.date_timezone)
+
+    def template_settings(self):
+        # handed to every template once, sparing the filter a lookup of g
+        # per date
+        return {
+            'date_locale': g.get('date_locale', self.locales[0]),
+            'date_timezone': g.get('date_timezone', self.timezone),
+        }
+
+    @pass_context
+    def filter(self, context, value, format='medium'):
+        return self.format(value, format,
+                           context.get('date_locale', self.locales[0]),
+                           context.get('date_timezone', self.timezone))
+
+    def localize(self, value, format='medium'):
+        # the filter, outside templates
+        return self.format(value, format,
+                           g.get('date_locale', self.locales[0]),
+                           g.get('date_timezone', self.timezone))
+
+    def format_date(self, value, format, locale, timezone):
+        if isinstance(value, str):
+            value = dateutil.parser.parse(value)
+        if timezone:
+            # naive dates are taken as the server's local time
+            value = value.astimezone(get_timezone(timezone))
+        pattern, locale = self.pattern(format, locale)
+        return pattern.apply(value, locale)
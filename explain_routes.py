@@ -0,0 +1,165 @@
+# ----------------------------------------------------------------------------#
+# EXPLAINs the statements every route of app.py issues, against a seeded
+# database, and flags sequential scans of big tables.
+#
+#   python explain_routes.py
+#   python explain_routes.py --size 5000 --rows 2000 --verbose
+#   python explain_routes.py --postgres postgresql://localhost/fyyur_bench
+#
+# The routes are driven through benchmark.py's scenarios, so a route without
+# one gets a warning. On Postgres every statement goes through
+# EXPLAIN (ANALYZE, FORMAT JSON), rolled back, and a Seq Scan is flagged
+# when it reads more than --rows rows. SQLite has EXPLAIN QUERY PLAN only,
+# so there a full SCAN of a table holding more than --rows rows is flagged.
+# The command exits non-zero when anything is flagged, but for the tables
+# listed in WHOLE_TABLES. Like benchmark.py it drops and re-creates the
+# database it is given.
+# ----------------------------------------------------------------------------#
+
+import logging
+import os
+import sys
+import tempfile
+import click
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app import app, page_cache, search
+from benchmark import SCENARIOS, prepare
+from models import db, Venue, Artist
+
+# Tables scenarios read in full by design, where a scan is the best plan.
+WHOLE_TABLES = {
+    'api shows ndjson': ('shows',),
+}
+
+# statements issued by the route being run
+captured = {'on': False, 'statements': []}
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def capture_statement(conn, cursor, statement, parameters, context,
+                      executemany):
+    if captured['on'] and not executemany and statement.lstrip().split(
+            None, 1)[0].upper() in ('SELECT', 'WITH', 'UPDATE', 'DELETE',
+                                    'INSERT'):
+        captured['statements'].append((statement, parameters))
+
+
+def postgres_scans(plan):
+    # (table, rows read) of every Seq Scan in a plan and its subplans
+    if plan['Node Type'] == 'Seq Scan':
+        rows = (plan.get('Actual Rows', 0) +
+                plan.get('Rows Removed by Filter', 0)) * plan.get(
+                    'Actual Loops', 1)
+        yield plan['Relation Name'], rows
+    for subplan in plan.get('Plans', ()):
+        yield from postgres_scans(subplan)
+
+
+def explain(connection, statement, parameters, table_rows):
+    # the plan's lines, and the (table, rows) of its sequential scans
+    if connection.dialect.name == 'postgresql':
+        transaction = connection.begin()
+        try:
+            (result,), = connection.exec_driver_sql(
+                'EXPLAIN (ANALYZE, FORMAT JSON) ' + statement, parameters)
+        finally:
+            transaction.rollback()
+        plan = result[0]['Plan']
+        return [plan['Node Type']], list(postgres_scans(plan))
+
+    lines = [detail for row in connection.exec_driver_sql(
+        'EXPLAIN QUERY PLAN ' + statement, parameters)
+        for detail in row[-1:]]
+    scans = []
+    for line in lines:
+        words = line.split()
+        # "SCAN venues", as opposed to "SCAN venues USING INDEX ..."
+        if words[0] == 'SCAN' and 'USING' not in words and \
+                words[1] in table_rows:
+            scans.append((words[1], table_rows[words[1]]))
+    return lines, scans
+
+
+@click.command()
+@click.option('--size', default=2000,
+              help='Seeded venues and artists; also 10x shows, 5x songs and '
+                   '0.5x albums.')
+@click.option('--rows', default=1000,
+              help='Flag sequential scans reading more rows than this.')
+@click.option('--seed', default=0, help='Seed of the data generator.')
+@click.option('--postgres', envvar='BENCHMARK_POSTGRES_URI',
+              help='URI of a scratch Postgres database to use instead of '
+                   'SQLite.')
+@click.option('--verbose', is_flag=True, help='Print every plan.')
+def main(size, rows, seed, postgres, verbose):
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.logger.setLevel(logging.WARNING)
+    # the routes' own queries, not the page cache
+    page_cache.backend = None
+
+    uri = postgres or 'sqlite:///' + os.path.join(
+        tempfile.mkdtemp(), 'explain.sqlite')
+    ids = prepare(uri, size, seed)
+    with app.app_context():
+        # planner statistics, as a live database would have
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+        table_rows = {
+            table.name: db.session.execute(
+                db.select(db.func.count()).select_from(table)).scalar()
+            for table in db.metadata.sorted_tables}
+
+    covered = {scenario[1] for scenario in SCENARIOS}
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint not in covered and rule.endpoint != 'static':
+            click.echo('warning: no scenario for {}'.format(rule.rule))
+
+    with app.app_context():
+        # built once per worker, from whole tables
+        for model in (Venue, Artist):
+            search.index(model)
+            search.prefix_index(model)
+
+    client = app.test_client()
+    flagged = []
+    for label, endpoint, method, url, arguments in SCENARIOS:
+        kwargs = arguments(ids, 0) if arguments else {}
+        captured['statements'] = []
+        captured['on'] = True
+        try:
+            client.open(url(ids, 0), method=method, **kwargs).get_data()
+        finally:
+            captured['on'] = False
+
+        seen = set()
+        with app.app_context(), db.engine.connect() as connection:
+            for statement, parameters in captured['statements']:
+                if statement in seen:
+                    continue
+                seen.add(statement)
+                lines, scans = explain(
+                    connection, statement, parameters, table_rows)
+                big = [(table, count) for table, count in scans
+                       if count > rows and
+                       table not in WHOLE_TABLES.get(label, ())]
+                if verbose or big:
+                    click.echo('\n{}: {}'.format(label, ' '.join(
+                        statement.split())))
+                    for line in lines:
+                        click.echo('    ' + line)
+                flagged.extend(
+                    '{}: sequential scan of {} ({} rows)'.format(
+                        label, table, count) for table, count in big)
+        click.echo('{:<20} {:>4} statements'.format(label, len(seen)))
+
+    if flagged:
+        click.echo('\nSequential scans over {} rows:'.format(rows))
+        for line in flagged:
+            click.echo('  ' + line)
+        sys.exit(1)
+    click.echo('\nNo sequential scans over {} rows.'.format(rows))
+
+
+if __name__ == '__main__':
+    main()
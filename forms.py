@@ -5,7 +5,8 @@ from wtforms import (
     SelectField,
     SelectMultipleField,
     DateTimeField,
-    BooleanField
+    BooleanField,
+    IntegerField
 )
 from wtforms.validators import (
     DataRequired,
@@ -15,6 +16,7 @@ from wtforms.validators import (
     ValidationError,
     AnyOf
 )
+from models import Genre
 
 list_of_states = [
     'AL',
@@ -105,6 +107,13 @@ class BaseForm(Form):
     def is_genres_valid_check(form, field):
         is_valid(field.data, list_of_genres)
 
+    def populate_obj(self, obj):
+        # genres are Genre rows on the model, not the submitted names
+        for name, field in self._fields.items():
+            if name != 'genres':
+                field.populate_obj(obj, name)
+        obj.genres = Genre.from_names(self.genres.data)
+
 
 class ShowForm(Form):
     artist_id = StringField(
@@ -116,7 +125,7 @@ class ShowForm(Form):
     start_time = DateTimeField(
         'start_time',
         validators=[DataRequired()],
-        default=datetime.today()
+        default=datetime.today
     )
 
 
@@ -342,3 +351,30 @@ class ArtistForm(BaseForm):
     seeking_description = StringField(
         'seeking_description'
     )
+
+
+class GenreForm(Form):
+    name = StringField(
+        'name', validators=[DataRequired()]
+    )
+
+
+class AlbumForm(Form):
+    artist_id = IntegerField(
+        'artist_id', validators=[DataRequired()]
+    )
+    title = StringField(
+        'title', validators=[DataRequired()]
+    )
+
+
+class SongForm(Form):
+    artist_id = IntegerField(
+        'artist_id', validators=[DataRequired()]
+    )
+    album_id = IntegerField(
+        'album_id', validators=[Optional()]
+    )
+    title = StringField(
+        'title', validators=[DataRequired()]
+    )
@@ -0,0 +1,152 @@
+import json
+import threading
+import time
+from collections import deque
+from flask import (
+    g,
+    has_request_context,
+    jsonify,
+    request,
+    request_started,
+    request_finished,
+    before_render_template,
+    template_rendered
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from admin import admin_only
+
+# Upper bounds (ms) of the buckets in the per-endpoint latency histogram.
+HISTOGRAM_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class Instrumentation(object):
+    # Records, for every request, the number of SQL statements, the time
+    # spent in the database and in templates, and the total time. Each
+    # request reports them in a Server-Timing header and a log line;
+    # /admin/metrics serves the recent samples per endpoint (see admin.py
+    # for who may see them).
+    def __init__(self, app=None):
+        self.samples = {}
+        self.lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.window = app.config.get('INSTRUMENTATION_WINDOW', 1000)
+
+        event.listen(Engine, 'before_cursor_execute', self.before_execute)
+        event.listen(Engine, 'after_cursor_execute', self.after_execute)
+        request_started.connect(self.request_started, app)
+        request_finished.connect(self.request_finished, app)
+        before_render_template.connect(self.before_render, app)
+        template_rendered.connect(self.after_render, app)
+
+        app.add_url_rule('/admin/metrics', 'metrics',
+                         admin_only(self.metrics))
+
+    def before_execute(self, conn, cursor, statement, parameters, context,
+                       executemany):
+        if has_request_context() and 'timings' in g:
+            g.statement_started = time.perf_counter()
+
+    def after_execute(self, conn, cursor, statement, parameters, context,
+                      executemany):
+        if has_request_context() and 'statement_started' in g:
+            g.timings['statements'] += 1
+            started = g.pop('statement_started')
+            g.timings['db'] += time.perf_counter() - started
+
+    def request_started(self, sender, **extra):
+        g.timings = {'started': time.perf_counter(), 'statements': 0,
+                     'db': 0.0, 'render': 0.0}
+
+    def before_render(self, sender, template, context, **extra):
+        if 'timings' in g:
+            g.render_started = time.perf_counter()
+
+    def after_render(self, sender, template, context, **extra):
+        if 'render_started' in g:
+            started = g.pop('render_started')
+            g.timings['render'] += time.perf_counter() - started
+
+    def request_finished(self, sender, response, **extra):
+        timings = g.pop('timings', None)
+        if timings is None:
+            return
+
+        total = (time.perf_counter() - timings['started']) * 1000
+        db_time = timings['db'] * 1000
+        render = timings['render'] * 1000
+        response.headers['Server-Timing'] = ', '.join([
+            'db;desc="{} statements";dur={:.2f}'.format(
+                timings['statements'], db_time),
+            'render;dur={:.2f}'.format(render),
+            'total;dur={:.2f}'.format(total),
+        ])
+
+        endpoint = request.endpoint or 'unknown'
+        with self.lock:
+            if endpoint not in self.samples:
+                self.samples[endpoint] = deque(maxlen=self.window)
+            self.samples[endpoint].append(
+                (total, db_time, render, timings['statements']))
+
+        self.app.logger.info(json.dumps({
+            'event': 'request',
+            'method': request.method,
+            'path': request.path,
+            'endpoint': endpoint,
+            'status': response.status_code,
+            'statements': timings['statements'],
+            'db_ms': round(db_time, 2),
+            'render_ms': round(render, 2),
+            'total_ms': round(total, 2),
+        }))
+
+    def metrics(self):
+        with self.lock:
+            samples = {endpoint: list(endpoint_samples)
+                       for endpoint, endpoint_samples in self.samples.items()}
+
+        endpoints = {}
+        for endpoint, endpoint_samples in samples.items():
+            totals = sorted(sample[0] for sample in endpoint_samples)
+            count = len(endpoint_samples)
+            histogram = dict.fromkeys(
+                ['le_{}'.format(bound) for bound in HISTOGRAM_BUCKETS] +
+                ['inf'], 0)
+            for total in totals:
+                for bound in HISTOGRAM_BUCKETS:
+                    if total <= bound:
+                        histogram['le_{}'.format(bound)] += 1
+                        break
+                else:
+                    histogram['inf'] += 1
+
+            endpoints[endpoint] = {
+                'requests': count,
+                'p50_ms': percentile(totals, 50),
+                'p95_ms': percentile(totals, 95),
+                'p99_ms': percentile(totals, 99),
+                'mean_db_ms': round(
+                    sum(sample[1] for sample in endpoint_samples) / count, 2),
+                'mean_render_ms': round(
+                    sum(sample[2] for sample in endpoint_samples) / count, 2),
+                'mean_statements': round(
+                    sum(sample[3] for sample in endpoint_samples) / count, 2),
+                'max_statements': max(
+                    sample[3] for sample in endpoint_samples),
+                'histogram_ms': histogram,
+            }
+
+        return jsonify(window=self.window, endpoints=endpoints)
+
+
+def percentile(ordered, percent):
+    # nearest-rank percentile of an already sorted list
+    if not ordered:
+        return None
+    rank = max(int(round(percent / 100.0 * len(ordered))) - 1, 0)
+    return round(ordered[min(rank, len(ordered) - 1)], 2)
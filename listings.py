@@ -0,0 +1,93 @@
+import base64
+import json
+from datetime import datetime
+from flask import abort
+from sqlalchemy import desc
+from models import db
+
+# Sort orders of the venues and artists pages: the columns of the keyset,
+# ending with id so that every row has a position of its own, and whether
+# it runs backwards. Each is read along a partial index (see models.py).
+SORTS = {
+    'name': (('name', 'id'), False),
+    'city': (('city', 'state', 'id'), False),
+    'newest': (('created_date', 'id'), True),
+}
+
+
+def page_query(query, model, sort, before=None, after=None, per_page=50):
+    # Keyset pagination, as on the shows page: the page after (or before)
+    # a cursor starts from there in the index, so any page costs as much as
+    # the first one. One row more than per_page is read, telling whether
+    # there is another page.
+    names, backwards = SORTS[sort]
+    columns = [getattr(model, name) for name in names]
+    position = db.tuple_(*columns)
+    forward = [desc(column) for column in columns] if backwards else columns
+    backward = columns if backwards else [desc(column) for column in columns]
+
+    if before:
+        key = decode_cursor(before, columns)
+        query = query.where(
+            position > key if backwards else position < key).order_by(
+            *backward)
+    else:
+        if after:
+            key = decode_cursor(after, columns)
+            query = query.where(
+                position < key if backwards else position > key)
+        query = query.order_by(*forward)
+    return query.limit(per_page + 1)
+
+
+def page_rows(rows, sort, before=None, after=None, per_page=50):
+    # the rows of the page, in order, and the cursors of the pages around
+    names, backwards = SORTS[sort]
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if before:
+        rows.reverse()
+
+    cursors = {
+        'before': None,
+        'after': None
+    }
+    if rows:
+        if (before and has_more) or after:
+            cursors['before'] = encode_cursor(rows[0], names)
+        if (not before and has_more) or before:
+            cursors['after'] = encode_cursor(rows[-1], names)
+    return rows, cursors
+
+
+def encode_cursor(row, names):
+    values = [getattr(row, name) for name in names]
+    return base64.urlsafe_b64encode(json.dumps([
+        value.isoformat() if isinstance(value, datetime) else value
+        for value in values]).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    # the values of a cursor, each of its column's type, or a 400 for one
+    # that isn't a list of those
+    try:
+        values = json.loads(base64.urlsafe_b64decode(
+            cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError(cursor)
+        return tuple(decode_value(column, value)
+                     for column, value in zip(columns, values))
+    except (ValueError, TypeError):
+        abort(400)
+
+
+def decode_value(column, value):
+    if isinstance(column.type, db.DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, db.Integer):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+    elif isinstance(column.type, db.String):
+        if isinstance(value, str):
+            return value
+    raise TypeError(value)
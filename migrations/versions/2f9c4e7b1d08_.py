@@ -0,0 +1,164 @@
+"""move venue and artist genres into a genres table
+
+Revision ID: 2f9c4e7b1d08
+Revises: 8d3f6a1c47e2
+Create Date: 2026-10-18 13:05:37.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2f9c4e7b1d08'
+down_revision = '8d3f6a1c47e2'
+branch_labels = None
+depends_on = None
+
+genres = sa.table(
+    'genres',
+    sa.column('id', sa.Integer),
+    sa.column('name', sa.String))
+
+# The genres the forms offered when this revision was written; a copy, so
+# later edits to forms.py don't change what the migration does.
+list_of_genres = [
+    'Alternative',
+    'Blues',
+    'Classical',
+    'Country',
+    'Electronic',
+    'Folk',
+    'Funk',
+    'Hip-Hop',
+    'Heavy Metal',
+    'Instrumental',
+    'Jazz',
+    'Musical Theatre',
+    'Pop',
+    'Punk',
+    'R&B',
+    'Reggae',
+    'Rock n Roll',
+    'Soul',
+    'Other'
+]
+
+
+def parse_genres(value):
+    # genres were stored as a Postgres array literal, e.g. {Jazz,"R&B"}
+    return [name.strip().strip('"') for name in value.strip('{}').split(',')
+            if name.strip().strip('"')]
+
+
+def format_genres(names):
+    return '{' + ','.join('"{}"'.format(name) for name in names) + '}'
+
+
+def create_search_index(table, with_genres):
+    genres_document = (
+        " || setweight(to_tsvector('simple', genres), 'C')"
+        if with_genres else '')
+    op.execute(
+        "CREATE INDEX ix_{0}_search ON {0} USING gin (("
+        "setweight(to_tsvector('simple', name), 'A') || "
+        "setweight(to_tsvector('simple', city || ' ' || state), 'B')"
+        "{1}))".format(table, genres_document))
+
+
+def upgrade():
+    op.create_table('genres',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('venue_genres',
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('genre_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['genre_id'], ['genres.id'], ),
+    sa.ForeignKeyConstraint(['venue_id'], ['venues.id'], ),
+    sa.PrimaryKeyConstraint('venue_id', 'genre_id')
+    )
+    op.create_index('ix_venue_genres_genre_id_venue_id', 'venue_genres',
+                    ['genre_id', 'venue_id'], unique=False)
+    op.create_table('artist_genres',
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('genre_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['artist_id'], ['artists.id'], ),
+    sa.ForeignKeyConstraint(['genre_id'], ['genres.id'], ),
+    sa.PrimaryKeyConstraint('artist_id', 'genre_id')
+    )
+    op.create_index('ix_artist_genres_genre_id_artist_id', 'artist_genres',
+                    ['genre_id', 'artist_id'], unique=False)
+
+    connection = op.get_bind()
+    links = {}
+    for table, owner in (('venues', 'venue_id'), ('artists', 'artist_id')):
+        links[table] = [
+            (owner_id, parse_genres(value)) for owner_id, value in
+            connection.execute(sa.text(
+                'SELECT id, genres FROM {}'.format(table)))]
+
+    # Seed with the genres the forms offer, plus any others already in use.
+    names = list(list_of_genres)
+    for table_links in links.values():
+        for owner_id, owner_genres in table_links:
+            names.extend(name for name in owner_genres if name not in names)
+    op.bulk_insert(genres, [
+        {'id': genre_id, 'name': name}
+        for genre_id, name in enumerate(names, 1)])
+    if connection.dialect.name == 'postgresql':
+        op.execute("SELECT setval('genres_id_seq', {})".format(len(names)))
+    genre_ids = {name: genre_id for genre_id, name in enumerate(names, 1)}
+
+    for table, owner in (('venues', 'venue_id'), ('artists', 'artist_id')):
+        link_table = sa.table(
+            table[:-1] + '_genres',
+            sa.column(owner, sa.Integer),
+            sa.column('genre_id', sa.Integer))
+        rows = [{owner: owner_id, 'genre_id': genre_ids[name]}
+                for owner_id, owner_genres in links[table]
+                for name in set(owner_genres)]
+        if rows:
+            op.bulk_insert(link_table, rows)
+
+        op.drop_index('ix_{}_search'.format(table), table_name=table)
+        op.drop_column(table, 'genres')
+        create_search_index(table, with_genres=False)
+
+
+def downgrade():
+    connection = op.get_bind()
+    for table, owner in (('venues', 'venue_id'), ('artists', 'artist_id')):
+        link_table = table[:-1] + '_genres'
+        owner_genres = {}
+        for owner_id, name in connection.execute(sa.text(
+                'SELECT {1}, genres.name FROM {0} JOIN genres '
+                'ON genres.id = {0}.genre_id ORDER BY genres.name'.format(
+                    link_table, owner))):
+            owner_genres.setdefault(owner_id, []).append(name)
+
+        op.drop_index('ix_{}_search'.format(table), table_name=table)
+        op.add_column(table, sa.Column(
+            'genres', sa.VARCHAR(length=120), nullable=True))
+        for owner_id, names in owner_genres.items():
+            connection.execute(
+                sa.text('UPDATE {} SET genres = :genres WHERE id = :id'
+                        .format(table)),
+                {'genres': format_genres(names), 'id': owner_id})
+        connection.execute(sa.text(
+            "UPDATE {} SET genres = '{{}}' WHERE genres IS NULL".format(
+                table)))
+        op.alter_column(table, 'genres',
+                        existing_type=sa.VARCHAR(length=120),
+                        nullable=False)
+        create_search_index(table, with_genres=True)
+
+    op.drop_index('ix_artist_genres_genre_id_artist_id',
+                  table_name='artist_genres')
+    op.drop_table('artist_genres')
+    op.drop_index('ix_venue_genres_genre_id_venue_id',
+                  table_name='venue_genres')
+    op.drop_table('venue_genres')
+    op.drop_table('genres')
@@ -0,0 +1,25 @@
+"""add shows (artist_id, start_time) index
+
+Revision ID: 5b7e0c2d9a41
+Revises: c03bc85c3806
+Create Date: 2026-10-18 10:02:11.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b7e0c2d9a41'
+down_revision = 'c03bc85c3806'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_shows_artist_id_start_time', 'shows',
+                    ['artist_id', 'start_time'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_shows_artist_id_start_time', table_name='shows')
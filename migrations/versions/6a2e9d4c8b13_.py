@@ -0,0 +1,51 @@
+"""show counters on venues and artists
+
+Revision ID: 6a2e9d4c8b13
+Revises: 2f9c4e7b1d08
+Create Date: 2026-10-18 15:42:09.731264
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a2e9d4c8b13'
+down_revision = '2f9c4e7b1d08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('show_counts_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('rolled_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    for table in ('venues', 'artists'):
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(),
+                                       server_default='0', nullable=False))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(),
+                                       server_default='0', nullable=False))
+
+    # Backfill the counters as of now; roll-show-counts takes it from here.
+    now = datetime.now()
+    for table, owner in (('venues', 'venue_id'), ('artists', 'artist_id')):
+        op.execute(sa.text(
+            'UPDATE {0} SET '
+            'upcoming_shows_count = (SELECT count(*) FROM shows '
+            'WHERE shows.{1} = {0}.id AND shows.start_time > :now), '
+            'past_shows_count = (SELECT count(*) FROM shows '
+            'WHERE shows.{1} = {0}.id AND shows.start_time <= :now)'.format(
+                table, owner)).bindparams(now=now))
+    op.execute(sa.text(
+        'INSERT INTO show_counts_state (id, rolled_at) VALUES (1, :now)'
+    ).bindparams(now=now))
+
+
+def downgrade():
+    for table in ('artists', 'venues'):
+        op.drop_column(table, 'past_shows_count')
+        op.drop_column(table, 'upcoming_shows_count')
+    op.drop_table('show_counts_state')
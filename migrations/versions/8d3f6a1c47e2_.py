@@ -0,0 +1,35 @@
+"""add full-text search indexes on venues and artists
+
+Revision ID: 8d3f6a1c47e2
+Revises: 5b7e0c2d9a41
+Create Date: 2026-10-18 11:40:52.607113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d3f6a1c47e2'
+down_revision = '5b7e0c2d9a41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Must stay identical to the documents searched in search.py.
+    op.execute(
+        "CREATE INDEX ix_venues_search ON venues USING gin (("
+        "setweight(to_tsvector('simple', name), 'A') || "
+        "setweight(to_tsvector('simple', city || ' ' || state), 'B') || "
+        "setweight(to_tsvector('simple', genres), 'C')))")
+    op.execute(
+        "CREATE INDEX ix_artists_search ON artists USING gin (("
+        "setweight(to_tsvector('simple', name), 'A') || "
+        "setweight(to_tsvector('simple', city || ' ' || state), 'B') || "
+        "setweight(to_tsvector('simple', genres), 'C')))")
+
+
+def downgrade():
+    op.drop_index('ix_artists_search', table_name='artists')
+    op.drop_index('ix_venues_search', table_name='venues')
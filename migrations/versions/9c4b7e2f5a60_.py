@@ -0,0 +1,56 @@
+"""archived_shows table and shows start_time indexes
+
+Revision ID: 9c4b7e2f5a60
+Revises: 6a2e9d4c8b13
+Create Date: 2026-10-18 16:27:54.106392
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4b7e2f5a60'
+down_revision = '6a2e9d4c8b13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('archived_shows',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['artist_id'], ['artists.id'], ),
+    sa.ForeignKeyConstraint(['venue_id'], ['venues.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_archived_shows_artist_id_start_time',
+                    'archived_shows', ['artist_id', 'start_time'],
+                    unique=False)
+    op.create_index('ix_archived_shows_venue_id_start_time',
+                    'archived_shows', ['venue_id', 'start_time'],
+                    unique=False)
+    op.create_index('ix_archived_shows_start_time_id', 'archived_shows',
+                    ['start_time', 'id'], unique=False)
+    op.create_index('ix_shows_venue_id_start_time', 'shows',
+                    ['venue_id', 'start_time'], unique=False)
+    op.create_index('ix_shows_start_time_id', 'shows',
+                    ['start_time', 'id'], unique=False)
+
+
+def downgrade():
+    # put archived shows back before dropping their table
+    op.execute('INSERT INTO shows (id, venue_id, artist_id, start_time) '
+               'SELECT id, venue_id, artist_id, start_time '
+               'FROM archived_shows')
+    op.drop_index('ix_shows_start_time_id', table_name='shows')
+    op.drop_index('ix_shows_venue_id_start_time', table_name='shows')
+    op.drop_index('ix_archived_shows_start_time_id',
+                  table_name='archived_shows')
+    op.drop_index('ix_archived_shows_venue_id_start_time',
+                  table_name='archived_shows')
+    op.drop_index('ix_archived_shows_artist_id_start_time',
+                  table_name='archived_shows')
+    op.drop_table('archived_shows')
@@ -0,0 +1,54 @@
+"""soft deleted venues and artists, partial indexes of the active ones
+
+Revision ID: a9c3f1e7b254
+Revises: d7a4c2e9f316
+Create Date: 2026-10-18 21:05:13.648210
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9c3f1e7b254'
+down_revision = 'd7a4c2e9f316'
+branch_labels = None
+depends_on = None
+
+ACTIVE = sa.text('deleted_at IS NULL')
+DELETED = sa.text('deleted_at IS NOT NULL')
+
+
+def upgrade():
+    op.add_column('venues', sa.Column('deleted_at', sa.DateTime(),
+                                      nullable=True))
+    op.add_column('artists', sa.Column('deleted_at', sa.DateTime(),
+                                       nullable=True))
+
+    # the indexes for listings only need the rows not deleted
+    for table in ('venues', 'artists'):
+        op.drop_index('ix_{}_created_date_id'.format(table),
+                      table_name=table)
+        op.create_index('ix_{}_created_date_id'.format(table), table,
+                        ['created_date', 'id'], unique=False,
+                        postgresql_include=['name'],
+                        postgresql_where=ACTIVE, sqlite_where=ACTIVE)
+        op.create_index('ix_{}_deleted_at'.format(table), table,
+                        ['deleted_at'], unique=False,
+                        postgresql_where=DELETED, sqlite_where=DELETED)
+    op.create_index('ix_venues_city_state_id', 'venues',
+                    ['city', 'state', 'id'], unique=False,
+                    postgresql_where=ACTIVE, sqlite_where=ACTIVE)
+
+
+def downgrade():
+    op.drop_index('ix_venues_city_state_id', table_name='venues')
+    for table in ('artists', 'venues'):
+        op.drop_index('ix_{}_deleted_at'.format(table), table_name=table)
+        op.drop_index('ix_{}_created_date_id'.format(table),
+                      table_name=table)
+        op.create_index('ix_{}_created_date_id'.format(table), table,
+                        ['created_date', 'id'], unique=False,
+                        postgresql_include=['name'])
+    op.drop_column('artists', 'deleted_at')
+    op.drop_column('venues', 'deleted_at')
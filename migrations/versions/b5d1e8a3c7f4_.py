@@ -0,0 +1,57 @@
+"""updated_at columns and the deletions table
+
+Revision ID: b5d1e8a3c7f4
+Revises: 9c4b7e2f5a60
+Create Date: 2026-10-18 18:06:31.482915
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d1e8a3c7f4'
+down_revision = '9c4b7e2f5a60'
+branch_labels = None
+depends_on = None
+
+TABLES = ('venues', 'artists', 'shows', 'archived_shows', 'albums', 'songs')
+
+
+def upgrade():
+    op.create_table('deletions',
+    sa.Column('table_name', sa.String(length=64), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+
+    # Existing rows count as changed when they were created, or now.
+    now = datetime.now()
+    for table in TABLES:
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(),
+                                       nullable=True))
+        if table in ('venues', 'artists'):
+            op.execute('UPDATE {} SET updated_at = created_date'.format(
+                table))
+        else:
+            op.execute(sa.text(
+                'UPDATE {} SET updated_at = :now'.format(table)
+            ).bindparams(now=now))
+        op.alter_column(table, 'updated_at', nullable=False)
+
+    op.create_index('ix_venues_updated_at', 'venues', ['updated_at'],
+                    unique=False)
+    op.create_index('ix_artists_updated_at', 'artists', ['updated_at'],
+                    unique=False)
+    op.create_index('ix_shows_updated_at', 'shows', ['updated_at'],
+                    unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_shows_updated_at', table_name='shows')
+    op.drop_index('ix_artists_updated_at', table_name='artists')
+    op.drop_index('ix_venues_updated_at', table_name='venues')
+    for table in reversed(TABLES):
+        op.drop_column(table, 'updated_at')
+    op.drop_table('deletions')
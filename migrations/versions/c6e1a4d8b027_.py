@@ -0,0 +1,36 @@
+"""name and city indexes of the venues and artists pages
+
+Revision ID: c6e1a4d8b027
+Revises: f2b8d6a1c593
+Create Date: 2026-10-18 23:27:52.904816
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6e1a4d8b027'
+down_revision = 'f2b8d6a1c593'
+branch_labels = None
+depends_on = None
+
+ACTIVE = sa.text('deleted_at IS NULL')
+
+
+def upgrade():
+    op.create_index('ix_venues_name_id', 'venues', ['name', 'id'],
+                    unique=False, postgresql_where=ACTIVE,
+                    sqlite_where=ACTIVE)
+    op.create_index('ix_artists_name_id', 'artists', ['name', 'id'],
+                    unique=False, postgresql_where=ACTIVE,
+                    sqlite_where=ACTIVE)
+    op.create_index('ix_artists_city_state_id', 'artists',
+                    ['city', 'state', 'id'], unique=False,
+                    postgresql_where=ACTIVE, sqlite_where=ACTIVE)
+
+
+def downgrade():
+    op.drop_index('ix_artists_city_state_id', table_name='artists')
+    op.drop_index('ix_artists_name_id', table_name='artists')
+    op.drop_index('ix_venues_name_id', table_name='venues')
@@ -0,0 +1,48 @@
+"""server side created_date and start_time defaults, created_date indexes
+
+Revision ID: d7a4c2e9f316
+Revises: b5d1e8a3c7f4
+Create Date: 2026-10-18 19:12:40.271553
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a4c2e9f316'
+down_revision = 'b5d1e8a3c7f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.alter_column('venues', 'created_date', server_default=sa.func.now())
+    op.alter_column('artists', 'created_date', server_default=sa.func.now())
+    op.alter_column('shows', 'start_time', server_default=sa.func.now())
+
+    # created_date used to be the time the worker process started, so rows
+    # created later could get earlier dates. Ids do follow creation order:
+    # no row may be older than one with a smaller id.
+    for table in ('venues', 'artists'):
+        op.execute(
+            'UPDATE {0} SET created_date = fixed.created_date '
+            'FROM (SELECT id, max(created_date) OVER (ORDER BY id) '
+            'AS created_date FROM {0}) AS fixed '
+            'WHERE {0}.id = fixed.id '
+            'AND {0}.created_date < fixed.created_date'.format(table))
+
+    op.create_index('ix_venues_created_date_id', 'venues',
+                    ['created_date', 'id'], unique=False,
+                    postgresql_include=['name'])
+    op.create_index('ix_artists_created_date_id', 'artists',
+                    ['created_date', 'id'], unique=False,
+                    postgresql_include=['name'])
+
+
+def downgrade():
+    op.drop_index('ix_artists_created_date_id', table_name='artists')
+    op.drop_index('ix_venues_created_date_id', table_name='venues')
+    op.alter_column('shows', 'start_time', server_default=None)
+    op.alter_column('artists', 'created_date', server_default=None)
+    op.alter_column('venues', 'created_date', server_default=None)
@@ -0,0 +1,30 @@
+"""album and song indexes
+
+Revision ID: f2b8d6a1c593
+Revises: a9c3f1e7b254
+Create Date: 2026-10-18 22:41:07.115392
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b8d6a1c593'
+down_revision = 'a9c3f1e7b254'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_albums_artist_id_id', 'albums',
+                    ['artist_id', 'id'], unique=False)
+    op.create_index('ix_songs_artist_id_id', 'songs', ['artist_id', 'id'],
+                    unique=False, postgresql_include=['album_id', 'title'])
+    op.create_index('ix_songs_album_id_id', 'songs', ['album_id', 'id'],
+                    unique=False, postgresql_include=['title'])
+
+
+def downgrade():
+    op.drop_index('ix_songs_album_id_id', table_name='songs')
+    op.drop_index('ix_songs_artist_id_id', table_name='songs')
+    op.drop_index('ix_albums_artist_id_id', table_name='albums')
@@ -1,16 +1,120 @@
 from datetime import datetime
-from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy import SQLAlchemy as BaseSQLAlchemy
+from sqlalchemy import event, orm
+from pool import engine_options
+from replicas import Replicas, RoutingSession
+
+
+class SQLAlchemy(BaseSQLAlchemy):
+    def __init__(self, *args, **kwargs):
+        self.replicas = Replicas(self)
+        super(SQLAlchemy, self).__init__(*args, **kwargs)
+
+    def create_session(self, options):
+        # GET requests read from a replica, see replicas.py
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def apply_driver_hacks(self, app, sa_url, options):
+        # the pool settings of config.py, for whatever database is in use
+        sa_url, options = super(SQLAlchemy, self).apply_driver_hacks(
+            app, sa_url, options)
+        sa_url, pool_options = engine_options(app.config, sa_url)
+        options.update(pool_options)
+        return sa_url, options
+
 
 db = SQLAlchemy()
 
+venue_genres = db.Table(
+    'venue_genres',
+    db.Column('venue_id', db.Integer, db.ForeignKey('venues.id'),
+              primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('genres.id'),
+              primary_key=True),
+    db.Index('ix_venue_genres_genre_id_venue_id', 'genre_id', 'venue_id')
+)
+
+artist_genres = db.Table(
+    'artist_genres',
+    db.Column('artist_id', db.Integer, db.ForeignKey('artists.id'),
+              primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('genres.id'),
+              primary_key=True),
+    db.Index('ix_artist_genres_genre_id_artist_id', 'genre_id', 'artist_id')
+)
+
+
+class Genre(db.Model):
+    __tablename__ = 'genres'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+    @classmethod
+    def from_names(cls, names):
+        # genres missing from the table are created along with the owner
+        genres = cls.query.filter(cls.name.in_(names)).all()
+        known = {genre.name for genre in genres}
+        genres.extend(cls(name=name) for name in names if name not in known)
+        return genres
+
+
+ACTIVE = db.text('deleted_at IS NULL')
+DELETED = db.text('deleted_at IS NOT NULL')
+
+
+def to_dictionary(record, fields):
+    # The named attributes of a record, genres by name. Only those are read,
+    # so records loaded with load_only() of the same fields (see api.py)
+    # need no further queries.
+    return {
+        field: [genre.name for genre in record.genres]
+        if field == 'genres' else getattr(record, field)
+        for field in fields
+    }
+
 
-class Venue(db.Model):
+class SoftDeleted(object):
+    # Venues and artists are deleted in two steps: setting deleted_at hides
+    # them and their shows at once, and `flask purge-deleted` removes the
+    # rows later on, in small batches (see cascade.py). Their indexes for
+    # listings only cover the rows not deleted.
+    deleted_at = db.Column(db.DateTime)
+
+    @classmethod
+    def active(cls):
+        return cls.deleted_at.is_(None)
+
+    @classmethod
+    def active_by_id(cls, record_id):
+        return cls.query.filter(cls.id == record_id, cls.active())
+
+    @classmethod
+    def deleted_ids(cls):
+        return db.select(cls.id).where(cls.deleted_at.isnot(None))
+
+
+class Venue(SoftDeleted, db.Model):
     __tablename__ = 'venues'
+    __table_args__ = (
+        db.Index('ix_venues_updated_at', 'updated_at'),
+        # the home page's most recent ones, read from the index alone
+        db.Index('ix_venues_created_date_id', 'created_date', 'id',
+                 postgresql_include=['name'],
+                 postgresql_where=ACTIVE, sqlite_where=ACTIVE),
+        # the venues page, in each of its orders (see listings.py)
+        db.Index('ix_venues_city_state_id', 'city', 'state', 'id',
+                 postgresql_where=ACTIVE, sqlite_where=ACTIVE),
+        db.Index('ix_venues_name_id', 'name', 'id',
+                 postgresql_where=ACTIVE, sqlite_where=ACTIVE),
+        db.Index('ix_venues_deleted_at', 'deleted_at',
+                 postgresql_where=DELETED, sqlite_where=DELETED),
+    )
     id = db.Column(db.Integer, primary_key=True)
     created_date = db.Column(
-        db.DateTime, default=datetime.now(), nullable=False)
+        db.DateTime, server_default=db.func.now(), nullable=False)
     name = db.Column(db.String(120), nullable=False)
-    genres = db.Column(db.String(120), nullable=False)
+    genres = db.relationship('Genre', secondary=venue_genres,
+                             order_by='Genre.name')
     address = db.Column(db.String(120), nullable=False)
     city = db.Column(db.String(120), nullable=False)
     state = db.Column(db.String(120), nullable=False)
@@ -20,32 +124,44 @@ class Venue(db.Model):
     seeking_talent = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
+    upcoming_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now,
+                           onupdate=datetime.now)
     shows = db.relationship('Show', backref='venues', lazy=True)
 
-    def venue_to_dictionary(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-            "genres": self.genres.strip('{}').split(','),
-            "address": self.address,
-            "city": self.city,
-            "state": self.state,
-            "phone": self.phone,
-            "website_link": self.website_link,
-            "facebook_link": self.facebook_link,
-            "seeking_talent": self.seeking_talent,
-            "seeking_description": self.seeking_description,
-            "image_link": self.image_link,
-        }
-
-
-class Artist(db.Model):
+    FIELDS = ('id', 'name', 'genres', 'address', 'city', 'state', 'phone',
+              'website_link', 'facebook_link', 'seeking_talent',
+              'seeking_description', 'image_link')
+
+    def venue_to_dictionary(self, fields=FIELDS):
+        return to_dictionary(self, fields)
+
+
+class Artist(SoftDeleted, db.Model):
     __tablename__ = 'artists'
+    __table_args__ = (
+        db.Index('ix_artists_updated_at', 'updated_at'),
+        # the home page's most recent ones, read from the index alone
+        db.Index('ix_artists_created_date_id', 'created_date', 'id',
+                 postgresql_include=['name'],
+                 postgresql_where=ACTIVE, sqlite_where=ACTIVE),
+        # the artists page, in each of its orders (see listings.py)
+        db.Index('ix_artists_city_state_id', 'city', 'state', 'id',
+                 postgresql_where=ACTIVE, sqlite_where=ACTIVE),
+        db.Index('ix_artists_name_id', 'name', 'id',
+                 postgresql_where=ACTIVE, sqlite_where=ACTIVE),
+        db.Index('ix_artists_deleted_at', 'deleted_at',
+                 postgresql_where=DELETED, sqlite_where=DELETED),
+    )
     id = db.Column(db.Integer, primary_key=True)
     created_date = db.Column(
-        db.DateTime, default=datetime.now(), nullable=False)
+        db.DateTime, server_default=db.func.now(), nullable=False)
     name = db.Column(db.String(120), nullable=False)
-    genres = db.Column(db.String(120), nullable=False)
+    genres = db.relationship('Genre', secondary=artist_genres,
+                             order_by='Genre.name')
     city = db.Column(db.String(120), nullable=False)
     state = db.Column(db.String(120), nullable=False)
     phone = db.Column(db.String(120))
@@ -54,50 +170,275 @@ class Artist(db.Model):
     seeking_venue = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
+    upcoming_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now,
+                           onupdate=datetime.now)
     shows = db.relationship('Show', backref='artists', lazy=True)
     albums = db.relationship('Album', backref='artists', lazy=True)
     songs = db.relationship('Song', backref='artists', lazy=True)
 
-    def artist_to_dictionary(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-            "genres": self.genres.strip('{}').split(','),
-            "city": self.city,
-            "state": self.state,
-            "phone": self.phone,
-            "website_link": self.website_link,
-            "facebook_link": self.facebook_link,
-            "seeking_venue": self.seeking_venue,
-            "seeking_description": self.seeking_description,
-            "image_link": self.image_link,
-        }
+    FIELDS = ('id', 'name', 'genres', 'city', 'state', 'phone',
+              'website_link', 'facebook_link', 'seeking_venue',
+              'seeking_description', 'image_link')
+
+    def artist_to_dictionary(self, fields=FIELDS, shows=None, songs=None,
+                             now=None):
+        # The fields, as the API serves them. Given the shows and songs rows
+        # of details_statements, the whole payload of the artist page: its
+        # past and upcoming shows as of now, its albums with their songs,
+        # and the songs on no album.
+        data = to_dictionary(self, fields)
+        if shows is None:
+            return data
+
+        past_shows = []
+        upcoming_shows = []
+        for start_time, venue_id, venue_name, venue_image_link in shows:
+            formatted_show = {
+                "venue_id": venue_id,
+                "venue_name": venue_name,
+                "venue_image_link": venue_image_link,
+                "start_time": start_time
+            }
+
+            if start_time < now:
+                past_shows.append(formatted_show)
+            else:
+                upcoming_shows.append(formatted_show)
+
+        albums = []
+        album_less_songs = []
+        for album_id, album_title, song_id, song_title in songs:
+            if album_id is None:
+                album_less_songs.append({'title': song_title})
+                continue
+            if not albums or albums[-1]['id'] != album_id:
+                albums.append({
+                    'id': album_id,
+                    'title': album_title,
+                    'songs': []
+                })
+            if song_id is not None:
+                albums[-1]['songs'].append({'title': song_title})
+
+        data.update({
+            'past_shows': past_shows,
+            'past_shows_count': len(past_shows),
+            'upcoming_shows': upcoming_shows,
+            'upcoming_shows_count': len(upcoming_shows),
+            'albums': albums,
+            'songs': album_less_songs
+        })
+        return data
+
+    @classmethod
+    def details_statements(cls, artist_id):
+        # The three statements the artist page is built from, whatever the
+        # number of albums, shows and songs; none depends on another, so
+        # Reads may run them at once. The artist comes once per genre (see
+        # with_genres), and songs with their album, album-less ones last.
+        artist = db.select(cls, Genre).outerjoin(cls.genres).where(
+            cls.id == artist_id, cls.active()).order_by(Genre.name)
+
+        shows = Show.with_archive()
+        artist_shows = db.select(
+            shows.start_time,
+            Venue.id,
+            Venue.name,
+            Venue.image_link
+        ).join(Venue, shows.venue_id == Venue.id).where(
+            shows.artist_id == artist_id, Venue.active()).order_by(
+            shows.start_time)
+
+        songs = db.union_all(
+            db.select(
+                Album.id.label('album_id'),
+                Album.title.label('album_title'),
+                Song.id.label('song_id'),
+                Song.title.label('song_title')
+            ).outerjoin(Song, Song.album_id == Album.id).where(
+                Album.artist_id == artist_id),
+            db.select(db.null(), db.null(), Song.id, Song.title).where(
+                Song.artist_id == artist_id, Song.album_id.is_(None))
+        ).order_by('album_id', 'song_id')
+
+        return artist, artist_shows, songs
+
+    @staticmethod
+    def with_genres(rows):
+        # the artist of the (artist, genre) rows of details_statements, with
+        # its genres set from them rather than loaded again
+        if not rows:
+            return None
+        artist = rows[0][0]
+        orm.attributes.set_committed_value(
+            artist, 'genres', [genre for _, genre in rows if genre])
+        return artist
 
 
 class Show(db.Model):
     __tablename__ = 'shows'
+    __table_args__ = (
+        db.Index('ix_shows_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_shows_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_shows_start_time_id', 'start_time', 'id'),
+        db.Index('ix_shows_updated_at', 'updated_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     venue_id = db.Column(db.Integer, db.ForeignKey(
         'venues.id'), nullable=False)
     artist_id = db.Column(db.Integer, db.ForeignKey(
         'artists.id'), nullable=False)
-    start_time = db.Column(db.DateTime, nullable=False, default=datetime.now())
+    start_time = db.Column(
+        db.DateTime, server_default=db.func.now(), nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now,
+                           onupdate=datetime.now)
+
+    FIELDS = ('id', 'venue_id', 'artist_id', 'start_time')
+
+    @classmethod
+    def including_archive(cls, since=None):
+        return cls.covering(
+            db.session.execute(cls.archived_until()).scalar(), since)
+
+    @staticmethod
+    def archived_until():
+        return db.select(db.func.max(ArchivedShow.start_time))
+
+    @classmethod
+    def covering(cls, archived_until, since=None):
+        # Shows are moved to archived_shows once they are old (see
+        # archive.py). Queries over shows starting from `since` on get Show
+        # alone when none of them can be archived, and otherwise both
+        # tables as one aliased UNION ALL.
+        if archived_until is None or (
+                since is not None and since > archived_until):
+            return cls
+        return cls.with_archive()
+
+    @classmethod
+    def with_archive(cls):
+        return db.aliased(cls, db.union_all(
+            db.select(cls.__table__),
+            db.select(ArchivedShow.__table__)).subquery('all_shows'))
+
+
+class ArchivedShow(db.Model):
+    # Same rows as shows, keeping their ids; only past shows end up here.
+    __tablename__ = 'archived_shows'
+    __table_args__ = (
+        db.Index('ix_archived_shows_artist_id_start_time',
+                 'artist_id', 'start_time'),
+        db.Index('ix_archived_shows_venue_id_start_time',
+                 'venue_id', 'start_time'),
+        db.Index('ix_archived_shows_start_time_id', 'start_time', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    venue_id = db.Column(db.Integer, db.ForeignKey(
+        'venues.id'), nullable=False)
+    artist_id = db.Column(db.Integer, db.ForeignKey(
+        'artists.id'), nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+
+class ShowCountsState(db.Model):
+    # Single row: the time up to which shows are counted as past in the
+    # venue and artist show counters (see counters.py).
+    __tablename__ = 'show_counts_state'
+    id = db.Column(db.Integer, primary_key=True)
+    rolled_at = db.Column(db.DateTime, nullable=False)
 
 
 class Album(db.Model):
     __tablename__ = 'albums'
+    __table_args__ = (
+        db.Index('ix_albums_artist_id_id', 'artist_id', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     artist_id = db.Column(db.Integer, db.ForeignKey(
         'artists.id'), nullable=False)
     title = db.Column(db.String(120), nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now,
+                           onupdate=datetime.now)
     songs = db.relationship('Song', backref='albums', lazy=True)
 
+    FIELDS = ('id', 'artist_id', 'title')
+
 
 class Song(db.Model):
     __tablename__ = 'songs'
+    __table_args__ = (
+        # the artist and album pages, in song order, read from the indexes
+        # alone on Postgres
+        db.Index('ix_songs_artist_id_id', 'artist_id', 'id',
+                 postgresql_include=['album_id', 'title']),
+        db.Index('ix_songs_album_id_id', 'album_id', 'id',
+                 postgresql_include=['title']),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(120), nullable=False)
     artist_id = db.Column(db.Integer, db.ForeignKey(
         'artists.id'), nullable=False)
     album_id = db.Column(db.Integer, db.ForeignKey(
         'albums.id'))
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now,
+                           onupdate=datetime.now)
+
+    FIELDS = ('id', 'title', 'artist_id', 'album_id')
+
+
+class Deletion(db.Model):
+    # One row per table: when rows were last deleted from it. Together with
+    # the latest updated_at of a table's rows, it tells whether anything in
+    # the table changed since then (see conditional.py).
+    __tablename__ = 'deletions'
+    table_name = db.Column(db.String(64), primary_key=True)
+    deleted_at = db.Column(db.DateTime, nullable=False)
+
+    @classmethod
+    def record(cls, db_session, table_names):
+        now = datetime.now()
+        table = cls.__table__
+        updated = db_session.execute(table.update().where(
+            table.c.table_name.in_(table_names)).values(deleted_at=now))
+        if updated.rowcount < len(table_names):
+            # first deletion from one of the tables
+            known = {name for (name,) in db_session.execute(
+                db.select(table.c.table_name).where(
+                    table.c.table_name.in_(table_names)))}
+            db_session.execute(table.insert(), [
+                {'table_name': name, 'deleted_at': now}
+                for name in table_names if name not in known])
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def deleted_objects(db_session, flush_context):
+    if db_session.deleted:
+        db_session.info.setdefault('deleted_from', set()).update(
+            instance.__tablename__ for instance in db_session.deleted)
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def deleted_rows(execute_state):
+    if execute_state.is_delete:
+        execute_state.session.info.setdefault('deleted_from', set()).add(
+            execute_state.statement.table.name)
+
+
+@event.listens_for(RoutingSession, 'before_commit')
+def record_deletions(db_session):
+    # deletions not flushed yet are flushed by the commit itself
+    deleted_from = db_session.info.pop('deleted_from', set()) | {
+        instance.__tablename__ for instance in db_session.deleted}
+    if deleted_from:
+        Deletion.record(db_session, sorted(deleted_from))
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+@event.listens_for(RoutingSession, 'after_rollback')
+def forget_deletions(db_session):
+    db_session.info.pop('deleted_from', None)
@@ -0,0 +1,131 @@
+import math
+import threading
+import time
+from collections import deque
+from flask import jsonify, render_template
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from admin import admin_only
+from instrumentation import percentile
+
+
+class TimedQueuePool(QueuePool):
+    # QueuePool recording how long every checkout waited for a connection,
+    # and how many gave up after pool_timeout. Kept per class, so the
+    # numbers carry over when the engine is disposed and re-created.
+    waits = deque(maxlen=1000)
+    timeouts = 0
+    lock = threading.Lock()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super(TimedQueuePool, self)._do_get()
+        except exc.TimeoutError:
+            with self.lock:
+                TimedQueuePool.timeouts += 1
+            raise
+        finally:
+            with self.lock:
+                self.waits.append((time.perf_counter() - started) * 1000)
+
+
+def engine_options(config, url):
+    # Pool settings from config.py for an engine on `url` (a sqlalchemy URL);
+    # returns the URL and the create_engine() options, like Flask-SQLAlchemy's
+    # apply_driver_hacks.
+    options = {}
+    connect_args = {}
+    asyncpg = url.drivername.endswith('+asyncpg')
+
+    if url.drivername.startswith('sqlite'):
+        if url.database in (None, '', ':memory:'):
+            return url, options
+        # pooled connections move between threads
+        connect_args['check_same_thread'] = False
+    elif asyncpg:
+        connect_args['timeout'] = config['DB_CONNECT_TIMEOUT']
+    else:
+        connect_args['connect_timeout'] = config['DB_CONNECT_TIMEOUT']
+
+    if config['DB_PGBOUNCER']:
+        # PgBouncer does the pooling, so connections are closed as soon as
+        # they are returned, and (in transaction mode) server side prepared
+        # statements can't be kept across transactions.
+        options['poolclass'] = NullPool
+        if asyncpg:
+            url = url.update_query_dict(
+                {'prepared_statement_cache_size': '0'})
+            connect_args['statement_cache_size'] = 0
+    else:
+        options.update({
+            'pool_size': config['DB_POOL_SIZE'],
+            'max_overflow': config['DB_MAX_OVERFLOW'],
+            'pool_timeout': config['DB_POOL_TIMEOUT'],
+            'pool_recycle': config['DB_POOL_RECYCLE'],
+            'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        })
+        # asyncio engines need their own queue pool class
+        if url.drivername.endswith(('+asyncpg', '+aiosqlite')):
+            options['poolclass'] = AsyncAdaptedQueuePool
+        else:
+            options['poolclass'] = TimedQueuePool
+
+    options['connect_args'] = connect_args
+    return url, options
+
+
+class PoolHealth(object):
+    # Serves /admin/pool, the live state of the connection pool, to those
+    # admin.py lets in, and turns pool timeouts into 503s the client may
+    # retry, rather than 500s.
+    def __init__(self, app=None, db=None):
+        self.db = db
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.add_url_rule('/admin/pool', 'pool', admin_only(self.pool))
+        app.register_error_handler(exc.TimeoutError, self.exhausted)
+
+    def pool(self):
+        pool = self.db.engine.pool
+        data = {
+            'pool': type(pool).__name__,
+            'pgbouncer': self.app.config['DB_PGBOUNCER'],
+        }
+
+        if isinstance(pool, QueuePool):
+            data.update({
+                'size': pool.size(),
+                'max_overflow': self.app.config['DB_MAX_OVERFLOW'],
+                'timeout_s': pool.timeout(),
+                'checked_in': pool.checkedin(),
+                'checked_out': pool.checkedout(),
+                'overflow': max(pool.overflow(), 0),
+            })
+
+        if isinstance(pool, TimedQueuePool):
+            with TimedQueuePool.lock:
+                waits = sorted(TimedQueuePool.waits)
+                timeouts = TimedQueuePool.timeouts
+            data.update({
+                'timeouts': timeouts,
+                'wait_ms': {
+                    'checkouts': len(waits),
+                    'p50': percentile(waits, 50),
+                    'p95': percentile(waits, 95),
+                    'p99': percentile(waits, 99),
+                    'max': round(waits[-1], 2) if waits else None,
+                },
+            })
+
+        return jsonify(data)
+
+    def exhausted(self, error):
+        self.app.logger.warning('Connection pool exhausted: {}'.format(error))
+        retry_after = max(int(math.ceil(self.app.config['DB_POOL_TIMEOUT'])),
+                          1)
+        return render_template('errors/503.html'), 503, {
+            'Retry-After': str(retry_after)}
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import time
+from flask import g, has_request_context
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from models import db
+from pool import engine_options
+
+# asyncio drivers for the URI schemes SQLALCHEMY_DATABASE_URI may use.
+ASYNC_DRIVERS = {
+    'postgres': 'postgresql+asyncpg',
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+
+def async_uri(uri):
+    scheme, rest = uri.split('://', 1)
+    return '{}://{}'.format(
+        ASYNC_DRIVERS.get(scheme.split('+')[0], scheme), rest)
+
+
+class Reads(object):
+    # Runs the SELECTs of the read-only pages. By default they go through
+    # db.session one after the other. With ASYNC_READS they run at the same
+    # time, each on its own connection of an asyncio engine, on one event
+    # loop that every worker thread shares; the calling thread just waits
+    # for all of them.
+    def __init__(self, app=None):
+        self.loop = None
+        self.engines = {}
+        self.lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+
+    def all(self, *statements):
+        # the rows of each statement, in order
+        if not self.app.config.get('ASYNC_READS'):
+            return [db.session.execute(statement).all()
+                    for statement in statements]
+
+        uri = self.app.config.get('ASYNC_DATABASE_URI') or async_uri(
+            db.replicas.read_uri() or
+            self.app.config['SQLALCHEMY_DATABASE_URI'])
+        started = time.perf_counter()
+        results = asyncio.run_coroutine_threadsafe(
+            self.gather(uri, statements), self.event_loop()).result()
+
+        # The statements ran on the loop's thread, out of sight of
+        # Instrumentation, so the request is charged for them here.
+        if has_request_context() and 'timings' in g:
+            g.timings['statements'] += len(statements)
+            g.timings['db'] += time.perf_counter() - started
+        return results
+
+    def scalar(self, statement):
+        rows, = self.all(statement)
+        return rows[0][0] if rows else None
+
+    def event_loop(self):
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(target=self.loop.run_forever,
+                                 name='reads', daemon=True).start()
+        return self.loop
+
+    async def gather(self, uri, statements):
+        if uri not in self.engines:
+            url, options = engine_options(self.app.config, make_url(uri))
+            self.engines[uri] = create_async_engine(url, **options)
+        engine = self.engines[uri]
+        return await asyncio.gather(*[
+            self.execute(engine, statement) for statement in statements])
+
+    async def execute(self, engine, statement):
+        # loaded objects outlive the session, detached; relationships the
+        # page needs have to be eager loaded by the statement
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            return (await session.execute(statement)).all()
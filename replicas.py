@@ -0,0 +1,134 @@
+import random
+import threading
+import time
+from functools import wraps
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy import SignallingSession
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+
+READ_METHODS = ('GET', 'HEAD')
+
+# Seconds a replica's measured lag is trusted before it is measured again.
+LAG_CHECK_INTERVAL = 5
+
+# Postgres standby lag; 0 when it has replayed everything it received.
+POSTGRES_LAG = text(
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() '
+    'THEN 0 ELSE extract(epoch FROM now() - '
+    'pg_last_xact_replay_timestamp()) END')
+
+
+class Replicas(object):
+    # Picks the database a request reads from. GET and HEAD requests read
+    # from a random replica of SQLALCHEMY_REPLICA_URIS lagging at most
+    # DB_REPLICA_MAX_LAG seconds behind; everything else, and clients that
+    # wrote in the last DB_REPLICA_MAX_LAG seconds (so they see their own
+    # writes after the redirect), use the primary.
+    def __init__(self, db):
+        self.db = db
+        self.engines = {}
+        self.lags = {}
+        self.lock = threading.Lock()
+
+    def read_uri(self):
+        # None when the request reads from the primary
+        if not has_request_context() or request.method not in READ_METHODS \
+                or g.get('read_primary'):
+            return None
+        if 'replica_uri' not in g:
+            g.replica_uri = self.choose()
+        return g.replica_uri
+
+    def read_engine(self):
+        uri = self.read_uri()
+        return self.engine(uri) if uri else None
+
+    def choose(self):
+        config = current_app.config
+        uris = config['SQLALCHEMY_REPLICA_URIS']
+        if not uris or session.get('read_primary_until', 0) > time.time():
+            return None
+        fresh = [uri for uri in uris
+                 if self.lag(uri) <= config['DB_REPLICA_MAX_LAG']]
+        return random.choice(fresh) if fresh else None
+
+    def engine(self, uri):
+        with self.lock:
+            if uri not in self.engines:
+                app = current_app._get_current_object()
+                options = self.db.apply_pool_defaults(app, {})
+                sa_url, options = self.db.apply_driver_hacks(
+                    app, make_url(uri), options)
+                self.engines[uri] = self.db.create_engine(sa_url, options)
+            return self.engines[uri]
+
+    def lag(self, uri):
+        # seconds behind the primary; infinite when the replica is down
+        checked, lag = self.lags.get(uri, (0, None))
+        if time.time() - checked < LAG_CHECK_INTERVAL:
+            return lag
+
+        engine = self.engine(uri)
+        lag = 0.0
+        if engine.dialect.name == 'postgresql':
+            try:
+                with engine.connect() as connection:
+                    lag = float(connection.execute(POSTGRES_LAG).scalar())
+            except Exception as err:
+                current_app.logger.warning(
+                    'Replica {} unavailable: {}'.format(
+                        engine.url.render_as_string(hide_password=True),
+                        err))
+                lag = float('inf')
+        self.lags[uri] = (time.time(), lag)
+        return lag
+
+    def primary_reads(self, view):
+        # for views whose output outlives the request, such as cached pages,
+        # which must not be rendered from a lagging replica
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            g.read_primary = True
+            return view(*args, **kwargs)
+        return wrapper
+
+
+class RoutingSession(SignallingSession):
+    # db.session, sending the reads of GET requests to a replica
+    def __init__(self, db, **options):
+        self.replicas = db.replicas
+        super(RoutingSession, self).__init__(db, **options)
+
+    def get_bind(self, mapper=None, clause=None):
+        if not self._flushing:
+            engine = self.replicas.read_engine()
+            if engine is not None:
+                return engine
+        return super(RoutingSession, self).get_bind(mapper, clause)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def wrote_objects(db_session, flush_context):
+    db_session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def wrote_rows(execute_state):
+    if execute_state.is_insert or execute_state.is_update or \
+            execute_state.is_delete:
+        execute_state.session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def read_own_writes(db_session):
+    # the client reads from the primary until replicas have its writes
+    if db_session.info.pop('wrote', False) and has_request_context() and \
+            current_app.config['SQLALCHEMY_REPLICA_URIS']:
+        session['read_primary_until'] = \
+            time.time() + current_app.config['DB_REPLICA_MAX_LAG']
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def rolled_back(db_session):
+    db_session.info.pop('wrote', None)
@@ -0,0 +1,267 @@
+import re
+import threading
+from bisect import bisect_left, insort
+from sqlalchemy import and_, desc, func, or_
+from models import db, Venue, Artist, Genre, venue_genres, artist_genres
+
+# The searchable document of a venue or artist, weighted so that name
+# matches rank above city/state matches. The GIN indexes in the migrations
+# are built on exactly these expressions. Genres live in their own table and
+# are matched through GENRE_LINKS.
+DOCUMENTS = {
+    Venue: db.literal_column(
+        "setweight(to_tsvector('simple', venues.name), 'A') || "
+        "setweight(to_tsvector('simple', venues.city || ' ' || "
+        "venues.state), 'B')"),
+    Artist: db.literal_column(
+        "setweight(to_tsvector('simple', artists.name), 'A') || "
+        "setweight(to_tsvector('simple', artists.city || ' ' || "
+        "artists.state), 'B')"),
+}
+
+GENRE_LINKS = {
+    Venue: venue_genres.c.venue_id,
+    Artist: artist_genres.c.artist_id,
+}
+
+# Same weights as Postgres' ts_rank uses for A, B and C.
+NAME_WEIGHT = 1.0
+LOCATION_WEIGHT = 0.4
+GENRES_WEIGHT = 0.2
+
+
+def tokenize(text):
+    return re.findall(r'[^\W_]+', (text or '').lower())
+
+
+class InvertedIndex(object):
+    # In-process stand-in for the tsvector index, used when the database is
+    # not Postgres (e.g. SQLite test runs). Matches the same way: every
+    # search token must prefix-match a token of the document.
+    def __init__(self):
+        self.postings = {}
+        self.tokens = []
+        self.documents = {}
+        self.lock = threading.Lock()
+
+    def add(self, record_id, name, fields):
+        with self.lock:
+            self._remove(record_id)
+            weights = {}
+            for text, weight in fields:
+                for token in tokenize(text):
+                    weights[token] = max(weights.get(token, 0), weight)
+            for token, weight in weights.items():
+                if token not in self.postings:
+                    self.postings[token] = {}
+                    insort(self.tokens, token)
+                self.postings[token][record_id] = weight
+            self.documents[record_id] = (name, list(weights))
+
+    def remove(self, record_id):
+        with self.lock:
+            self._remove(record_id)
+
+    def _remove(self, record_id):
+        name, tokens = self.documents.pop(record_id, (None, []))
+        for token in tokens:
+            postings = self.postings[token]
+            postings.pop(record_id, None)
+            if not postings:
+                del self.postings[token]
+                del self.tokens[bisect_left(self.tokens, token)]
+
+    def search(self, term, page, per_page):
+        with self.lock:
+            scores = None
+            for search_token in tokenize(term):
+                matches = {}
+                start = bisect_left(self.tokens, search_token)
+                for token in self.tokens[start:]:
+                    if not token.startswith(search_token):
+                        break
+                    for record_id, weight in self.postings[token].items():
+                        matches[record_id] = max(
+                            matches.get(record_id, 0), weight)
+                if scores is None:
+                    scores = matches
+                else:
+                    scores = {record_id: score + matches[record_id]
+                              for record_id, score in scores.items()
+                              if record_id in matches}
+
+            if scores is None:
+                scores = dict.fromkeys(self.documents, 0)
+
+            ranked = sorted(scores, key=lambda record_id: (
+                -scores[record_id], record_id))
+            offset = (page - 1) * per_page
+            return len(ranked), [
+                (record_id, self.documents[record_id][0])
+                for record_id in ranked[offset:offset + per_page]]
+
+
+class PrefixIndex(object):
+    # Sorted (key, id) pairs for typeahead suggestions. Every word of a name
+    # starts a key, so "jaz" suggests both "Jazz Club" and "The Jazz Bar".
+    def __init__(self, records=()):
+        self.names = {}
+        entries = []
+        for record_id, name in records:
+            self.names[record_id] = name
+            entries.extend((key, record_id) for key in prefix_keys(name))
+        self.entries = sorted(entries)
+        self.lock = threading.Lock()
+
+    def add(self, record_id, name):
+        with self.lock:
+            self._remove(record_id)
+            self.names[record_id] = name
+            for key in prefix_keys(name):
+                insort(self.entries, (key, record_id))
+
+    def remove(self, record_id):
+        with self.lock:
+            self._remove(record_id)
+
+    def _remove(self, record_id):
+        name = self.names.pop(record_id, None)
+        if name is not None:
+            for key in prefix_keys(name):
+                del self.entries[bisect_left(self.entries, (key, record_id))]
+
+    def suggest(self, prefix, limit):
+        prefix = ' '.join(tokenize(prefix))
+        suggestions = []
+        if not prefix:
+            return suggestions
+
+        with self.lock:
+            position = bisect_left(self.entries, (prefix,))
+            seen = set()
+            while (len(suggestions) < limit and
+                   position < len(self.entries)):
+                key, record_id = self.entries[position]
+                if not key.startswith(prefix):
+                    break
+                if record_id not in seen:
+                    seen.add(record_id)
+                    suggestions.append((record_id, self.names[record_id]))
+                position += 1
+
+        return suggestions
+
+
+class Search(object):
+    # Relevance-ranked, paginated search over venues and artists, backed by
+    # the tsvector GIN indexes on Postgres and by InvertedIndex elsewhere.
+    # The in-process indexes, the typeahead ones included, are read from
+    # the database once and then kept up to date by this process's own
+    # writes only: records added or changed by other workers or by
+    # `flask import` show up after a restart.
+    def __init__(self):
+        self.indexes = {}
+        self.prefix_indexes = {}
+        self.lock = threading.Lock()
+
+    def uses_database(self):
+        return db.engine.dialect.name == 'postgresql'
+
+    def search(self, model, term, page=1, per_page=20):
+        if self.uses_database():
+            return self.search_database(model, term, page, per_page)
+        return self.index(model).search(term, page, per_page)
+
+    def search_database(self, model, term, page, per_page):
+        query = db.session.query(model.id, model.name).filter(model.active())
+        tokens = tokenize(term)
+
+        if tokens:
+            document = DOCUMENTS[model]
+            link = GENRE_LINKS[model]
+            genres = db.session.query(Genre.id, Genre.name).all()
+
+            # Every token has to match the document or one of the genres.
+            matches = []
+            for token in tokens:
+                match = document.op('@@')(
+                    func.to_tsquery('simple', token + ':*'))
+                genre_ids = [genre_id for genre_id, name in genres if any(
+                    word.startswith(token) for word in tokenize(name))]
+                if genre_ids:
+                    match = or_(match, model.id.in_(
+                        db.session.query(link).filter(
+                            link.table.c.genre_id.in_(genre_ids))))
+                matches.append(match)
+
+            rank = func.ts_rank(document, func.to_tsquery(
+                'simple', ' | '.join(token + ':*' for token in tokens)))
+            query = query.filter(and_(*matches)).order_by(
+                desc(rank), model.id)
+        else:
+            query = query.order_by(model.id)
+
+        count = query.order_by(None).count()
+        results = query.limit(per_page).offset((page - 1) * per_page).all()
+        return count, [(record_id, name) for record_id, name in results]
+
+    def index(self, model):
+        with self.lock:
+            if model not in self.indexes:
+                index = InvertedIndex()
+                link = GENRE_LINKS[model]
+                genre_names = {}
+                for record_id, name in db.session.query(
+                        link, Genre.name).join(
+                        Genre, Genre.id == link.table.c.genre_id):
+                    genre_names.setdefault(record_id, []).append(name)
+
+                records = db.session.query(
+                    model.id, model.name, model.city, model.state).filter(
+                    model.active())
+                for record in records:
+                    index.add(record.id, record.name, document_fields(
+                        record, genre_names.get(record.id, [])))
+                self.indexes[model] = index
+            return self.indexes[model]
+
+    def prefix_index(self, model):
+        with self.lock:
+            if model not in self.prefix_indexes:
+                self.prefix_indexes[model] = PrefixIndex(
+                    db.session.query(model.id, model.name).filter(
+                        model.active()))
+            return self.prefix_indexes[model]
+
+    def suggest(self, model, prefix, limit=10):
+        return self.prefix_index(model).suggest(prefix, limit)
+
+    def update(self, record):
+        index = self.indexes.get(type(record))
+        if index is not None:
+            index.add(record.id, record.name, document_fields(
+                record, [genre.name for genre in record.genres]))
+        prefix_index = self.prefix_indexes.get(type(record))
+        if prefix_index is not None:
+            prefix_index.add(record.id, record.name)
+
+    def remove(self, model, record_id):
+        index = self.indexes.get(model)
+        if index is not None:
+            index.remove(record_id)
+        prefix_index = self.prefix_indexes.get(model)
+        if prefix_index is not None:
+            prefix_index.remove(record_id)
+
+
+def prefix_keys(name):
+    tokens = tokenize(name)
+    return {' '.join(tokens[start:]) for start in range(len(tokens))}
+
+
+def document_fields(record, genre_names):
+    return [
+        (record.name, NAME_WEIGHT),
+        ('{} {}'.format(record.city, record.state), LOCATION_WEIGHT),
+        (' '.join(genre_names), GENRES_WEIGHT),
+    ]
@@ -0,0 +1,102 @@
+import random
+from datetime import datetime, timedelta
+from forms import list_of_genres, list_of_states
+from models import db, Venue, Artist, Show, Album, Song, Genre
+from counters import rebuild_show_counts
+
+WORDS = [
+    'Blue', 'Red', 'Golden', 'Silver', 'Velvet', 'Electric', 'Midnight',
+    'Lucky', 'Wild', 'Quiet', 'Neon', 'Crystal', 'Broken', 'Iron', 'Hollow',
+    'Paper', 'Stone', 'River', 'Echo', 'Moon', 'Sun', 'Fox', 'Owl', 'Rose',
+]
+CITIES = [
+    'San Francisco', 'New York', 'Austin', 'Seattle', 'Chicago', 'Boston',
+    'Denver', 'Portland', 'Nashville', 'Atlanta', 'Detroit', 'Miami',
+]
+
+
+def name(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def generate(venues=100, artists=100, shows=1000, albums=50, songs=500,
+             seed=0):
+    # Fills the database with reproducible data: the same seed gives the
+    # same rows. Show times are spread over a year either side of now so
+    # that pages have both past and upcoming shows.
+    rng = random.Random(seed)
+    now = datetime.now().replace(microsecond=0)
+
+    genres = Genre.from_names(list_of_genres)
+    db.session.add_all(genres)
+
+    venue_rows = []
+    for number in range(venues):
+        venue_rows.append(Venue(
+            name='{} {}'.format(name(rng, 2), rng.choice(['Hall', 'Club',
+                                                         'Lounge', 'Bar'])),
+            genres=rng.sample(genres, rng.randint(1, 3)),
+            address='{} {} St'.format(rng.randint(1, 999), name(rng, 1)),
+            city=rng.choice(CITIES),
+            state=rng.choice(list_of_states),
+            phone='{:03d}-{:03d}-{:04d}'.format(
+                rng.randint(100, 999), rng.randint(100, 999),
+                rng.randint(0, 9999)),
+            seeking_talent=rng.random() < 0.5,
+            seeking_description='Looking for local bands',
+            image_link='https://example.com/venues/{}.jpg'.format(number),
+            created_date=now - timedelta(minutes=rng.randint(0, 525600)),
+        ))
+    db.session.add_all(venue_rows)
+
+    artist_rows = []
+    for number in range(artists):
+        artist_rows.append(Artist(
+            name='The {}s'.format(name(rng, 2)),
+            genres=rng.sample(genres, rng.randint(1, 3)),
+            city=rng.choice(CITIES),
+            state=rng.choice(list_of_states),
+            phone='{:03d}-{:03d}-{:04d}'.format(
+                rng.randint(100, 999), rng.randint(100, 999),
+                rng.randint(0, 9999)),
+            seeking_venue=rng.random() < 0.5,
+            seeking_description='Looking for shows',
+            image_link='https://example.com/artists/{}.jpg'.format(number),
+            created_date=now - timedelta(minutes=rng.randint(0, 525600)),
+        ))
+    db.session.add_all(artist_rows)
+    db.session.flush()
+
+    if not artist_rows:
+        db.session.commit()
+        return
+
+    if venue_rows:
+        db.session.add_all(Show(
+            venue_id=rng.choice(venue_rows).id,
+            artist_id=rng.choice(artist_rows).id,
+            start_time=now + timedelta(hours=rng.randint(-8760, 8760)),
+        ) for _ in range(shows))
+
+    album_rows = []
+    for _ in range(albums):
+        album_rows.append(Album(
+            artist_id=rng.choice(artist_rows).id,
+            title=name(rng, 3),
+        ))
+    db.session.add_all(album_rows)
+    db.session.flush()
+
+    for _ in range(songs):
+        # about one song in five is a single, outside any album
+        album = rng.choice(album_rows) if album_rows and rng.random() < 0.8 \
+            else None
+        db.session.add(Song(
+            artist_id=album.artist_id if album else rng.choice(
+                artist_rows).id,
+            album_id=album.id if album else None,
+            title=name(rng, 2),
+        ))
+
+    rebuild_show_counts()
+    db.session.commit()
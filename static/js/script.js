@@ -2,3 +2,139 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// Infinite scroll for the /shows feed: fetch the next page of shows with the
+// `after` cursor once the pager scrolls into view.
+window.addEventListener('DOMContentLoaded', function () {
+  var container = document.querySelector('.shows[data-after]');
+  var pager = document.querySelector('.shows-pager');
+  if (!container || !pager || !('IntersectionObserver' in window)) {
+    return;
+  }
+  var loading = false;
+
+  function showTile(show) {
+    var column = document.createElement('div');
+    column.className = 'col-sm-4';
+    var tile = document.createElement('div');
+    tile.className = 'tile tile-show';
+    if (show.artist_image_link) {
+      var image = document.createElement('img');
+      image.src = show.artist_image_link;
+      image.alt = 'Artist Image';
+      tile.appendChild(image);
+    }
+    var time = document.createElement('h4');
+    time.textContent = show.start_time_formatted;
+    tile.appendChild(time);
+    tile.appendChild(link('/artists/' + show.artist_id, show.artist_name));
+    var playing = document.createElement('p');
+    playing.textContent = 'playing at';
+    tile.appendChild(playing);
+    tile.appendChild(link('/venues/' + show.venue_id, show.venue_name));
+    column.appendChild(tile);
+    return column;
+  }
+
+  function link(href, text) {
+    var heading = document.createElement('h5');
+    var anchor = document.createElement('a');
+    anchor.href = href;
+    anchor.textContent = text;
+    heading.appendChild(anchor);
+    return heading;
+  }
+
+  var observer = new IntersectionObserver(function (entries) {
+    var after = container.getAttribute('data-after');
+    if (!entries[0].isIntersecting || loading || !after) {
+      return;
+    }
+    loading = true;
+    fetch('/shows?after=' + encodeURIComponent(after), {
+      headers: { Accept: 'application/json' }
+    })
+      .then(function (response) {
+        return response.json();
+      })
+      .then(function (page) {
+        page.shows.forEach(function (show) {
+          container.appendChild(showTile(show));
+        });
+        container.setAttribute('data-after', page.after || '');
+        if (!page.after) {
+          var next = pager.querySelector('.next');
+          if (next) {
+            next.remove();
+          }
+          observer.disconnect();
+        }
+      })
+      .finally(function () {
+        loading = false;
+      });
+  });
+  observer.observe(pager);
+});
+
+// Typeahead suggestions for the navbar search forms. Requests are debounced
+// and any request still in flight is aborted when the user keeps typing.
+window.addEventListener('DOMContentLoaded', function () {
+  var DEBOUNCE_MS = 150;
+
+  document.querySelectorAll('form.search[data-suggest]').forEach(function (form) {
+    var input = form.querySelector('input[name="search_term"]');
+    var list = document.createElement('ul');
+    list.className = 'search-suggestions';
+    form.appendChild(list);
+
+    var timer = null;
+    var controller = null;
+
+    function render(suggestions) {
+      list.innerHTML = '';
+      suggestions.forEach(function (suggestion) {
+        var item = document.createElement('li');
+        var anchor = document.createElement('a');
+        anchor.href = form.getAttribute('data-link') + suggestion.id;
+        anchor.textContent = suggestion.name;
+        item.appendChild(anchor);
+        list.appendChild(item);
+      });
+    }
+
+    function fetchSuggestions() {
+      var term = input.value.trim();
+      if (controller) {
+        controller.abort();
+        controller = null;
+      }
+      if (!term) {
+        render([]);
+        return;
+      }
+      controller = 'AbortController' in window ? new AbortController() : null;
+      fetch(form.getAttribute('data-suggest') + '?q=' + encodeURIComponent(term), {
+        signal: controller ? controller.signal : undefined
+      })
+        .then(function (response) {
+          return response.json();
+        })
+        .then(function (data) {
+          render(data.suggestions);
+        })
+        .catch(function () {});
+    }
+
+    input.addEventListener('input', function () {
+      clearTimeout(timer);
+      timer = setTimeout(fetchSuggestions, DEBOUNCE_MS);
+    });
+    input.addEventListener('blur', function () {
+      // let a click on a suggestion land before the list goes away
+      setTimeout(function () {
+        render([]);
+      }, 200);
+    });
+  });
+});
@@ -0,0 +1,99 @@
+# ----------------------------------------------------------------------------#
+# Starves the connection pool on purpose and checks the app stays up.
+#
+#   python stress_pool.py --clients 32 --pool-size 2 --max-overflow 0
+#   python stress_pool.py --postgres postgresql://localhost/fyyur_bench
+#
+# Many clients share a tiny pool, so requests queue for connections and some
+# give up after --pool-timeout. Those must get a 503 with Retry-After, never
+# a 500; the command exits non-zero otherwise. Like benchmark.py it drops
+# and re-creates the databases it is given.
+# ----------------------------------------------------------------------------#
+
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+import click
+from app import app, page_cache
+from benchmark import SCENARIOS, READ_ENDPOINTS, prepare
+
+
+@click.command()
+@click.option('--clients', default=32, help='Concurrent clients.')
+@click.option('--requests', default=20,
+              help='Passes over the read-only routes per client.')
+@click.option('--pool-size', default=2)
+@click.option('--max-overflow', default=0)
+@click.option('--pool-timeout', default=0.5,
+              help='Seconds a request waits for a connection.')
+@click.option('--size', default=100, help='Seeded venues and artists.')
+@click.option('--postgres', envvar='BENCHMARK_POSTGRES_URI',
+              help='URI of a scratch Postgres database to use instead of '
+                   'SQLite.')
+def main(clients, requests, pool_size, max_overflow, pool_timeout, size,
+         postgres):
+    app.config.update({
+        'DB_POOL_SIZE': pool_size,
+        'DB_MAX_OVERFLOW': max_overflow,
+        'DB_POOL_TIMEOUT': pool_timeout,
+        'DB_PGBOUNCER': False,
+    })
+    app.logger.setLevel(logging.ERROR)
+    page_cache.backend = None
+
+    uri = postgres or 'sqlite:///' + os.path.join(
+        tempfile.mkdtemp(), 'stress.sqlite')
+    ids = prepare(uri, size, seed=0)
+
+    scenarios = [scenario for scenario in SCENARIOS
+                 if scenario[1] in READ_ENDPOINTS]
+    statuses = Counter()
+    retry_after = set()
+    lock = threading.Lock()
+
+    def client_requests(client_number):
+        client = app.test_client()
+        for number in range(requests):
+            for label, endpoint, method, url, arguments in scenarios:
+                response = client.open(
+                    url(ids, client_number * requests + number),
+                    method=method)
+                with lock:
+                    statuses[response.status_code] += 1
+                    if response.status_code == 503:
+                        retry_after.add(response.headers.get('Retry-After'))
+
+    threads = [threading.Thread(target=client_requests, args=(number,))
+               for number in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    total = sum(statuses.values())
+    click.echo('{} requests from {} clients in {:.1f} s, pool of {} + {} '
+               'overflow, {} s timeout'.format(
+                   total, clients, elapsed, pool_size, max_overflow,
+                   pool_timeout))
+    for status, count in sorted(statuses.items()):
+        click.echo('  {}: {} ({:.1f}%)'.format(
+            status, count, count * 100.0 / total))
+    if retry_after:
+        click.echo('  Retry-After on 503s: {}'.format(
+            ', '.join(sorted(str(value) for value in retry_after))))
+    click.echo(app.test_client().get('/admin/pool').get_data(as_text=True))
+
+    failed = sum(count for status, count in statuses.items()
+                 if status >= 500 and status != 503)
+    if failed or 503 in statuses and None in retry_after:
+        raise click.ClickException(
+            '{} requests failed instead of getting a 503'.format(failed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+import json
+import logging
+import os
+import unittest
+from testing import AppTestCase
+from app import app, file_handler
+
+REMOTE = {'REMOTE_ADDR': '203.0.113.5'}
+
+
+class RequestLogTestCase(AppTestCase):
+    def test_requests_are_logged_in_debug_mode(self):
+        self.assertTrue(app.debug)
+        self.assertEqual(file_handler.baseFilename,
+                         os.path.abspath(app.config['LOG_FILE']))
+        with self.assertLogs(app.logger, logging.INFO) as logs:
+            self.client.get('/venues')
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(line['endpoint'], 'venues')
+        self.assertEqual(line['status'], 200)
+        self.assertGreater(line['statements'], 0)
+
+
+class AdminTestCase(AppTestCase):
+    paths = ('/admin/metrics', '/admin/pool')
+
+    def statuses(self, **kwargs):
+        return [self.client.get(path, **kwargs).status_code
+                for path in self.paths]
+
+    def test_local_requests_only_without_token(self):
+        self.assertEqual(self.statuses(), [200] * len(self.paths))
+        self.assertEqual(self.statuses(environ_base=REMOTE),
+                         [403] * len(self.paths))
+        # through a proxy on the same host
+        self.assertEqual(self.statuses(headers={
+            'X-Forwarded-For': '203.0.113.5'}), [403] * len(self.paths))
+
+    def test_token(self):
+        app.config['ADMIN_TOKEN'] = 'secret'
+        self.assertEqual(self.statuses(), [403] * len(self.paths))
+        self.assertEqual(self.statuses(headers={
+            'Authorization': 'Bearer wrong'}), [403] * len(self.paths))
+        self.assertEqual(self.statuses(environ_base=REMOTE, headers={
+            'Authorization': 'Bearer secret'}), [200] * len(self.paths))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import gzip
+import json
+import unittest
+import brotli
+from testing import AppTestCase
+from app import app
+from seed import generate
+from models import db, Venue, Artist, Show, Album, Song
+
+DECOMPRESS = {
+    'br': brotli.decompress,
+    'gzip': gzip.decompress,
+}
+
+
+class ApiTestCase(AppTestCase):
+    def setUp(self):
+        super(ApiTestCase, self).setUp()
+        generate(venues=30, artists=30, shows=100, albums=10, songs=50,
+                 seed=4)
+        db.session.get(Venue, 5).deleted_at = db.func.now()
+        db.session.commit()
+
+    def pages(self, kind, per_page):
+        # the ids of a collection, following next from page to page
+        ids, url = [], '/api/v1/{}?per_page={}'.format(kind, per_page)
+        while url:
+            data = self.client.get(url).get_json()
+            ids += [record['id'] for record in data[kind]]
+            url = data['next']
+        return ids
+
+    def test_pages_and_ndjson_list_the_same_records(self):
+        for kind, model in (('venues', Venue), ('artists', Artist),
+                            ('shows', Show), ('albums', Album),
+                            ('songs', Song)):
+            response = self.client.get(
+                '/api/v1/' + kind, headers={'Accept': 'application/x-ndjson'})
+            self.assertEqual(response.mimetype, 'application/x-ndjson')
+            records = [json.loads(line) for line in
+                       response.get_data(as_text=True).splitlines()]
+            self.assertEqual([record['id'] for record in records],
+                             self.pages(kind, 7))
+            self.assertEqual(set(records[0]), set(model.FIELDS))
+
+    def test_deleted_records_are_left_out(self):
+        self.assertNotIn(5, self.pages('venues', 50))
+        self.assertEqual(self.client.get('/api/v1/venues/5').status_code,
+                         404)
+
+    def test_record_matches_the_page_payload(self):
+        self.assertEqual(self.client.get('/api/v1/venues/6').get_json(),
+                         db.session.get(Venue, 6).venue_to_dictionary())
+
+    def test_fields(self):
+        artist = db.session.get(Artist, 7)
+        self.assertEqual(
+            self.client.get('/api/v1/artists/7?fields=name,city').get_json(),
+            {'id': 7, 'name': artist.name, 'city': artist.city})
+        response = self.client.get('/api/v1/artists?fields=name,nope')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json(),
+                         {'error': 'unknown fields: nope'})
+        self.assertEqual(self.client.get('/api/v1/nope').status_code, 404)
+
+    def test_content_encoding(self):
+        plain = self.client.get('/api/v1/venues?per_page=50')
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertIn('Accept-Encoding', plain.headers['Vary'])
+
+        for accept, encoding in (('gzip', 'gzip'), ('br', 'br'),
+                                 ('gzip, br', 'br'),
+                                 ('br;q=0.5, gzip', 'gzip')):
+            response = self.client.get('/api/v1/venues?per_page=50',
+                                       headers={'Accept-Encoding': accept})
+            self.assertEqual(response.headers['Content-Encoding'], encoding)
+            self.assertIn('Accept-Encoding', response.headers['Vary'])
+            self.assertEqual(DECOMPRESS[encoding](response.get_data()),
+                             plain.get_data())
+
+        # not worth compressing
+        small = self.client.get('/api/v1/venues/6?fields=name',
+                                headers={'Accept-Encoding': 'gzip'})
+        self.assertLess(len(small.get_data()), app.config['COMPRESS_MIN_SIZE'])
+        self.assertNotIn('Content-Encoding', small.headers)
+
+    def test_streamed_content_encoding(self):
+        plain = self.client.get('/api/v1/shows?format=ndjson').get_data()
+        for encoding in ('gzip', 'br'):
+            response = self.client.get('/api/v1/shows?format=ndjson',
+                                       headers={'Accept-Encoding': encoding})
+            self.assertEqual(response.headers['Content-Encoding'], encoding)
+            self.assertNotIn('Content-Length', response.headers)
+            self.assertEqual(DECOMPRESS[encoding](response.get_data()), plain)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import re
+import unittest
+from datetime import datetime, timedelta
+from testing import AppTestCase
+from app import app
+from archive import archive_shows
+from counters import rebuild_show_counts
+from models import db, Venue, Artist, Show, ArchivedShow
+
+DAYS_AGO = (200, 100, 10)
+
+
+class ArchiveTestCase(AppTestCase):
+    def setUp(self):
+        super(ArchiveTestCase, self).setUp()
+        self.now = datetime.now().replace(microsecond=0)
+        venue = Venue(name='The Hall', address='1 Main St', city='Austin',
+                      state='TX')
+        artist = Artist(name='The Band', city='Austin', state='TX')
+        db.session.add_all([venue, artist])
+        db.session.flush()
+        db.session.add_all([
+            Show(venue_id=venue.id, artist_id=artist.id,
+                 start_time=self.now - timedelta(days=days))
+            for days in DAYS_AGO + (-7,)])
+        db.session.commit()
+        self.venue_id = venue.id
+        self.artist_id = artist.id
+        self.shows = [(show.id, show.start_time) for show in
+                      Show.query.order_by(Show.start_time)]
+
+    def past_shows(self, path):
+        html = self.client.get(path).get_data(as_text=True)
+        return int(re.search(r'(\d+) Past Show', html).group(1))
+
+    def test_moves_old_shows(self):
+        rebuild_show_counts(self.now)
+        db.session.commit()
+        self.assertEqual(archive_shows(
+            self.now - timedelta(days=90), batch_size=1), 2)
+
+        self.assertEqual(
+            [(show.id, show.start_time) for show in
+             ArchivedShow.query.order_by(ArchivedShow.start_time)],
+            self.shows[:2])
+        self.assertEqual(
+            [(show.id, show.start_time) for show in
+             Show.query.order_by(Show.start_time)],
+            self.shows[2:])
+
+        # the pages still list them
+        for path in ('/artists/{}'.format(self.artist_id),
+                     '/venues/{}'.format(self.venue_id)):
+            self.assertEqual(self.past_shows(path), len(DAYS_AGO))
+
+    def test_keeps_shows_not_rolled_to_past(self):
+        # the counters have only rolled up to 150 days ago
+        rebuild_show_counts(self.now - timedelta(days=150))
+        db.session.commit()
+        self.assertEqual(archive_shows(self.now - timedelta(days=90)), 1)
+        self.assertEqual(ArchivedShow.query.count(), 1)
+
+    def test_command(self):
+        rebuild_show_counts(self.now)
+        db.session.commit()
+        result = app.test_cli_runner().invoke(
+            args=['archive-shows', '--days', '50'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('2 shows archived.', result.output)
+        self.assertEqual(self.past_shows(
+            '/artists/{}'.format(self.artist_id)), len(DAYS_AGO))
+
+
+if __name__ == '__main__':
+    unittest.main()
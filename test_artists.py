@@ -0,0 +1,117 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+from testing import AppTestCase
+from app import app, reads
+from models import (
+    db, Artist, Venue, Album, Song, Show, ArchivedShow, Genre)
+
+
+class ArtistPageTestCase(AppTestCase):
+    def setUp(self):
+        super(ArtistPageTestCase, self).setUp()
+        now = datetime.now().replace(microsecond=0)
+        self.venue = Venue(name='The Hall', address='1 Main St',
+                           city='Austin', state='TX')
+        self.artist = Artist(name='The Band', city='Austin', state='TX')
+        db.session.add_all([self.venue, self.artist])
+        db.session.flush()
+        db.session.add_all([
+            Show(venue_id=self.venue.id, artist_id=self.artist.id,
+                 start_time=now + timedelta(days=7)),
+            Show(venue_id=self.venue.id, artist_id=self.artist.id,
+                 start_time=now - timedelta(days=7)),
+            ArchivedShow(id=1000, venue_id=self.venue.id,
+                         artist_id=self.artist.id,
+                         start_time=now - timedelta(days=700),
+                         updated_at=now),
+            Song(title='Loose Song', artist_id=self.artist.id),
+        ])
+        db.session.commit()
+        self.artist_id = self.artist.id
+        self.albums = 0
+
+    def add_albums(self, count):
+        for number in range(self.albums, self.albums + count):
+            album = Album(title='Album {}'.format(number),
+                          artist_id=self.artist_id)
+            db.session.add(album)
+            db.session.flush()
+            db.session.add_all([
+                Song(title='Song {} {}'.format(number, track),
+                     artist_id=self.artist_id, album_id=album.id)
+                for track in range(3)])
+        db.session.commit()
+        self.albums += count
+
+    def page_statements(self):
+        response, count = self.count_statements(
+            '/artists/{}'.format(self.artist_id))
+        self.assertEqual(response.status_code, 200)
+        return count
+
+    def test_statements_do_not_grow_with_albums(self):
+        self.add_albums(1)
+        one = self.page_statements()
+        self.add_albums(29)
+        thirty = self.page_statements()
+        self.assertEqual(one, thirty)
+        # the three of Artist.details_statements and the conditional GET one
+        self.assertLessEqual(thirty, 4)
+
+    def test_payload(self):
+        self.add_albums(2)
+        db.session.get(Artist, self.artist_id).genres = Genre.from_names(
+            ['Pop', 'Jazz'])
+        db.session.commit()
+        artist, shows, songs = [
+            db.session.execute(statement).all()
+            for statement in Artist.details_statements(self.artist_id)]
+        data = Artist.with_genres(artist).artist_to_dictionary(
+            shows=shows, songs=songs, now=datetime.now())
+
+        # the fields of the artist are those the API serves
+        self.assertEqual(
+            {field: data[field] for field in Artist.FIELDS},
+            self.client.get('/api/v1/artists/{}'.format(
+                self.artist_id)).get_json())
+        self.assertEqual(data['name'], 'The Band')
+        self.assertEqual(data['genres'], ['Jazz', 'Pop'])
+        # the archived show is among the past ones
+        self.assertEqual(data['past_shows_count'], 2)
+        self.assertEqual(data['upcoming_shows_count'], 1)
+        self.assertEqual(data['upcoming_shows'][0]['venue_name'], 'The Hall')
+        self.assertEqual([album['title'] for album in data['albums']],
+                         ['Album 0', 'Album 1'])
+        self.assertEqual(
+            [song['title'] for song in data['albums'][1]['songs']],
+            ['Song 1 0', 'Song 1 1', 'Song 1 2'])
+        self.assertEqual(data['songs'], [{'title': 'Loose Song'}])
+
+    def test_async_reads_build_the_same_page(self):
+        # the same statements and Artist.artist_to_dictionary, the rows
+        # read concurrently over aiosqlite
+        self.add_albums(2)
+        path = '/artists/{}'.format(self.artist_id)
+        html = self.client.get(path).get_data(as_text=True)
+        app.config['ASYNC_READS'] = True
+        self.addCleanup(self.dispose_async_engines)
+        self.assertEqual(self.client.get(path).get_data(as_text=True), html)
+        self.assertTrue(reads.engines)
+
+    def dispose_async_engines(self):
+        for engine in reads.engines.values():
+            asyncio.run_coroutine_threadsafe(
+                engine.dispose(), reads.event_loop()).result()
+        reads.engines.clear()
+
+    def test_missing_and_deleted_artists(self):
+        self.assertEqual(self.client.get('/artists/999').status_code, 404)
+        db.session.get(Artist, self.artist_id).deleted_at = datetime.now()
+        db.session.commit()
+        self.assertEqual(self.client.get(
+            '/artists/{}'.format(self.artist_id)).status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import io
+import json
+import os
+import unittest
+from datetime import datetime, timedelta, timezone
+from testing import AppTestCase
+from app import app
+from models import db, Venue, Artist, Show
+
+
+class BulkBookingTestCase(AppTestCase):
+    def setUp(self):
+        super(BulkBookingTestCase, self).setUp()
+        venue = Venue(name='The Hall', address='1 Main St', city='Austin',
+                      state='TX')
+        artist = Artist(name='The Band', city='Austin', state='TX')
+        db.session.add_all([venue, artist])
+        db.session.commit()
+        self.venue_id = venue.id
+        self.artist_id = artist.id
+
+    def booking(self, start_time):
+        return {'artist_id': self.artist_id, 'venue_id': self.venue_id,
+                'start_time': start_time}
+
+    def test_offset_times_are_stored_as_local_times(self):
+        start_time = datetime(2027, 1, 1, 10, tzinfo=timezone.utc)
+        response = self.client.post('/shows/bulk', json=[
+            self.booking('2027-01-01T10:00:00Z')])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['created'], 1)
+        self.assertEqual(
+            db.session.query(Show.start_time).scalar(),
+            start_time.astimezone().replace(tzinfo=None))
+
+    def test_offset_times_clash_with_local_ones(self):
+        local = datetime(2027, 1, 1, 10)
+        response = self.client.post('/shows/bulk', json=[
+            self.booking(local.isoformat()),
+            self.booking((local + timedelta(hours=1)).astimezone(
+                timezone.utc).isoformat())])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['created'], 1)
+        self.assertEqual(response.get_json()['rejected'][0]['row'], 1)
+
+    def test_bodies_that_are_not_lists_of_shows(self):
+        for body in ('5', '"shows"', '{"bookings": []}', '{"shows": 5}',
+                     'null'):
+            response = self.client.post(
+                '/shows/bulk', data=body, content_type='application/json')
+            self.assertEqual(response.status_code, 400, body)
+            self.assertIn('error', response.get_json())
+        response = self.client.post('/shows/bulk', json={'shows': [
+            self.booking('2027-01-01T10:00:00')]})
+        self.assertEqual(response.get_json()['created'], 1)
+
+    def test_earlier_show_wins_a_clash_in_the_batch(self):
+        response = self.client.post('/shows/bulk', json=[
+            self.booking('2027-01-01T12:00:00'),
+            self.booking('2027-01-01T10:00:00')])
+        self.assertEqual(response.get_json()['rejected'], [{
+            'row': 0, 'reason': 'Conflicts with row 1 of this batch'}])
+        self.assertEqual(db.session.query(Show.start_time).scalar(),
+                         datetime(2027, 1, 1, 10))
+
+    def test_uploads_are_read_by_extension_or_mimetype(self):
+        rows = [self.booking('2027-01-01T10:00:00')]
+        response = self.client.post('/shows/bulk', data={'file': (
+            io.BytesIO(json.dumps(rows).encode()), 'shows.json',
+            'application/octet-stream')})
+        self.assertEqual(response.get_json()['created'], 1)
+
+        csv = 'artist_id,venue_id,start_time\n{},{},2027-02-01T10:00\n'.format(
+            self.artist_id, self.venue_id)
+        response = self.client.post('/shows/bulk', data={'file': (
+            io.BytesIO(csv.encode()), 'shows.csv', 'text/csv')})
+        self.assertEqual(response.get_json()['created'], 1)
+
+    def test_command_reads_by_extension(self):
+        directory = os.path.join(self.directory, 'json_exports')
+        os.mkdir(directory)
+        path = os.path.join(directory, 'shows.csv')
+        with open(path, 'w') as bookings_file:
+            bookings_file.write(
+                'artist_id,venue_id,start_time\n{},{},2027-01-01T10:00\n'
+                .format(self.artist_id, self.venue_id))
+        result = app.test_cli_runner().invoke(args=['book-shows', path])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('1 shows listed, 0 rejected.', result.output)
+
+    def test_command_reports_unreadable_files(self):
+        path = os.path.join(self.directory, 'shows.json')
+        with open(path, 'w') as bookings_file:
+            bookings_file.write('{"shows": 5')
+        result = app.test_cli_runner().invoke(args=['book-shows', path])
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn('Could not read bookings.', result.output)
+        self.assertNotIn('Traceback', result.output)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import json
+import os
+import unittest
+from datetime import datetime, timedelta
+from testing import AppTestCase
+from cache import LRUCache, SQLiteCache
+from app import app, page_cache
+from models import db, Venue, Artist, Show
+
+
+class PageCacheTestCase(AppTestCase):
+    # The venue and artist pages, cached in memory: every handler changing
+    # what one shows has to evict it.
+    def setUp(self):
+        super(PageCacheTestCase, self).setUp()
+        page_cache.backend = LRUCache()
+        venue = Venue(name='The Hall', address='1 Main St', city='Austin',
+                      state='TX', phone='512-555-0100')
+        artist = Artist(name='The Band', city='Austin', state='TX',
+                        phone='512-555-0101')
+        other = Artist(name='The Other Band', city='Austin', state='TX')
+        db.session.add_all([venue, artist, other])
+        db.session.flush()
+        db.session.add(Show(venue_id=venue.id, artist_id=artist.id,
+                            start_time=datetime.now() + timedelta(days=7)))
+        db.session.commit()
+        self.venue_path = '/venues/{}'.format(venue.id)
+        self.artist_path = '/artists/{}'.format(artist.id)
+        self.venue_id = venue.id
+        self.artist_id = artist.id
+        self.other_id = other.id
+
+    def page(self, path):
+        # the page, and whether it was rendered rather than served from the
+        # cache, which takes the conditional GET query alone
+        response, count = self.count_statements(path)
+        return response.get_data(as_text=True), count > 1
+
+    def cache_pages(self):
+        for path in (self.venue_path, self.artist_path):
+            self.assertTrue(self.page(path)[1])
+            self.assertFalse(self.page(path)[1])
+
+    def post(self, path, data=None):
+        # followed, so the flash message is shown and gone
+        response = self.client.post(path, data=data, follow_redirects=True)
+        self.assertEqual(response.status_code, 200)
+        return response.get_data(as_text=True)
+
+    def test_booking_evicts_venue_and_artist(self):
+        self.cache_pages()
+        self.assertIn('successfully listed', self.post('/shows/create', {
+            'artist_id': self.other_id, 'venue_id': self.venue_id,
+            'start_time': (datetime.now() + timedelta(days=14)).strftime(
+                '%Y-%m-%d %H:%M:%S')}))
+
+        html, rendered = self.page(self.venue_path)
+        self.assertTrue(rendered)
+        self.assertIn('The Other Band', html)
+        html, rendered = self.page('/artists/{}'.format(self.other_id))
+        self.assertIn('The Hall', html)
+        # not playing the new show, the artist's page stays cached
+        self.assertFalse(self.page(self.artist_path)[1])
+
+    def test_bulk_booking_evicts_venue_and_artist(self):
+        self.cache_pages()
+        response = self.client.post('/shows/bulk', json=[{
+            'artist_id': self.artist_id, 'venue_id': self.venue_id,
+            'start_time': (datetime.now() + timedelta(days=14)).isoformat()
+        }])
+        self.assertEqual(response.get_json()['created'], 1)
+        for path in (self.venue_path, self.artist_path):
+            html, rendered = self.page(path)
+            self.assertTrue(rendered)
+            self.assertIn('2 Upcoming Shows', html)
+
+    def test_editing_venue_evicts_its_artists(self):
+        self.cache_pages()
+        self.assertIn('successfully updated', self.post(
+            self.venue_path + '/edit', {
+                'name': 'The New Hall', 'city': 'Austin', 'state': 'TX',
+                'address': '1 Main St', 'phone': '512-555-0100',
+                'genres': ['Jazz']}))
+        for path in (self.venue_path, self.artist_path):
+            html, rendered = self.page(path)
+            self.assertTrue(rendered)
+            self.assertIn('The New Hall', html)
+
+    def test_editing_artist_evicts_its_venues(self):
+        self.cache_pages()
+        self.assertIn('successfully updated', self.post(
+            self.artist_path + '/edit', {
+                'name': 'The New Band', 'city': 'Austin', 'state': 'TX',
+                'phone': '512-555-0101', 'genres': ['Jazz']}))
+        for path in (self.venue_path, self.artist_path):
+            html, rendered = self.page(path)
+            self.assertTrue(rendered)
+            self.assertIn('The New Band', html)
+
+    def test_deleting_venue_evicts_it_and_its_artists(self):
+        self.cache_pages()
+        self.assertIn('has been deleted', self.post(
+            self.venue_path + '/delete'))
+        self.assertEqual(self.client.get(self.venue_path).status_code, 404)
+        html, rendered = self.page(self.artist_path)
+        self.assertTrue(rendered)
+        self.assertNotIn('The Hall', html)
+
+    def test_deleting_artist_evicts_it_and_its_venues(self):
+        self.cache_pages()
+        self.assertIn('has been deleted', self.post(
+            self.artist_path + '/delete'))
+        self.assertEqual(self.client.get(self.artist_path).status_code, 404)
+        html, rendered = self.page(self.venue_path)
+        self.assertTrue(rendered)
+        self.assertNotIn('The Band', html)
+
+    def test_commands_warn_of_memory_backend(self):
+        path = os.path.join(self.directory, 'shows.json')
+        with open(path, 'w') as bookings_file:
+            json.dump([{
+                'artist_id': self.other_id, 'venue_id': self.venue_id,
+                'start_time': (datetime.now() + timedelta(days=14)).isoformat()
+            }], bookings_file)
+        runner = app.test_cli_runner()
+        result = runner.invoke(args=['book-shows', path])
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("PAGE_CACHE_BACKEND is 'memory'", result.output)
+
+        page_cache.backend = SQLiteCache(
+            os.path.join(self.directory, 'pages.sqlite'))
+        result = runner.invoke(args=['book-shows', path])
+        self.assertEqual(result.exit_code, 0)
+        self.assertNotIn('PAGE_CACHE_BACKEND', result.output)
+
+
+if __name__ == '__main__':
+    unittest.main()
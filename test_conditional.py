@@ -0,0 +1,66 @@
+import unittest
+from testing import AppTestCase
+from models import db, Venue, Artist
+
+
+class ConditionalGetTestCase(AppTestCase):
+    def setUp(self):
+        super(ConditionalGetTestCase, self).setUp()
+        venue = Venue(name='The Hall', address='1 Main St', city='Austin',
+                      state='TX')
+        db.session.add_all([venue, Artist(name='The Band', city='Austin',
+                                          state='TX')])
+        db.session.commit()
+        self.venue_id = venue.id
+
+    def test_matching_etag_is_not_modified(self):
+        etag = self.client.get('/venues').headers['ETag']
+        self.assertTrue(etag.startswith('W/'))
+
+        response, count = self.count_statements(
+            '/venues', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b'')
+        self.assertEqual(response.headers['ETag'], etag)
+        # the validators alone; the page's own query does not run
+        self.assertEqual(count, 1)
+
+    def test_last_modified_is_not_modified(self):
+        last_modified = self.client.get('/venues').headers['Last-Modified']
+        response = self.client.get(
+            '/venues', headers={'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_code, 304)
+
+    def test_change_invalidates_etag(self):
+        path = '/venues/{}'.format(self.venue_id)
+        etags = {page: self.client.get(page).headers['ETag']
+                 for page in ('/venues', path, '/artists')}
+
+        response = self.client.post(path + '/edit', data={
+            'name': 'The New Hall', 'city': 'Austin', 'state': 'TX',
+            'address': '1 Main St', 'phone': '512-555-0100',
+            'genres': ['Jazz']}, follow_redirects=True)
+        # pages showing a flash message are one-off, without validators
+        self.assertIn('successfully updated', response.get_data(as_text=True))
+        self.assertNotIn('ETag', response.headers)
+
+        for page in ('/venues', path):
+            response = self.client.get(
+                page, headers={'If-None-Match': etags[page]})
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('The New Hall', response.get_data(as_text=True))
+            self.assertNotEqual(response.headers['ETag'], etags[page])
+        # the artists are not built from venues
+        self.assertEqual(self.client.get(
+            '/artists', headers={'If-None-Match': etags['/artists']}
+        ).status_code, 304)
+
+    def test_representations_have_their_own_etags(self):
+        html = self.client.get('/venues').headers['ETag']
+        self.assertEqual(self.client.get('/venues', headers={
+            'If-None-Match': html, 'Accept': 'application/json'}
+        ).status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
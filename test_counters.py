@@ -0,0 +1,83 @@
+import unittest
+from datetime import datetime, timedelta
+from testing import AppTestCase
+from app import app
+from counters import roll_show_counts, rebuild_show_counts
+from models import db, Venue, Artist, Show, ShowCountsState
+
+
+class ShowCountsTestCase(AppTestCase):
+    def setUp(self):
+        super(ShowCountsTestCase, self).setUp()
+        self.now = datetime.now().replace(microsecond=0)
+        venue = Venue(name='The Hall', address='1 Main St', city='Austin',
+                      state='TX')
+        artist = Artist(name='The Band', city='Austin', state='TX')
+        db.session.add_all([venue, artist])
+        db.session.flush()
+        db.session.add_all([
+            Show(venue_id=venue.id, artist_id=artist.id,
+                 start_time=self.now + timedelta(hours=1)),
+            Show(venue_id=venue.id, artist_id=artist.id,
+                 start_time=self.now + timedelta(days=2)),
+            Show(venue_id=venue.id, artist_id=artist.id,
+                 start_time=self.now - timedelta(days=2)),
+        ])
+        rebuild_show_counts(self.now)
+        db.session.commit()
+        self.venue_id = venue.id
+        self.artist_id = artist.id
+
+    def counts(self):
+        # (upcoming, past) of the venue and of the artist
+        db.session.expire_all()
+        return [(record.upcoming_shows_count, record.past_shows_count)
+                for record in (db.session.get(Venue, self.venue_id),
+                               db.session.get(Artist, self.artist_id))]
+
+    def rolled_at(self):
+        return ShowCountsState.query.one().rolled_at
+
+    def test_rebuild(self):
+        self.assertEqual(self.counts(), [(2, 1), (2, 1)])
+        self.assertEqual(self.rolled_at(), self.now)
+
+    def test_roll_moves_started_shows_to_past(self):
+        later = self.now + timedelta(hours=3)
+        self.assertEqual(roll_show_counts(later), 1)
+        db.session.commit()
+        self.assertEqual(self.counts(), [(1, 2), (1, 2)])
+        self.assertEqual(self.rolled_at(), later)
+
+        # shows are only moved once
+        self.assertEqual(roll_show_counts(later + timedelta(hours=1)), 0)
+        db.session.commit()
+        self.assertEqual(self.counts(), [(1, 2), (1, 2)])
+
+        # and a rebuild at the same time agrees
+        rebuild_show_counts(later + timedelta(hours=1))
+        db.session.commit()
+        self.assertEqual(self.counts(), [(1, 2), (1, 2)])
+
+    def test_bookings_count_against_watermark(self):
+        self.client.post('/shows/create', data={
+            'artist_id': self.artist_id, 'venue_id': self.venue_id,
+            'start_time': (self.now + timedelta(days=9)).strftime(
+                '%Y-%m-%d %H:%M:%S')})
+        self.assertEqual(self.counts(), [(3, 1), (3, 1)])
+
+    def test_command(self):
+        # a show that started since the last roll
+        rebuild_show_counts(self.now - timedelta(days=3))
+        db.session.commit()
+        self.assertEqual(self.counts(), [(3, 0), (3, 0)])
+
+        result = app.test_cli_runner().invoke(args=['roll-show-counts'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('1 shows moved to past.', result.output)
+        self.assertEqual(self.counts(), [(2, 1), (2, 1)])
+        self.assertGreater(self.rolled_at(), self.now)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import base64
+import json
+import re
+import unittest
+from testing import AppTestCase
+from app import app
+from seed import generate
+from models import db, Venue, Artist, Genre
+
+LINK = re.compile(r'href="(/(?:venues|artists)\?[^"]*)">'
+                  r'(&larr; Previous|Next &rarr;)')
+ITEM = re.compile(r'href="/(?:venues|artists)/(\d+)"')
+
+
+class ListingsTestCase(AppTestCase):
+    def setUp(self):
+        super(ListingsTestCase, self).setUp()
+        generate(venues=47, artists=43, shows=0, albums=0, songs=0, seed=3)
+        db.session.get(Venue, 5).deleted_at = db.func.now()
+        db.session.commit()
+
+    def page(self, url):
+        # the ids listed on a page, and its previous and next links
+        html = self.client.get(url.replace('&amp;', '&')).get_data(
+            as_text=True)
+        links = {label: path.replace('&amp;', '&')
+                 for path, label in LINK.findall(html)}
+        return ([int(item) for item in ITEM.findall(html)],
+                links.get('&larr; Previous'), links.get('Next &rarr;'))
+
+    def walk(self, url):
+        # the pages from url on, following Next, then back again from the
+        # last one, following Previous
+        pages = []
+        while url:
+            ids, previous, url = self.page(url)
+            pages.append(ids)
+        back = []
+        while previous:
+            ids, previous, following = self.page(previous)
+            back.insert(0, ids)
+        return pages, back
+
+    def expected(self, model, sort):
+        query = model.query.filter(model.active())
+        return [row.id for row in query.order_by(*{
+            'name': (model.name, model.id),
+            'city': (model.city, model.state, model.id),
+            'newest': (model.created_date.desc(), model.id.desc()),
+        }[sort])]
+
+    def test_cursors_round_trip(self):
+        for model, path in ((Venue, '/venues'), (Artist, '/artists')):
+            for sort in ('name', 'city', 'newest'):
+                pages, back = self.walk(
+                    '{}?sort={}&per_page=10'.format(path, sort))
+                self.assertEqual(sum(pages, []), self.expected(model, sort))
+                self.assertEqual(len(pages), 5)
+                self.assertEqual(back, pages[:-1])
+
+    def test_filtered_by_genre(self):
+        genre = Genre.query.first().name
+        pages, back = self.walk('/venues?sort=name&per_page=3&genre=' + genre)
+        self.assertEqual(sum(pages, []), [
+            venue.id for venue in Venue.query.filter(
+                Venue.active(), Venue.genres.any(Genre.name == genre)
+            ).order_by(Venue.name, Venue.id)])
+        self.assertGreater(len(pages), 1)
+        self.assertEqual(back, pages[:-1])
+
+    def test_bad_cursors(self):
+        self.assertEqual(self.client.get('/venues?after=zzz').status_code,
+                         400)
+        # a cursor of the wrong sort
+        self.assertEqual(
+            self.client.get('/artists?sort=city&before=WzFd').status_code,
+            400)
+
+    def test_cursors_of_the_wrong_types(self):
+        for sort, values in (
+                ('name', [{'a': 1}, [2]]),
+                ('name', {'name': 'x', 'id': 1}),
+                ('name', 'x'),
+                ('name', [1, 2]),
+                ('name', ['x', '1']),
+                ('name', ['x', True]),
+                ('name', ['x', 1.5]),
+                ('city', ['Austin', None, 1]),
+                ('newest', ['yesterday', 1]),
+                ('newest', [20260101, 1])):
+            cursor = base64.urlsafe_b64encode(
+                json.dumps(values).encode()).decode()
+            for path in ('/venues', '/artists'):
+                for direction in ('before', 'after'):
+                    self.assertEqual(self.client.get(
+                        '{}?sort={}&{}={}'.format(
+                            path, sort, direction, cursor)).status_code,
+                        400, (path, sort, values))
+
+    def test_per_page_is_bounded(self):
+        app.config['LISTINGS_MAX_PER_PAGE'] = 20
+        for per_page, listed in (('100000', 20), ('-3', 1)):
+            ids, previous, following = self.page(
+                '/artists?per_page=' + per_page)
+            self.assertEqual(len(ids), listed)
+
+
+if __name__ == '__main__':
+    unittest.main()
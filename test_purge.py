@@ -0,0 +1,117 @@
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from testing import AppTestCase
+from app import app
+from cascade import purge_deleted
+from models import (
+    db,
+    Venue,
+    Artist,
+    Show,
+    ArchivedShow,
+    Album,
+    Song,
+    Genre,
+    venue_genres,
+    artist_genres
+)
+
+
+def enforce_foreign_keys(connection, record):
+    connection.execute('PRAGMA foreign_keys = ON')
+
+
+class PurgeTestCase(AppTestCase):
+    # Foreign keys are enforced, as on Postgres, so rows referred to by
+    # others can only go after them.
+    def setUp(self):
+        super(PurgeTestCase, self).setUp()
+        engine = db.get_engine()
+        event.listen(engine, 'connect', enforce_foreign_keys)
+        self.addCleanup(event.remove, engine, 'connect',
+                        enforce_foreign_keys)
+        engine.dispose()
+
+        now = datetime.now()
+        jazz = Genre(name='Jazz')
+        kept_venue, deleted_venue = [
+            Venue(name=name, address='1 Main St', city='Austin', state='TX',
+                  genres=[jazz]) for name in ('Kept Hall', 'Deleted Hall')]
+        kept_artist, deleted_artist = [
+            Artist(name=name, city='Austin', state='TX', genres=[jazz])
+            for name in ('Kept Band', 'Deleted Band')]
+        db.session.add_all([kept_venue, deleted_venue, kept_artist,
+                            deleted_artist])
+        db.session.flush()
+        for number, (venue, artist) in enumerate([
+                (kept_venue, kept_artist), (deleted_venue, kept_artist),
+                (kept_venue, deleted_artist),
+                (deleted_venue, deleted_artist)]):
+            db.session.add_all([
+                Show(venue_id=venue.id, artist_id=artist.id,
+                     start_time=now + timedelta(days=number + 1)),
+                ArchivedShow(id=1000 + number, venue_id=venue.id,
+                             artist_id=artist.id, updated_at=now,
+                             start_time=now - timedelta(days=number + 365))])
+        for artist in (kept_artist, deleted_artist):
+            album = Album(title='Album', artist_id=artist.id)
+            db.session.add(album)
+            db.session.flush()
+            db.session.add_all([
+                Song(title='Song', artist_id=artist.id, album_id=album.id),
+                Song(title='Single', artist_id=artist.id)])
+        db.session.commit()
+        self.kept = (kept_venue.id, kept_artist.id)
+
+        for path in ('/venues/{}/delete'.format(deleted_venue.id),
+                     '/artists/{}/delete'.format(deleted_artist.id)):
+            self.assertEqual(self.client.post(path).status_code, 302)
+
+    def assertOnlyKeptRowsLeft(self):
+        venue_id, artist_id = self.kept
+        self.assertEqual([venue.id for venue in Venue.query], [venue_id])
+        self.assertEqual([artist.id for artist in Artist.query], [artist_id])
+        for model in (Show, ArchivedShow):
+            self.assertEqual(
+                [(show.venue_id, show.artist_id) for show in model.query],
+                [self.kept])
+        self.assertEqual({album.artist_id for album in Album.query},
+                         {artist_id})
+        self.assertEqual(
+            sorted(song.title for song in Song.query.filter_by(
+                artist_id=artist_id)), ['Single', 'Song'])
+        self.assertEqual(Song.query.count(), 2)
+        self.assertEqual(
+            db.session.query(venue_genres.c.venue_id).all(), [(venue_id,)])
+        self.assertEqual(
+            db.session.query(artist_genres.c.artist_id).all(),
+            [(artist_id,)])
+        self.assertEqual(Genre.query.count(), 1)
+
+    def test_purges_deleted_venues_and_artists(self):
+        purged = purge_deleted(batch_size=2, pause=0)
+        self.assertEqual(purged, {
+            'shows': 3,
+            'archived_shows': 3,
+            'songs': 2,
+            'albums': 1,
+            'venue_genres': 1,
+            'artist_genres': 1,
+            'venues': 1,
+            'artists': 1,
+        })
+        self.assertOnlyKeptRowsLeft()
+        # nothing left to purge
+        self.assertEqual(set(purge_deleted(pause=0).values()), {0})
+
+    def test_command(self):
+        result = app.test_cli_runner().invoke(
+            args=['purge-deleted', '--batch-size', '1', '--pause', '0'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('3 shows', result.output)
+        self.assertOnlyKeptRowsLeft()
+
+
+if __name__ == '__main__':
+    unittest.main()
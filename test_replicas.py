@@ -0,0 +1,81 @@
+import time
+import unittest
+from sqlalchemy import create_engine
+from testing import AppTestCase
+from app import app
+from models import db, Venue
+
+
+class ReplicasTestCase(AppTestCase):
+    # Two SQLite files stand for the primary and its replica, holding
+    # different venues, so a page tells which one it was read from.
+    def setUp(self):
+        super(ReplicasTestCase, self).setUp()
+        replica_uri = self.database_uri('replica')
+        replica = create_engine(replica_uri)
+        db.metadata.create_all(replica)
+        with replica.begin() as connection:
+            connection.execute(Venue.__table__.insert(), [{
+                'name': 'Replica Hall', 'address': '1 Main St',
+                'city': 'Austin', 'state': 'TX'}])
+        replica.dispose()
+
+        db.session.add(Venue(name='Primary Hall', address='1 Main St',
+                             city='Austin', state='TX'))
+        db.session.commit()
+        app.config.update(SQLALCHEMY_REPLICA_URIS=[replica_uri],
+                          DB_REPLICA_MAX_LAG=0.5)
+        self.addCleanup(self.dispose_replicas)
+
+    def dispose_replicas(self):
+        for engine in db.replicas.engines.values():
+            engine.dispose()
+        db.replicas.engines.clear()
+        db.replicas.lags.clear()
+
+    def venues_page(self):
+        return self.client.get('/venues').get_data(as_text=True)
+
+    def test_get_reads_replica(self):
+        html = self.venues_page()
+        self.assertIn('Replica Hall', html)
+        self.assertNotIn('Primary Hall', html)
+
+    def test_cached_pages_read_primary(self):
+        # the venue page outlives the request in the page cache
+        venue_id = Venue.query.filter_by(name='Primary Hall').one().id
+        html = self.client.get('/venues/{}'.format(venue_id)).get_data(
+            as_text=True)
+        self.assertIn('Primary Hall', html)
+
+    def test_reads_own_writes_until_max_lag(self):
+        response = self.client.post('/venues/create', data={
+            'name': 'New Hall', 'city': 'Austin', 'state': 'TX',
+            'address': '2 Main St', 'phone': '512-555-0100',
+            'genres': ['Jazz']})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Venue.query.filter_by(name='New Hall').count(), 1)
+
+        # within DB_REPLICA_MAX_LAG the client reads the primary
+        html = self.venues_page()
+        self.assertIn('New Hall', html)
+        self.assertIn('Primary Hall', html)
+        self.assertNotIn('Replica Hall', html)
+
+        # and the replica once it has caught up
+        time.sleep(0.6)
+        html = self.venues_page()
+        self.assertIn('Replica Hall', html)
+        self.assertNotIn('New Hall', html)
+
+    def test_other_clients_keep_reading_replica(self):
+        self.client.post('/venues/create', data={
+            'name': 'New Hall', 'city': 'Austin', 'state': 'TX',
+            'address': '2 Main St', 'phone': '512-555-0100',
+            'genres': ['Jazz']})
+        html = app.test_client().get('/venues').get_data(as_text=True)
+        self.assertIn('Replica Hall', html)
+
+
+if __name__ == '__main__':
+    unittest.main()
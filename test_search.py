@@ -0,0 +1,62 @@
+import unittest
+from testing import AppTestCase
+from models import db, Venue, Artist
+
+FORMS = {
+    'venues': {'city': 'Austin', 'state': 'TX', 'address': '1 Main St',
+               'phone': '512-555-0100', 'genres': ['Jazz']},
+    'artists': {'city': 'Austin', 'state': 'TX', 'phone': '512-555-0100',
+                'genres': ['Jazz']},
+}
+
+
+class SuggestTestCase(AppTestCase):
+    # The typeahead indexes are built once, on the first request, and kept
+    # up to date by the create, edit and delete handlers.
+    def setUp(self):
+        super(SuggestTestCase, self).setUp()
+        db.session.add_all([
+            Venue(name='The Jazz Bar', address='1 Main St', city='Austin',
+                  state='TX'),
+            Artist(name='Jazz Quartet', city='Austin', state='TX')])
+        db.session.commit()
+
+    def suggestions(self, kind, prefix):
+        return [suggestion['name'] for suggestion in self.client.get(
+            '/{}/suggest'.format(kind), query_string={'q': prefix}
+        ).get_json()['suggestions']]
+
+    def post(self, path, **data):
+        response = self.client.post(path, data=data)
+        self.assertEqual(response.status_code, 302)
+
+    def test_suggests_by_any_word(self):
+        self.assertEqual(self.suggestions('venues', 'jaz'), ['The Jazz Bar'])
+        self.assertEqual(self.suggestions('venues', 'THE j'),
+                         ['The Jazz Bar'])
+        self.assertEqual(self.suggestions('venues', 'bars'), [])
+        self.assertEqual(self.suggestions('venues', ''), [])
+
+    def test_created_edited_and_deleted(self):
+        for kind, model in (('venues', Venue), ('artists', Artist)):
+            # the index is built before the changes
+            self.assertEqual(self.suggestions(kind, 'blue'), [])
+
+            self.post('/{}/create'.format(kind), name='Blue Note',
+                      **FORMS[kind])
+            self.assertEqual(self.suggestions(kind, 'blue'), ['Blue Note'])
+            self.assertEqual(self.suggestions(kind, 'note'), ['Blue Note'])
+
+            record_id = model.query.filter_by(name='Blue Note').one().id
+            path = '/{}/{}'.format(kind, record_id)
+            self.post(path + '/edit', name='Green Room', **FORMS[kind])
+            self.assertEqual(self.suggestions(kind, 'blue'), [])
+            self.assertEqual(self.suggestions(kind, 'gre'), ['Green Room'])
+
+            self.post(path + '/delete')
+            self.assertEqual(self.suggestions(kind, 'gre'), [])
+            self.assertEqual(len(self.suggestions(kind, 'jazz')), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from testing import AppTestCase
+from models import db, Venue, venue_genres
+from transfer import import_rows
+
+
+def venue(**data):
+    data.update(name='Venue {}'.format(data.get('id', 'new')),
+                address='1 Main St', city='Austin', state='TX')
+    return data
+
+
+def venue_row(**data):
+    # as the import file has it
+    data = venue(**data)
+    data.update(phone='512-555-0100', genres=['Jazz'])
+    return data
+
+
+class ImportTestCase(AppTestCase):
+    def import_venues(self, rows):
+        results = list(import_rows('venues', [
+            (number, row, None) for number, row in enumerate(rows, 1)],
+            batch_size=100))
+        return (sum(inserted for inserted, rejected in results),
+                [rejection for inserted, rejected in results
+                 for rejection in rejected])
+
+    def test_rows_without_id_skip_ids_of_the_batch(self):
+        db.session.add_all([Venue(**venue(id=number))
+                            for number in range(1, 11)])
+        db.session.commit()
+
+        imported, rejected = self.import_venues([
+            venue_row(id=11), venue_row(), venue_row(id=13), venue_row()])
+        self.assertEqual((imported, rejected), (4, []))
+        ids = [venue_id for (venue_id,) in db.session.query(Venue.id)]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(len(ids), 14)
+        # each linked to its genre
+        self.assertEqual(sorted(venue_id for venue_id, genre_id in
+                                db.session.query(venue_genres)),
+                         sorted(ids)[10:])
+
+    def test_taken_ids_are_rejected(self):
+        db.session.add(Venue(**venue(id=1)))
+        db.session.commit()
+        imported, rejected = self.import_venues([venue_row(id=1),
+                                                venue_row()])
+        self.assertEqual((imported, rejected), (1, [(1, 'Already exists')]))
+
+
+if __name__ == '__main__':
+    unittest.main()
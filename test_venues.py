@@ -0,0 +1,42 @@
+import unittest
+from testing import AppTestCase
+from seed import generate
+from models import db, Venue
+
+
+class VenuesTestCase(AppTestCase):
+    def venues_statements(self, venues):
+        generate(venues=venues, artists=10, shows=10 * venues, albums=0,
+                 songs=0, seed=1)
+        db.session.commit()
+        response, count = self.count_statements('/venues')
+        self.assertEqual(response.status_code, 200)
+        return count
+
+    def test_statements_do_not_grow_with_venues_and_shows(self):
+        few = self.venues_statements(10)
+        db.drop_all()
+        db.create_all()
+        many = self.venues_statements(100)
+        self.assertEqual(few, many)
+        # the page's query and the conditional GET one
+        self.assertLessEqual(many, 2)
+
+    def test_lists_active_venues_by_area(self):
+        generate(venues=10, artists=10, shows=100, albums=0, songs=0, seed=1)
+        deleted = Venue.query.first()
+        deleted.deleted_at = db.func.now()
+        db.session.commit()
+        deleted_id = deleted.id
+        active = Venue.query.filter(Venue.active()).all()
+
+        html = self.client.get('/venues').get_data(as_text=True)
+        for venue in active:
+            self.assertIn('href="/venues/{}"'.format(venue.id), html)
+            self.assertIn('<h3>{}, {}</h3>'.format(venue.city, venue.state),
+                          html)
+        self.assertNotIn('href="/venues/{}"'.format(deleted_id), html)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+# ----------------------------------------------------------------------------#
+# Shared setup of the test_*.py modules: every test runs the app against a
+# fresh SQLite database of its own, with the page cache off, and can count
+# the statements a request issues.
+#
+#   python -m pytest -q
+#   python test_venues.py -v
+# ----------------------------------------------------------------------------#
+
+import os
+import shutil
+import tempfile
+import unittest
+from flask import _app_ctx_stack
+from flask.testing import FlaskClient
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app import app, file_handler, page_cache, search
+from models import db
+
+# the tests' requests are not logged to error.log
+app.logger.removeHandler(file_handler)
+
+statements = {'count': 0}
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def count_statement(conn, cursor, statement, parameters, context,
+                    executemany):
+    statements['count'] += 1
+
+
+class TestClient(FlaskClient):
+    # Requests get an app context, and so a `g`, of their own, as they do
+    # when served, rather than sharing the one the test has pushed. Streamed
+    # responses are read in full meanwhile, as their context ends with them.
+    def open(self, *args, **kwargs):
+        context = _app_ctx_stack.top
+        if context is None:
+            return super(TestClient, self).open(*args, **kwargs)
+        kwargs['buffered'] = True
+        context.pop()
+        try:
+            return super(TestClient, self).open(*args, **kwargs)
+        finally:
+            context.push()
+
+
+class AppTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.addCleanup(app.config.update, dict(app.config))
+        self.addCleanup(setattr, page_cache, 'backend', page_cache.backend)
+        app.config.update(
+            TESTING=True,
+            WTF_CSRF_ENABLED=False,
+            SQLALCHEMY_DATABASE_URI=self.database_uri('primary'),
+            SQLALCHEMY_REPLICA_URIS=[],
+            ASYNC_READS=False,
+            ASYNC_DATABASE_URI=None,
+        )
+        page_cache.backend = None
+        # built from the database of the test that used them first
+        search.indexes.clear()
+        search.prefix_indexes.clear()
+
+        self.context = app.app_context()
+        self.context.push()
+        db.create_all()
+        self.client = TestClient(app, app.response_class, use_cookies=True)
+
+    def tearDown(self):
+        db.session.remove()
+        db.get_engine().dispose()
+        self.context.pop()
+
+    def database_uri(self, name):
+        return 'sqlite:///' + os.path.join(
+            self.directory, name + '.sqlite')
+
+    def count_statements(self, path, **kwargs):
+        # the response to a GET of path, read in full, and the number of
+        # statements it took
+        statements['count'] = 0
+        response = self.client.get(path, **kwargs)
+        response.get_data()
+        return response, statements['count']
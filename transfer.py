@@ -0,0 +1,345 @@
+import csv
+import json
+from datetime import datetime
+import dateutil.parser
+from sqlalchemy import select, text
+from werkzeug.datastructures import MultiDict
+from wtforms import BooleanField
+from bookings import book_shows
+from forms import (
+    GenreForm,
+    VenueForm,
+    ArtistForm,
+    AlbumForm,
+    SongForm,
+    ShowForm,
+    list_of_genres
+)
+from models import (
+    db,
+    Genre,
+    Venue,
+    Artist,
+    Album,
+    Song,
+    Show,
+    venue_genres,
+    artist_genres
+)
+
+# Files are CSV, or NDJSON (one JSON object per line). In CSV, genres are
+# separated by ';'. Dates are written in ShowForm.start_time's format.
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# In import order: rows may refer to rows of the kinds above them.
+KINDS = {
+    'genres': (Genre, GenreForm),
+    'venues': (Venue, VenueForm),
+    'artists': (Artist, ArtistForm),
+    'albums': (Album, AlbumForm),
+    'songs': (Song, SongForm),
+    'shows': (Show, ShowForm),
+}
+
+GENRE_LINKS = {
+    Venue: (venue_genres, venue_genres.c.venue_id),
+    Artist: (artist_genres, artist_genres.c.artist_id),
+}
+
+# Columns referring to other rows, and the model they refer to.
+REFERENCES = {
+    Album: (('artist_id', Artist),),
+    Song: (('artist_id', Artist), ('album_id', Album)),
+}
+
+# Maintained by the app, so neither exported nor imported.
+COMPUTED_COLUMNS = ('upcoming_shows_count', 'past_shows_count', 'updated_at',
+                    'deleted_at')
+
+# Deleted venues and artists are left out, and so are their rows.
+OWNERS = {'venue_id': Venue, 'artist_id': Artist}
+
+
+def file_format(path, format=None):
+    if format:
+        return format
+    return 'csv' if path.lower().endswith('.csv') else 'ndjson'
+
+
+def read_rows(lines, format):
+    # yields (line number, row, error), reading one line at a time
+    if format == 'csv':
+        for number, row in enumerate(csv.DictReader(lines), 1):
+            if row.get('genres'):
+                row['genres'] = [genre for genre in row['genres'].split(';')
+                                 if genre]
+            yield number, row, None
+        return
+
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as err:
+            yield number, None, 'Invalid JSON: {}'.format(err)
+            continue
+        if not isinstance(row, dict):
+            yield number, None, 'Row must be a JSON object'
+            continue
+        yield number, row, None
+
+
+def validate(form_class, row):
+    # Runs the form's validators on the row as if it had been posted;
+    # returns the form data, or the errors.
+    booleans = {name for name in dir(form_class)
+                if getattr(getattr(form_class, name), 'field_class', None)
+                is BooleanField}
+    formdata = MultiDict()
+    for key, value in row.items():
+        if value is None or value == '':
+            continue
+        if key in booleans:
+            if str(value).lower() not in ('false', '0', 'no', 'n', 'off'):
+                formdata.add(key, 'y')
+        elif isinstance(value, list):
+            for item in value:
+                formdata.add(key, str(item))
+        else:
+            formdata.add(key, str(value))
+
+    form = form_class(formdata=formdata, meta={'csrf': False})
+    if not form.validate():
+        return None, '; '.join(
+            '{}: {}'.format(name, ' '.join(errors))
+            for name, errors in sorted(form.errors.items()))
+
+    # empty fields are missing values, as CSV can't tell them apart
+    data = {name: None if value == '' else value
+            for name, value in form.data.items()}
+    try:
+        if row.get('id') not in (None, '') and form_class is not ShowForm:
+            data['id'] = int(row['id'])
+        if row.get('created_date'):
+            data['created_date'] = dateutil.parser.parse(
+                str(row['created_date']))
+    except (TypeError, ValueError, OverflowError):
+        return None, 'Invalid id or created_date'
+    return data, None
+
+
+def import_rows(kind, rows, batch_size=1000):
+    # Validates the rows of a kind with its form and inserts them, one batch
+    # per transaction. Yields (inserted, rejected) per batch, rejected being
+    # (line number, reason) pairs; rejected rows never stop the import.
+    model, form_class = KINDS[kind]
+    if model in GENRE_LINKS:
+        # every genre the forms accept has a row
+        db.session.add_all(Genre.from_names(list_of_genres))
+        db.session.commit()
+
+    batch = []
+    rejected = []
+    for number, row, error in rows:
+        if not error:
+            data, error = validate(form_class, row)
+        if error:
+            rejected.append((number, error))
+        else:
+            batch.append((number, data))
+
+        if len(batch) >= batch_size:
+            inserted, batch_rejected = insert_batch(model, batch)
+            yield inserted, rejected + batch_rejected
+            batch = []
+            rejected = []
+
+    if batch or rejected:
+        inserted, batch_rejected = insert_batch(model, batch)
+        yield inserted, rejected + batch_rejected
+
+
+def insert_batch(model, batch):
+    if not batch:
+        return 0, []
+    if model is Show:
+        return insert_shows(batch)
+
+    table = model.__table__
+    rejected = []
+
+    # rows referring to missing rows, or reusing an id or genre name
+    existing = {}
+    for column, referred in REFERENCES.get(model, ()):
+        existing[column] = existing_ids(referred, {
+            data[column] for number, data in batch
+            if data.get(column) is not None}, active=True)
+    taken = existing_ids(model, {
+        data['id'] for number, data in batch if 'id' in data})
+    taken_names = set()
+    if model is Genre:
+        taken_names = {name for (name,) in db.session.query(
+            Genre.name).filter(Genre.name.in_(
+                {data['name'] for number, data in batch}))}
+
+    rows = []
+    for number, data in batch:
+        missing = [column for column in existing
+                   if data.get(column) is not None and
+                   data[column] not in existing[column]]
+        if missing:
+            rejected.append((number, '{} {} does not exist'.format(
+                missing[0], data[missing[0]])))
+        elif data.get('id', 0) in taken or \
+                model is Genre and data['name'] in taken_names:
+            rejected.append((number, 'Already exists'))
+        else:
+            if 'id' in data:
+                taken.add(data['id'])
+            if model is Genre:
+                taken_names.add(data['name'])
+            rows.append(data)
+
+    explicit = [data['id'] for data in rows if 'id' in data]
+    ids = iter(allocate_ids(table, len(rows) - len(explicit), explicit))
+    now = datetime.now()
+    records = []
+    links = []
+    genre_ids = dict(db.session.query(Genre.name, Genre.id)) \
+        if model in GENRE_LINKS else {}
+    for data in rows:
+        record = {column: value for column, value in data.items()
+                  if column in table.c and column not in COMPUTED_COLUMNS}
+        if 'id' not in record:
+            record['id'] = next(ids)
+        if 'created_date' in table.c:
+            record.setdefault('created_date', now)
+        records.append(record)
+
+        if model in GENRE_LINKS:
+            link_table, owner_column = GENRE_LINKS[model]
+            links.extend({owner_column.name: record['id'],
+                          'genre_id': genre_ids[name]}
+                         for name in set(data['genres']))
+
+    # executemany; psycopg2 sends it as multi-row INSERTs
+    if records:
+        db.session.execute(table.insert(), records)
+    if links:
+        db.session.execute(GENRE_LINKS[model][0].insert(), links)
+    if explicit and db.engine.dialect.name == 'postgresql':
+        db.session.execute(text(
+            "SELECT setval(pg_get_serial_sequence('{0}', 'id'), "
+            "(SELECT max(id) FROM {0}))".format(table.name)))
+    db.session.commit()
+    return len(records), rejected
+
+
+def insert_shows(batch):
+    # bookings.book_shows checks the artists and venues exist and are free
+    accepted, rejected = book_shows([{
+        'artist_id': data['artist_id'],
+        'venue_id': data['venue_id'],
+        'start_time': data['start_time']
+    } for number, data in batch])
+    db.session.commit()
+    return len(accepted), [(batch[rejection['row']][0], rejection['reason'])
+                           for rejection in rejected]
+
+
+def existing_ids(model, ids, active=False):
+    if not ids:
+        return set()
+    query = db.session.query(model.id).filter(model.id.in_(ids))
+    if active and model in OWNERS.values():
+        query = query.filter(model.active())
+    return {row_id for (row_id,) in query}
+
+
+def allocate_ids(table, count, explicit):
+    # ids for the rows that come without one, so their genres can be linked
+    # in the same batch
+    if not count:
+        return []
+    if db.engine.dialect.name == 'postgresql':
+        sequence = "pg_get_serial_sequence('{}', 'id')".format(table.name)
+        if explicit:
+            # past the ids the batch comes with, so none is handed out again
+            db.session.execute(text(
+                'SELECT setval({0}, greatest(nextval({0}), :top))'.format(
+                    sequence)), {'top': max(explicit)})
+        return [row_id for (row_id,) in db.session.execute(text(
+            'SELECT nextval({}) FROM generate_series(1, :count)'.format(
+                sequence)), {'count': count})]
+    start = max([db.session.query(db.func.max(table.c.id)).scalar() or 0] +
+                explicit) + 1
+    return list(range(start, start + count))
+
+
+def not_deleted(model, source):
+    # criteria leaving out deleted venues and artists, and the rows of theirs
+    if model in OWNERS.values():
+        return [source.active()]
+    return [getattr(source, column).notin_(owner.deleted_ids())
+            for column, owner in OWNERS.items()
+            if column in model.__table__.c]
+
+
+def export_rows(kind, batch_size=1000):
+    # Streams every row of a kind, oldest first, through a server side
+    # cursor, so memory use doesn't grow with the table.
+    model, form_class = KINDS[kind]
+    source = Show.including_archive() if model is Show else model
+    columns = [getattr(source, column.name) for column in model.__table__.c
+               if column.name not in COMPUTED_COLUMNS]
+    result = db.session.execute(
+        select(*columns).where(*not_deleted(model, source)).order_by(
+            columns[0]).execution_options(stream_results=True))
+    for rows in result.partitions(batch_size):
+        genres = {}
+        if model in GENRE_LINKS:
+            link_table, owner_column = GENRE_LINKS[model]
+            for owner_id, name in db.session.query(
+                    owner_column, Genre.name).join(
+                    Genre, Genre.id == link_table.c.genre_id).filter(
+                    owner_column.in_([row.id for row in rows])).order_by(
+                    Genre.name):
+                genres.setdefault(owner_id, []).append(name)
+
+        for row in rows:
+            record = dict(row._mapping)
+            if model in GENRE_LINKS:
+                record['genres'] = genres.get(row.id, [])
+            yield record
+
+
+def write_rows(output, kind, records, format):
+    # yields the number of rows written so far, every thousand rows
+    model, form_class = KINDS[kind]
+    fields = [column.name for column in model.__table__.c
+              if column.name not in COMPUTED_COLUMNS]
+    if model in GENRE_LINKS:
+        fields.append('genres')
+
+    writer = None
+    if format == 'csv':
+        writer = csv.DictWriter(output, fieldnames=fields)
+        writer.writeheader()
+
+    written = 0
+    for record in records:
+        for field, value in record.items():
+            if isinstance(value, datetime):
+                record[field] = value.strftime(DATETIME_FORMAT)
+        if writer:
+            if 'genres' in record:
+                record['genres'] = ';'.join(record['genres'])
+            writer.writerow(record)
+        else:
+            output.write(json.dumps(record) + '\n')
+
+        written += 1
+        if written % 1000 == 0:
+            yield written
+    yield written